@@ -1,6 +1,6 @@
 from django.contrib import admin
 
-from .models import Category, Comment, Location, Post
+from .models import Category, Comment, Location, ModerationStatus, Post
 
 
 admin.site.empty_value_display = 'Не задано'
@@ -15,6 +15,8 @@ class PostAdmin(admin.ModelAdmin):
         'location',
         'category',
         'is_published',
+        'is_visible',
+        'views',
         'created_at'
     )
     list_display_links = ('title',)
@@ -28,6 +30,7 @@ class PostAdmin(admin.ModelAdmin):
         'location',
         'category',
         'is_published',
+        'is_visible',
     )
     search_fields = ('title',)
 
@@ -46,6 +49,7 @@ class CategoryAdmin(admin.ModelAdmin):
         'title',
         'description',
         'slug',
+        'posts_count',
     )
 
 
@@ -66,10 +70,72 @@ class CommentAdmin(admin.ModelAdmin):
         'created_at',
         'author',
         'post',
+        'is_published',
+        'moderation_status',
+        'spam_score',
     )
     list_filter = (
         'post',
+        'is_published',
+        'moderation_status',
     )
     search_fields = ('text',)
     list_display_links = ('text',)
     list_per_page = 10
+    actions = (
+        'hide_comments',
+        'unhide_comments',
+        'delete_comments',
+        'delete_by_author',
+        'delete_by_post',
+    )
+
+    def get_actions(self, request):
+        # Стандартное удаление загружает каждый объект и шлёт сигналы.
+        actions = super().get_actions(request)
+        actions.pop('delete_selected', None)
+        return actions
+
+    @admin.action(description='Скрыть выбранные комментарии',
+                  permissions=('change',))
+    def hide_comments(self, request, queryset):
+        count = queryset.update_in_chunks(is_published=False)
+        self.message_user(request, f'Скрыто комментариев: {count}.')
+
+    @admin.action(description='Показать выбранные комментарии',
+                  permissions=('change',))
+    def unhide_comments(self, request, queryset):
+        count = queryset.update_in_chunks(
+            is_published=True, moderation_status=ModerationStatus.APPROVED
+        )
+        self.message_user(request, f'Показано комментариев: {count}.')
+
+    @admin.action(description='Удалить выбранные комментарии с ответами',
+                  permissions=('delete',))
+    def delete_comments(self, request, queryset):
+        count = queryset.delete_with_replies()
+        self.message_user(request, f'Удалено комментариев: {count}.')
+
+    @admin.action(description='Удалить все комментарии их авторов',
+                  permissions=('delete',))
+    def delete_by_author(self, request, queryset):
+        authors = set(queryset.values_list('author_id', flat=True))
+        count = Comment.objects.filter(
+            author__in=authors
+        ).delete_with_replies()
+        self.message_user(
+            request,
+            f'Удалено комментариев: {count} (авторов: {len(authors)}).'
+        )
+
+    @admin.action(description='Удалить все комментарии к их публикациям',
+                  permissions=('delete',))
+    def delete_by_post(self, request, queryset):
+        posts = set(queryset.values_list('post_id', flat=True))
+        count = Comment.objects.filter(
+            post__in=posts
+        ).delete_with_replies()
+        self.message_user(
+            request,
+            f'Удалено комментариев: {count} (публикаций: {len(posts)}).'
+        )
@@ -5,3 +5,9 @@ class BlogConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'blog'
     verbose_name = 'Блог'
+
+    def ready(self):
+        # PRAGMA для SQLite нужно подключить до первого соединения.
+        import blogicum.db  # noqa: F401
+
+        from . import signals  # noqa: F401
@@ -0,0 +1,186 @@
+import asyncio
+
+from asgiref.sync import sync_to_async
+from django.core.paginator import InvalidPage, Paginator
+from django.db import close_old_connections, connections, router
+from django.http import Http404
+from django.shortcuts import render
+
+from .counters import view_counter, visitor_counter, visitor_key
+from .forms import CommentForm
+from .models import Category, Comment, Post, User
+from .pagination import latest_cursor, thread_page
+from .views import COMMENTS_PER_PAGE, POSTS_PER_PAGE, REPLIES_PREVIEW_LIMIT
+
+
+def _can_query_concurrently():
+    # Каждый поток пула открывает своё соединение, а базу в памяти
+    # (например, тестовую) другие соединения не видят. Проверяется
+    # база, с которой сейчас читаются публикации: это может быть реплика.
+    connection = connections[router.db_for_read(Post)]
+    is_in_memory_db = getattr(connection.creation, 'is_in_memory_db', None)
+    return not (
+        is_in_memory_db and is_in_memory_db(connection.settings_dict['NAME'])
+    )
+
+
+def _in_worker_thread(func):
+    def wrapper():
+        try:
+            return func()
+        finally:
+            close_old_connections()
+    return wrapper
+
+
+async def gather_db(*funcs):
+    """Выполняет синхронные функции с запросами к базе одновременно.
+
+    ORM в Django 3.2 синхронный, поэтому каждая функция идёт в пул
+    потоков, но независимые запросы страницы не ждут друг друга.
+    """
+    if not _can_query_concurrently():
+        return [await sync_to_async(func)() for func in funcs]
+    return await asyncio.gather(*(
+        sync_to_async(_in_worker_thread(func), thread_sensitive=False)()
+        for func in funcs
+    ))
+
+
+def get_or_none(queryset, **lookups):
+    return lambda: queryset.filter(**lookups).first()
+
+
+async def get_request_user(request):
+    def load_user():
+        # Обращение к атрибуту загружает ленивый request.user.
+        request.user.is_authenticated
+        return request.user
+    return await sync_to_async(load_user)()
+
+
+def get_page_number(request):
+    page = request.GET.get('page') or 1
+    if page == 'last':
+        return page
+    try:
+        return int(page)
+    except ValueError:
+        raise Http404('Некорректный номер страницы.')
+
+
+async def paginate(request, queryset, *lookups):
+    """Загружает lookups, число объектов и страницу за один проход.
+
+    Номер страницы известен заранее, поэтому COUNT и выборка страницы
+    не ждут друг друга. Только для page=last сначала нужен COUNT.
+    """
+    number = get_page_number(request)
+    if number != 'last' and number < 1:
+        raise Http404('Некорректный номер страницы.')
+    paginator = Paginator(queryset, POSTS_PER_PAGE)
+    if number == 'last':
+        number = await sync_to_async(lambda: paginator.num_pages)()
+    offset = (number - 1) * POSTS_PER_PAGE
+    *objects, count, object_list = await gather_db(
+        *lookups,
+        queryset.count,
+        lambda: list(queryset[offset:offset + POSTS_PER_PAGE]),
+    )
+    paginator.count = count
+    try:
+        paginator.validate_number(number)
+    except InvalidPage as error:
+        raise Http404(str(error))
+    page = paginator.page(number)
+    page.object_list = object_list
+    return objects, {
+        'paginator': paginator,
+        'page_obj': page,
+        'is_paginated': page.has_other_pages(),
+        'object_list': object_list,
+        'post_list': object_list,
+    }
+
+
+async def render_async(request, template_name, context):
+    # Шаблоны обращаются к request.user и тегам с запросами к базе.
+    return await sync_to_async(render)(request, template_name, context)
+
+
+async def index(request):
+    _, context = await paginate(
+        request,
+        Post.for_page.get_posts_queryset(
+            is_today_posts=True, is_annotate=True
+        ),
+    )
+    return await render_async(request, 'blog/index.html', context)
+
+
+async def category_posts(request, category_slug):
+    (category,), context = await paginate(
+        request,
+        Post.for_page.get_posts_queryset(
+            is_today_posts=True, is_annotate=True
+        ).filter(category__slug=category_slug),
+        get_or_none(
+            Category.objects, slug=category_slug, is_published=True
+        ),
+    )
+    if category is None:
+        raise Http404
+    context['category'] = category
+    return await render_async(request, 'blog/category.html', context)
+
+
+async def profile(request, username):
+    user = await get_request_user(request)
+    (profile_user,), context = await paginate(
+        request,
+        Post.for_page.get_posts_queryset(
+            is_today_posts=user.get_username() != username,
+            is_annotate=True,
+        ).filter(author__username=username),
+        get_or_none(User.objects, username=username),
+    )
+    if profile_user is None:
+        raise Http404
+    context['profile'] = profile_user
+    return await render_async(request, 'blog/profile.html', context)
+
+
+async def post_detail(request, post_id):
+    comments = Comment.objects.published().filter(post_id=post_id)
+    user, (post, (page, next_cursor), poll_cursor) = await asyncio.gather(
+        get_request_user(request),
+        gather_db(
+            get_or_none(Post.for_page, pk=post_id),
+            lambda: thread_page(
+                comments.select_related('author'),
+                size=COMMENTS_PER_PAGE,
+                replies_limit=REPLIES_PREVIEW_LIMIT,
+            ),
+            lambda: latest_cursor(comments),
+        ),
+    )
+    if post is None or not post.is_visible_to(user):
+        raise Http404
+    context = {
+        'object': post,
+        'post': post,
+        'comments': page,
+        'comments_next_cursor': next_cursor,
+        'comments_poll_cursor': poll_cursor,
+        'form': CommentForm(),
+    }
+
+    def count_view():
+        view_counter.increment(post.pk)
+        visitor_counter.add(post.pk, visitor_key(request))
+        context['views_count'] = post.views + view_counter.pending(post.pk)
+        if post.author == user:
+            context['unique_readers'] = visitor_counter.estimate(post)
+
+    await sync_to_async(count_view)()
+    return await render_async(request, 'blog/detail.html', context)
@@ -0,0 +1,51 @@
+from bisect import bisect_left
+
+from django.conf import settings
+
+from .models import DataVersion
+
+
+# Отсортированные по ключу поиска пары (ключ, pk, текст) для каждой модели.
+# Версия хранится в базе: кеш по умолчанию (LocMemCache) у каждого
+# процесса свой, и изменения в одном процессе другие бы не увидели.
+_indexes = {}
+
+
+def _version_key(model):
+    return f'autocomplete:{model._meta.label_lower}'
+
+
+def get_version(model):
+    return DataVersion.get(_version_key(model))
+
+
+def invalidate(model):
+    DataVersion.bump(_version_key(model))
+
+
+def _get_index(model, field_name):
+    version = get_version(model)
+    index = _indexes.get(model)
+    if index is None or index[0] != version:
+        rows = sorted(
+            (text.casefold(), pk, text)
+            for pk, text in model.objects.filter(
+                is_published=True
+            ).values_list('pk', field_name)
+        )
+        index = (version, [row[0] for row in rows], rows)
+        _indexes[model] = index
+    return index
+
+
+def search(model, field_name, prefix):
+    """Возвращает первые объекты, у которых поле начинается с prefix."""
+    _, keys, rows = _get_index(model, field_name)
+    prefix = prefix.strip().casefold()
+    start = bisect_left(keys, prefix)
+    results = []
+    for key, pk, text in rows[start:start + settings.AUTOCOMPLETE_LIMIT]:
+        if not key.startswith(prefix):
+            break
+        results.append({'id': pk, 'text': text})
+    return results
@@ -0,0 +1,377 @@
+import logging
+import os
+import threading
+import time
+import uuid
+from collections import Counter
+from pathlib import Path
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Case, F, PositiveIntegerField, Value, When
+
+from blogicum.db import outside_request
+
+from .hyperloglog import HyperLogLog
+from .writer import single_writer
+
+
+# SQLite ограничивает число параметров запроса (999 в старых сборках),
+# а каждая ветка CASE занимает три параметра.
+FLUSH_CHUNK_SIZE = 300
+# Журнал умершего процесса переименовывается перед применением,
+# чтобы его не применили два процесса сразу.
+RECOVERING_PREFIX = 'recovering-'
+FLUSHING_SUFFIX = '.flushing'
+
+# Журналы, которые пишут или применяют буферы этого процесса. Остальные
+# журналы с тем же номером процесса остались от упавшего процесса,
+# номер которого достался этому.
+_live_journals = set()
+
+logger = logging.getLogger(__name__)
+
+
+def _uses_in_memory_db():
+    is_in_memory_db = getattr(connection.creation, 'is_in_memory_db', None)
+    return bool(
+        is_in_memory_db
+        and is_in_memory_db(connection.settings_dict['NAME'])
+    )
+
+
+def _pid_is_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def _read_journal(path):
+    increments = Counter()
+    with open(path, encoding='utf-8') as journal:
+        for line in journal:
+            try:
+                post_id, amount = map(int, line.split())
+            except ValueError:
+                # Последняя строка могла не дописаться при аварии.
+                continue
+            increments[post_id] += amount
+    return increments
+
+
+def visitor_key(request):
+    if request.user.is_authenticated:
+        return f'user:{request.user.pk}'
+    if request.session.session_key:
+        return f'session:{request.session.session_key}'
+    return 'anonymous:{}:{}'.format(
+        request.META.get('REMOTE_ADDR', ''),
+        request.META.get('HTTP_USER_AGENT', ''),
+    )
+
+
+class TimedFlushMixin:
+    """Сбрасывает буфер через flush_interval после первого изменения.
+
+    Без таймера время проверялось бы только при новых событиях, и на
+    тихом сайте буфер висел бы в памяти сколько угодно. Поток таймера
+    заводится лениво и после fork (gunicorn --preload) заводится заново.
+    Базу в памяти (например, тестовую) соединения других потоков
+    не видят, поэтому с ней таймер не используется.
+    """
+
+    _timer = None
+
+    def _arm_timer(self):
+        # Вызывается под self._lock.
+        if self._timer is not None and self._timer.is_alive():
+            return
+        if not self.flush_interval or _uses_in_memory_db():
+            return
+        self._timer = threading.Timer(self.flush_interval, self._timed_flush)
+        self._timer.daemon = True
+        self._timer.start()
+
+    def _timed_flush(self):
+        with self._lock:
+            self._timer = None
+        try:
+            self.flush()
+        except Exception:
+            logger.exception('Буфер %s не сброшен по таймеру', self)
+            with self._lock:
+                self._arm_timer()
+        finally:
+            connection.close()
+
+
+def apply_increments(increments):
+    from .models import Post
+
+    items = [(pk, amount) for pk, amount in increments.items() if amount]
+    with transaction.atomic():
+        for start in range(0, len(items), FLUSH_CHUNK_SIZE):
+            chunk = items[start:start + FLUSH_CHUNK_SIZE]
+            Post.objects.filter(
+                pk__in=[pk for pk, _ in chunk]
+            ).update(views=F('views') + Case(
+                *[When(pk=pk, then=Value(amount)) for pk, amount in chunk],
+                default=Value(0),
+                output_field=PositiveIntegerField(),
+            ))
+
+
+class ViewCounterBuffer(TimedFlushMixin):
+    """Копит просмотры публикаций в памяти и сбрасывает их пачкой.
+
+    Каждое увеличение дописывается в журнал процесса, поэтому после
+    аварийного завершения непримененные просмотры восстанавливаются
+    (семантика «хотя бы один раз»).
+    """
+
+    def __init__(self, spill_file=None, flush_interval=30, flush_size=100):
+        self.spill_file = Path(spill_file) if spill_file else None
+        self.flush_interval = flush_interval
+        self.flush_size = flush_size
+        self._pending = Counter()
+        self._pending_total = 0
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._last_flush = time.monotonic()
+        self._recovered = False
+        self._journal_pid = None
+
+    @property
+    def journal_path(self):
+        pid = os.getpid()
+        if self._journal_pid != pid:
+            # Номер процесса мог достаться от упавшего процесса, а после
+            # fork имя нужно и дочернему, поэтому к номеру добавлен uuid.
+            self._journal_pid = pid
+            self._journal_name = (
+                f'{self.spill_file.name}.{pid}-{uuid.uuid4().hex}'
+            )
+            _live_journals.add(self._journal_name)
+        return self.spill_file.with_name(self._journal_name)
+
+    def _journal_enabled(self):
+        if self.spill_file is None:
+            return False
+        # Журнал для базы в памяти бесполезен: она не переживёт процесс.
+        return not _uses_in_memory_db()
+
+    def increment(self, post_id, amount=1):
+        if not self._recovered:
+            self.recover()
+        with self._lock:
+            if self._journal_enabled():
+                with open(self.journal_path, 'a', encoding='utf-8') as journal:
+                    journal.write(f'{post_id} {amount}\n')
+            self._pending[post_id] += amount
+            self._pending_total += amount
+            self._arm_timer()
+            is_due = (
+                self._pending_total >= self.flush_size
+                or time.monotonic() - self._last_flush >= self.flush_interval
+            )
+        if is_due:
+            self.flush()
+
+    def pending(self, post_id):
+        with self._lock:
+            return self._pending.get(post_id, 0)
+
+    def flush(self):
+        with self._flush_lock:
+            with self._lock:
+                if not self._pending:
+                    return 0
+                increments, self._pending = self._pending, Counter()
+                self._pending_total = 0
+                self._last_flush = time.monotonic()
+                flushing = None
+                if self._journal_enabled() and self.journal_path.exists():
+                    flushing = self.journal_path.with_name(
+                        self.journal_path.name + FLUSHING_SUFFIX
+                    )
+                    os.replace(self.journal_path, flushing)
+            try:
+                # Сброс копит просмотры многих клиентов, а не запись
+                # текущего: он не должен привязывать клиента к основной базе.
+                with outside_request():
+                    single_writer.run(apply_increments, increments)
+            except Exception:
+                with self._lock:
+                    self._pending.update(increments)
+                    self._pending_total += sum(increments.values())
+                    if flushing is not None:
+                        self._merge_journal(flushing)
+                raise
+            if flushing is not None:
+                flushing.unlink()
+        return sum(increments.values())
+
+    def _merge_journal(self, flushing):
+        with open(flushing, encoding='utf-8') as source:
+            lines = source.read()
+        with open(self.journal_path, 'a', encoding='utf-8') as journal:
+            journal.write(lines)
+        flushing.unlink()
+
+    def journal_owner(self, path):
+        """Номер процесса, который пишет или применяет журнал path."""
+        suffix = path.name[len(self.spill_file.name) + 1:]
+        if suffix.startswith(RECOVERING_PREFIX):
+            suffix = suffix[len(RECOVERING_PREFIX):]
+        pid = suffix.split('.')[0].split('-')[0]
+        return int(pid) if pid.isdigit() else None
+
+    def journal_is_abandoned(self, path):
+        pid = self.journal_owner(path)
+        if pid is None:
+            return False
+        if pid != os.getpid():
+            return not _pid_is_alive(pid)
+        name = path.name
+        if name.endswith(FLUSHING_SUFFIX):
+            name = name[:-len(FLUSHING_SUFFIX)]
+        return name not in _live_journals
+
+    def recover(self):
+        """Применяет журналы завершившихся процессов.
+
+        Журнал сначала забирается атомарным переименованием: если два
+        процесса восстанавливают один журнал, переименовать его удастся
+        только одному. Журнал процесса, упавшего во время восстановления,
+        забирается снова.
+        """
+        self._recovered = True
+        if not self._journal_enabled():
+            return 0
+        recovered = 0
+        pattern = f'{self.spill_file.name}.*'
+        for path in sorted(self.spill_file.parent.glob(pattern)):
+            if not self.journal_is_abandoned(path):
+                continue
+            claimed = path.with_name(
+                f'{self.spill_file.name}.{RECOVERING_PREFIX}'
+                f'{os.getpid()}-{uuid.uuid4().hex}'
+            )
+            _live_journals.add(claimed.name)
+            try:
+                os.replace(path, claimed)
+            except FileNotFoundError:
+                _live_journals.discard(claimed.name)
+                continue
+            increments = _read_journal(claimed)
+            with outside_request():
+                single_writer.run(apply_increments, increments)
+            claimed.unlink()
+            _live_journals.discard(claimed.name)
+            recovered += sum(increments.values())
+        return recovered
+
+
+def merge_sketches(sketches):
+    from .models import Post, PostVisitorSketch
+
+    with transaction.atomic():
+        stored = PostVisitorSketch.objects.select_for_update().in_bulk(
+            list(sketches)
+        )
+        existing_posts = set(Post.objects.filter(
+            pk__in=[pk for pk in sketches if pk not in stored]
+        ).values_list('pk', flat=True))
+        to_create, to_update = [], []
+        for post_id, sketch in sketches.items():
+            if post_id in stored:
+                row = stored[post_id]
+                row.registers = row.sketch.merge(sketch).to_bytes()
+                to_update.append(row)
+            elif post_id in existing_posts:
+                to_create.append(PostVisitorSketch(
+                    post_id=post_id, registers=sketch.to_bytes()
+                ))
+        PostVisitorSketch.objects.bulk_update(to_update, ['registers'])
+        PostVisitorSketch.objects.bulk_create(to_create)
+
+
+class VisitorSketchBuffer(TimedFlushMixin):
+    """Копит скетчи уникальных читателей и сливает их с сохранёнными.
+
+    Объединение скетчей идемпотентно, поэтому процессы сбрасывают свои
+    скетчи независимо, а повторный сброс ничего не портит.
+    """
+
+    def __init__(self, flush_interval=30, flush_size=100):
+        self.flush_interval = flush_interval
+        self.flush_size = flush_size
+        self._sketches = {}
+        self._changes = 0
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._last_flush = time.monotonic()
+
+    def add(self, post_id, visitor):
+        with self._lock:
+            sketch = self._sketches.setdefault(post_id, HyperLogLog())
+            if sketch.add(visitor):
+                self._changes += 1
+                self._arm_timer()
+            is_due = self._changes and (
+                self._changes >= self.flush_size
+                or time.monotonic() - self._last_flush >= self.flush_interval
+            )
+        if is_due:
+            self.flush()
+
+    def pending(self, post_id):
+        return self._sketches.get(post_id)
+
+    def flush(self):
+        with self._flush_lock:
+            with self._lock:
+                if not self._sketches:
+                    return 0
+                sketches, self._sketches = self._sketches, {}
+                self._changes = 0
+                self._last_flush = time.monotonic()
+            try:
+                with outside_request():
+                    single_writer.run(merge_sketches, sketches)
+            except Exception:
+                with self._lock:
+                    for post_id, sketch in sketches.items():
+                        self._sketches.setdefault(
+                            post_id, HyperLogLog()
+                        ).merge(sketch)
+                raise
+        return len(sketches)
+
+    def estimate(self, post):
+        from .models import PostVisitorSketch
+
+        sketch = HyperLogLog()
+        try:
+            sketch.merge(post.visitor_sketch.sketch)
+        except PostVisitorSketch.DoesNotExist:
+            pass
+        pending = self.pending(post.pk)
+        if pending is not None:
+            sketch.merge(pending)
+        return sketch.count()
+
+
+view_counter = ViewCounterBuffer(
+    spill_file=getattr(settings, 'VIEW_COUNTER_SPILL_FILE', None),
+    flush_interval=getattr(settings, 'VIEW_COUNTER_FLUSH_INTERVAL', 30),
+    flush_size=getattr(settings, 'VIEW_COUNTER_FLUSH_SIZE', 100),
+)
+visitor_counter = VisitorSketchBuffer(
+    flush_interval=getattr(settings, 'VIEW_COUNTER_FLUSH_INTERVAL', 30),
+    flush_size=getattr(settings, 'VIEW_COUNTER_FLUSH_SIZE', 100),
+)
@@ -0,0 +1,222 @@
+import asyncio
+import io
+import json
+import threading
+from collections import defaultdict
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.exceptions import DisallowedHost
+from django.core.handlers.asgi import ASGIRequest
+from django.db import transaction
+from django.http import HttpResponse
+from django.middleware.security import SecurityMiddleware
+from django.urls import Resolver404, resolve
+from django.utils.module_loading import import_string
+
+
+POSTS_CHANNEL = 'posts'
+
+
+def comments_channel(post_id):
+    return f'comments:{post_id}'
+
+
+class Broker:
+    """Интерфейс брокера событий.
+
+    publish() вызывается из синхронного кода в любом потоке,
+    subscribe() и unsubscribe() — из цикла событий ASGI-сервера.
+    Брокер доставляет сообщения в очереди asyncio подписчиков.
+    """
+
+    def publish(self, channel, message):
+        raise NotImplementedError
+
+    def subscribe(self, channel, queue):
+        raise NotImplementedError
+
+    def unsubscribe(self, channel, queue):
+        raise NotImplementedError
+
+
+class LocalBroker(Broker):
+    """Раздаёт события подписчикам внутри одного процесса."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscribers = defaultdict(dict)
+
+    def subscribe(self, channel, queue):
+        with self._lock:
+            self._subscribers[channel][queue] = (
+                asyncio.get_running_loop()
+            )
+
+    def unsubscribe(self, channel, queue):
+        with self._lock:
+            subscribers = self._subscribers.get(channel, {})
+            subscribers.pop(queue, None)
+            if not subscribers:
+                self._subscribers.pop(channel, None)
+
+    def publish(self, channel, message):
+        with self._lock:
+            subscribers = list(self._subscribers.get(channel, {}).items())
+        for queue, loop in subscribers:
+            loop.call_soon_threadsafe(self._deliver, queue, message)
+        return len(subscribers)
+
+    @staticmethod
+    def _deliver(queue, message):
+        try:
+            queue.put_nowait(message)
+        except asyncio.QueueFull:
+            # Медленный клиент пропускает события, а не копит их в памяти.
+            pass
+
+
+_broker = None
+
+
+def get_broker():
+    global _broker
+    if _broker is None:
+        _broker = import_string(settings.EVENTS_BROKER)()
+    return _broker
+
+
+def publish(channel, event, data):
+    """Отправляет событие подписчикам после фиксации транзакции."""
+    message = (event, json.dumps(data, ensure_ascii=False))
+    transaction.on_commit(lambda: get_broker().publish(channel, message))
+
+
+def publish_comment(comment):
+    publish(comments_channel(comment.post_id), 'comment', {
+        'id': comment.pk,
+        'parent': comment.parent_id,
+    })
+
+
+def format_event(event, data):
+    return f'event: {event}\ndata: {data}\n\n'.encode()
+
+
+class EventStream:
+    """Поток Server-Sent Events, подключаемый в urls.py как обычный view.
+
+    Под ASGI запросы к нему перехватывает EventStreamRouter и обслуживает
+    в цикле событий: ожидающий подписчик — это корутина с очередью,
+    а не занятый поток. Под WSGI держать соединение нечем, поэтому view
+    отвечает 204, и EventSource перестаёт переподключаться.
+    """
+
+    def __init__(self, get_channel):
+        self.get_channel = get_channel
+
+    def __call__(self, request, *args, **kwargs):
+        return HttpResponse(status=204)
+
+    async def handle(self, request, receive, send, **kwargs):
+        channel = await sync_to_async(self.get_channel)(**kwargs)
+        if channel is None:
+            await send({'type': 'http.response.start', 'status': 404})
+            await send({'type': 'http.response.body', 'body': b''})
+            return
+        response = HttpResponse(
+            content_type='text/event-stream; charset=utf-8'
+        )
+        response['Cache-Control'] = 'no-cache'
+        response['X-Accel-Buffering'] = 'no'
+        # Заголовки безопасности те же, что у остальных страниц.
+        response = SecurityMiddleware(
+            lambda request: response
+        ).process_response(request, response)
+        queue = asyncio.Queue(settings.EVENTS_QUEUE_SIZE)
+        broker = get_broker()
+        broker.subscribe(channel, queue)
+        try:
+            await send({
+                'type': 'http.response.start',
+                'status': 200,
+                'headers': [
+                    (name.lower().encode('latin1'), value.encode('latin1'))
+                    for name, value in response.items()
+                ],
+            })
+            await send({
+                'type': 'http.response.body',
+                'body': b'retry: 5000\n\n',
+                'more_body': True,
+            })
+            await self.pump(queue, receive, send)
+        finally:
+            broker.unsubscribe(channel, queue)
+
+    @staticmethod
+    async def wait_disconnect(receive):
+        # Первым приходит http.request с телом запроса, его пропускаем.
+        while (await receive())['type'] != 'http.disconnect':
+            pass
+
+    async def pump(self, queue, receive, send):
+        disconnect = asyncio.ensure_future(self.wait_disconnect(receive))
+        try:
+            while True:
+                message = asyncio.ensure_future(queue.get())
+                done, _ = await asyncio.wait(
+                    {message, disconnect},
+                    timeout=settings.EVENTS_KEEPALIVE,
+                    return_when=asyncio.FIRST_COMPLETED,
+                )
+                if disconnect in done:
+                    message.cancel()
+                    return
+                if message in done:
+                    body = format_event(*message.result())
+                else:
+                    message.cancel()
+                    body = b': keepalive\n\n'
+                await send({
+                    'type': 'http.response.body',
+                    'body': body,
+                    'more_body': True,
+                })
+        finally:
+            disconnect.cancel()
+
+
+class EventStreamRouter:
+    """ASGI-обёртка: потоки событий мимо Django, остальное — в Django.
+
+    Обработчик ASGI в Django 3.2 не умеет асинхронные потоковые ответы,
+    поэтому поток обслуживается здесь. Путь разбирается с учётом
+    root_path, как в ASGIRequest, а запрос с недопустимым Host уходит
+    в Django и получает там обычный ответ 400.
+    """
+
+    def __init__(self, application):
+        self.application = application
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'http':
+            request = ASGIRequest(scope, io.BytesIO())
+            try:
+                match = resolve(request.path_info)
+            except Resolver404:
+                match = None
+            if (match is not None and isinstance(match.func, EventStream)
+                    and self.host_allowed(request)):
+                return await match.func.handle(
+                    request, receive, send, **match.kwargs
+                )
+        return await self.application(scope, receive, send)
+
+    @staticmethod
+    def host_allowed(request):
+        try:
+            request.get_host()
+        except DisallowedHost:
+            return False
+        return True
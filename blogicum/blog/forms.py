@@ -2,6 +2,7 @@ from django import forms
 from django.contrib.auth import get_user_model
 
 from .models import Comment, Post
+from .widgets import AutocompleteWidget
 
 
 class CommentForm(forms.ModelForm):
@@ -21,5 +22,11 @@ class PostForm(forms.ModelForm):
         model = Post
         exclude = ('author',)
         widgets = {
-            'pub_date': forms.DateTimeInput(attrs={'type': 'datetime'})
+            'pub_date': forms.DateTimeInput(attrs={'type': 'datetime'}),
+            'category': AutocompleteWidget(
+                'blog:autocomplete_category', label_field='title'
+            ),
+            'location': AutocompleteWidget(
+                'blog:autocomplete_location', label_field='name'
+            ),
         }
@@ -0,0 +1,83 @@
+import hashlib
+import math
+
+
+DEFAULT_PRECISION = 11
+HASH_BITS = 64
+
+
+def _hash(value):
+    if isinstance(value, str):
+        value = value.encode('utf-8')
+    digest = hashlib.blake2b(value, digest_size=HASH_BITS // 8).digest()
+    return int.from_bytes(digest, 'big')
+
+
+def _alpha(size):
+    if size == 16:
+        return 0.673
+    if size == 32:
+        return 0.697
+    if size == 64:
+        return 0.709
+    return 0.7213 / (1 + 1.079 / size)
+
+
+class HyperLogLog:
+    """Оценка числа уникальных значений по схеме HyperLogLog.
+
+    Регистры хранятся в bytearray: 2 ** precision байт на скетч,
+    стандартная ошибка оценки — 1.04 / sqrt(2 ** precision).
+    """
+
+    def __init__(self, precision=DEFAULT_PRECISION, registers=None):
+        if not 4 <= precision <= 16:
+            raise ValueError('precision должна быть в диапазоне 4..16.')
+        self.precision = precision
+        self.size = 1 << precision
+        if registers is None:
+            registers = bytearray(self.size)
+        elif len(registers) != self.size:
+            raise ValueError('Число регистров не соответствует precision.')
+        self.registers = bytearray(registers)
+
+    def add(self, value):
+        hashed = _hash(value)
+        index = hashed >> (HASH_BITS - self.precision)
+        rest_bits = HASH_BITS - self.precision
+        rest = hashed & ((1 << rest_bits) - 1)
+        rank = rest_bits - rest.bit_length() + 1
+        if rank > self.registers[index]:
+            self.registers[index] = rank
+            return True
+        return False
+
+    def merge(self, other):
+        if other.precision != self.precision:
+            raise ValueError('Нельзя объединить скетчи разной точности.')
+        self.registers = bytearray(map(max, self.registers, other.registers))
+        return self
+
+    def count(self):
+        estimate = _alpha(self.size) * self.size ** 2 / sum(
+            2.0 ** -register for register in self.registers
+        )
+        zeros = self.registers.count(0)
+        if estimate <= 2.5 * self.size and zeros:
+            # Поправка линейного счёта для малых кардинальностей.
+            estimate = self.size * math.log(self.size / zeros)
+        return round(estimate)
+
+    def __len__(self):
+        return self.count()
+
+    def __bool__(self):
+        return any(self.registers)
+
+    def to_bytes(self):
+        return bytes([self.precision]) + bytes(self.registers)
+
+    @classmethod
+    def from_bytes(cls, data):
+        data = bytes(data)
+        return cls(precision=data[0], registers=data[1:])
@@ -0,0 +1,46 @@
+import sys
+import time
+
+from django.core.management.base import BaseCommand
+
+from blog.hyperloglog import HyperLogLog
+
+
+class Command(BaseCommand):
+    help = ('Сравнивает точность и расход памяти HyperLogLog '
+            'с хранением всех идентификаторов читателей.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--precision', type=int, nargs='+', default=[10, 11, 12, 14]
+        )
+        parser.add_argument(
+            '--cardinality', type=int, nargs='+',
+            default=[100, 1000, 10000, 100000]
+        )
+
+    def handle(self, *args, **options):
+        self.stdout.write(
+            f'{"p":>3} {"n":>8} {"оценка":>8} {"ошибка":>8} '
+            f'{"скетч, Б":>9} {"set, Б":>10} {"мкс/add":>8}'
+        )
+        for precision in options['precision']:
+            for cardinality in options['cardinality']:
+                self.stdout.write(self.measure(precision, cardinality))
+
+    def measure(self, precision, cardinality):
+        sketch = HyperLogLog(precision)
+        visitors = [f'user:{i}' for i in range(cardinality)]
+        started = time.perf_counter()
+        for visitor in visitors:
+            sketch.add(visitor)
+        elapsed = time.perf_counter() - started
+        exact = set(visitors)
+        set_size = sys.getsizeof(exact) + sum(map(sys.getsizeof, exact))
+        estimate = sketch.count()
+        error = (estimate - cardinality) / cardinality * 100
+        return (
+            f'{precision:>3} {cardinality:>8} {estimate:>8} {error:>7.2f}% '
+            f'{len(sketch.to_bytes()):>9} {set_size:>10} '
+            f'{elapsed / cardinality * 1e6:>8.2f}'
+        )
@@ -0,0 +1,58 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from blog.models import Comment, Post, User
+from blog.spam import SpamScoringWorker
+
+from .score_comments import Command as ScoreCommand
+
+
+class Command(BaseCommand):
+    help = ('Создаёт всплеск комментариев и измеряет, как быстро '
+            'проверка на спам разбирает очередь. Изменения откатываются.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--comments', type=int, default=5000)
+        parser.add_argument(
+            '--batch-size', type=int, nargs='+', default=[10, 100, 500]
+        )
+
+    def handle(self, *args, **options):
+        post = Post.objects.first()
+        if post is None:
+            raise CommandError('Нужна хотя бы одна публикация.')
+        for batch_size in options['batch_size']:
+            with transaction.atomic():
+                started = time.perf_counter()
+                self.burst(post, options['comments'])
+                created = time.perf_counter() - started
+                worker = SpamScoringWorker(batch_size=batch_size)
+                started = time.perf_counter()
+                worker.drain()
+                elapsed = time.perf_counter() - started
+                self.stdout.write(
+                    f'Пачка {batch_size}: создание {created:.2f} с, '
+                    f'проверка {elapsed:.2f} с; '
+                    + ScoreCommand.format_metrics(worker.metrics)
+                )
+                transaction.set_rollback(True)
+
+    @staticmethod
+    def burst(post, count):
+        authors = [
+            User.objects.create(username=f'bench-spam-{i}')
+            for i in range(10)
+        ]
+        # Через save(), как при добавлении из формы: с отрисовкой HTML,
+        # путём ветки и сигналами, а не в обход них через bulk_create().
+        for i in range(count):
+            Comment.objects.create(
+                post=post,
+                author=authors[i % len(authors)],
+                is_published=settings.COMMENT_PENDING_VISIBLE,
+                text=(f'Смотрите http://spam.example/{i}' if i % 7 == 0
+                      else f'Комментарий номер {i}'),
+            )
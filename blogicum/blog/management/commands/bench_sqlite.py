@@ -0,0 +1,117 @@
+import multiprocessing
+import random
+import sqlite3
+import tempfile
+import time
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from blogicum.db import apply_sqlite_pragmas
+
+
+SCHEMA = (
+    'CREATE TABLE post (id INTEGER PRIMARY KEY, comment_count INTEGER)',
+    'CREATE TABLE comment (id INTEGER PRIMARY KEY, post_id INTEGER, '
+    'text TEXT, created_at REAL)',
+    'CREATE INDEX comment_post ON comment (post_id, id)',
+)
+POSTS = 100
+
+
+def prepare(path, pragmas):
+    connection = sqlite3.connect(path)
+    apply_sqlite_pragmas(connection, pragmas)
+    for statement in SCHEMA:
+        connection.execute(statement)
+    connection.executemany(
+        'INSERT INTO post VALUES (?, 0)', [(i,) for i in range(POSTS)]
+    )
+    connection.commit()
+    connection.close()
+
+
+def run_client(path, pragmas, timeout, duration, write_ratio, seed):
+    """Читает ленту комментариев и пишет новые, как страница публикации.
+
+    Запись — это вставка комментария и обновление счётчика в одной
+    транзакции. Возвращает число чтений, записей и ошибок блокировки.
+    """
+    rng = random.Random(seed)
+    # isolation_level=None: транзакциями управляем сами, как Django.
+    connection = sqlite3.connect(path, timeout=timeout, isolation_level=None)
+    apply_sqlite_pragmas(connection, pragmas)
+    reads = writes = locked = 0
+    deadline = time.perf_counter() + duration
+    while time.perf_counter() < deadline:
+        post_id = rng.randrange(POSTS)
+        try:
+            if rng.random() < write_ratio:
+                connection.execute('BEGIN')
+                try:
+                    connection.execute(
+                        'INSERT INTO comment (post_id, text, created_at) '
+                        'VALUES (?, ?, ?)', (post_id, 'x' * 200, time.time())
+                    )
+                    connection.execute(
+                        'UPDATE post SET comment_count = comment_count + 1 '
+                        'WHERE id = ?', (post_id,)
+                    )
+                    connection.execute('COMMIT')
+                except sqlite3.OperationalError:
+                    connection.execute('ROLLBACK')
+                    raise
+                writes += 1
+            else:
+                connection.execute(
+                    'SELECT id, text FROM comment WHERE post_id = ? '
+                    'ORDER BY id DESC LIMIT 10', (post_id,)
+                ).fetchall()
+                reads += 1
+        except sqlite3.OperationalError as error:
+            if 'locked' not in str(error) and 'busy' not in str(error):
+                raise
+            locked += 1
+    connection.close()
+    return reads, writes, locked
+
+
+class Command(BaseCommand):
+    help = ('Нагружает отдельный файл SQLite несколькими процессами '
+            'и сравнивает настройки по умолчанию с SQLITE_PRAGMAS.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--processes', type=int, default=8)
+        parser.add_argument('--duration', type=float, default=5.0)
+        parser.add_argument('--write-ratio', type=float, default=0.3)
+        parser.add_argument(
+            '--timeout', type=float, default=5.0,
+            help='Ожидание блокировки без PRAGMA busy_timeout, с; '
+                 'как у соединений Django по умолчанию.',
+        )
+
+    def handle(self, *args, **options):
+        self.stdout.write(
+            f'{"профиль":<10} {"чтений/с":>9} {"записей/с":>10} '
+            f'{"блокировок":>11} {"доля ошибок":>12}'
+        )
+        profiles = (('default', {}), ('pragmas', settings.SQLITE_PRAGMAS))
+        context = multiprocessing.get_context('spawn')
+        for name, pragmas in profiles:
+            with tempfile.TemporaryDirectory() as directory:
+                path = str(Path(directory) / 'bench.sqlite3')
+                prepare(path, pragmas)
+                with context.Pool(options['processes']) as pool:
+                    results = pool.starmap(run_client, [
+                        (path, pragmas, options['timeout'],
+                         options['duration'], options['write_ratio'], seed)
+                        for seed in range(options['processes'])
+                    ])
+            reads, writes, locked = map(sum, zip(*results))
+            attempts = reads + writes + locked
+            self.stdout.write(
+                f'{name:<10} {reads / options["duration"]:>9.0f} '
+                f'{writes / options["duration"]:>10.0f} {locked:>11} '
+                f'{locked / max(attempts, 1):>12.2%}'
+            )
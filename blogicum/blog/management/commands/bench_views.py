@@ -0,0 +1,106 @@
+import asyncio
+import importlib
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from asgiref.sync import async_to_sync
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.test import AsyncClient, Client, override_settings
+from django.urls import clear_url_caches, reverse
+
+from blog.models import Post
+
+
+def reload_urls():
+    import blog.urls
+
+    importlib.reload(blog.urls)
+    importlib.reload(importlib.import_module(settings.ROOT_URLCONF))
+    clear_url_caches()
+
+
+class Command(BaseCommand):
+    help = ('Сравнивает число запросов в секунду для страниц чтения '
+            'под WSGI, под ASGI с синхронными и с асинхронными view.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=200)
+        parser.add_argument('--concurrency', type=int, default=20)
+
+    def handle(self, *args, **options):
+        post = Post.for_page.get_posts_queryset(is_today_posts=True).first()
+        if post is None:
+            raise CommandError('Нужна хотя бы одна опубликованная запись.')
+        paths = [
+            reverse('blog:index'),
+            reverse('blog:post_detail', args=[post.pk]),
+            reverse('blog:profile', args=[post.author.username]),
+        ]
+        if post.category is not None:
+            paths.append(
+                reverse('blog:category_posts', args=[post.category.slug])
+            )
+        self.stdout.write(
+            f'{"режим":<11} {"страница":<40} {"запр./с":>8} '
+            f'{"p50, мс":>8} {"p95, мс":>8}'
+        )
+        modes = (
+            ('wsgi', False, self.run_wsgi),
+            ('asgi-sync', False, self.run_asgi),
+            ('asgi-async', True, self.run_asgi),
+        )
+        try:
+            for name, async_views, run in modes:
+                with override_settings(
+                    ASYNC_VIEWS=async_views,
+                    ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, 'testserver'],
+                ):
+                    reload_urls()
+                    for path in paths:
+                        self.report(name, path, run(path, options))
+        finally:
+            reload_urls()
+
+    def report(self, mode, path, result):
+        elapsed, latencies = result
+        latencies.sort()
+        self.stdout.write(
+            f'{mode:<11} {path:<40} {len(latencies) / elapsed:>8.1f} '
+            f'{statistics.median(latencies) * 1000:>8.1f} '
+            f'{latencies[int(len(latencies) * 0.95)] * 1000:>8.1f}'
+        )
+
+    @staticmethod
+    def run_wsgi(path, options):
+        def fetch(_):
+            started = time.perf_counter()
+            assert Client().get(path).status_code == 200
+            return time.perf_counter() - started
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(options['concurrency']) as executor:
+            latencies = list(executor.map(fetch, range(options['requests'])))
+        return time.perf_counter() - started, latencies
+
+    @staticmethod
+    def run_asgi(path, options):
+        async def run():
+            semaphore = asyncio.Semaphore(options['concurrency'])
+            client = AsyncClient()
+
+            async def fetch():
+                async with semaphore:
+                    started = time.perf_counter()
+                    response = await client.get(path)
+                    assert response.status_code == 200
+                    return time.perf_counter() - started
+
+            started = time.perf_counter()
+            latencies = await asyncio.gather(
+                *(fetch() for _ in range(options['requests']))
+            )
+            return time.perf_counter() - started, list(latencies)
+
+        return async_to_sync(run)()
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from blog.counters import view_counter
+
+
+class Command(BaseCommand):
+    help = ('Применяет к базе просмотры из журналов завершившихся '
+            'процессов.')
+
+    def handle(self, *args, **options):
+        recovered = view_counter.recover()
+        self.stdout.write(self.style.SUCCESS(
+            f'Восстановлено просмотров: {recovered}'
+        ))
@@ -0,0 +1,183 @@
+import json
+import os
+import re
+import subprocess
+import sys
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+
+IMPORTTIME_LINE = re.compile(
+    r'^import time:\s+(\d+) \|\s+(\d+) \| (\s*)(\S+)$'
+)
+
+
+class ImportNode:
+
+    def __init__(self, name, self_us, cumulative_us, children=()):
+        self.name = name
+        self.self_us = self_us
+        self.cumulative_us = cumulative_us
+        self.children = list(children)
+
+
+def parse_importtime(text):
+    """Строит дерево импортов из вывода python -X importtime.
+
+    Вложенный модуль печатается раньше родителя с отступом на два
+    пробела больше, поэтому уже разобранные строки ждут своего
+    родителя в pending по уровню вложенности.
+    """
+    pending = {}
+    for line in text.splitlines():
+        match = IMPORTTIME_LINE.match(line)
+        if match is None:
+            continue
+        self_us, cumulative_us, indent, name = match.groups()
+        level = len(indent) // 2
+        node = ImportNode(
+            name, int(self_us), int(cumulative_us),
+            pending.pop(level + 1, ()),
+        )
+        pending.setdefault(level, []).append(node)
+    return pending.get(0, [])
+
+
+def walk(nodes, depth=0):
+    for node in nodes:
+        yield depth, node
+        yield from walk(node.children, depth + 1)
+
+
+def profile_startup(target, env=None):
+    """Импортирует target в отдельном процессе и возвращает дерево."""
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', f'import {target}'],
+        cwd=settings.BASE_DIR,
+        env={
+            **os.environ,
+            'DJANGO_SETTINGS_MODULE': os.environ.get(
+                'DJANGO_SETTINGS_MODULE', 'blogicum.settings'
+            ),
+            **(env or {}),
+        },
+        capture_output=True,
+        text=True,
+    )
+    if result.returncode:
+        raise CommandError(
+            f'Импорт {target} завершился ошибкой:\n{result.stderr[-2000:]}'
+        )
+    return parse_importtime(result.stderr)
+
+
+def compare_with_baseline(cumulative, baseline, tolerance, min_us):
+    """Возвращает модули, которые стали дольше эталона на tolerance %.
+
+    Модули быстрее min_us шумят сильнее порога и не проверяются.
+    """
+    limit = 1 + tolerance / 100
+    problems = []
+    for name, after_us in cumulative.items():
+        before_us = baseline.get(name)
+        if before_us is None:
+            if after_us >= min_us:
+                problems.append(
+                    f'{name}: новый импорт, {after_us / 1000:.1f} мс'
+                )
+        elif before_us >= min_us and after_us > before_us * limit:
+            problems.append(
+                f'{name}: {before_us / 1000:.1f} → {after_us / 1000:.1f} мс'
+            )
+    return problems
+
+
+class Command(BaseCommand):
+    help = ('Показывает время импорта модулей при запуске blogicum.wsgi '
+            'или blogicum.asgi и проверяет его по порогам.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--target', default='blogicum.wsgi',
+            choices=('blogicum.wsgi', 'blogicum.asgi'),
+        )
+        parser.add_argument(
+            '--no-ui', action='store_true',
+            help='Запуск с BLOGICUM_SERVE_UI=0, без админки и bootstrap.',
+        )
+        parser.add_argument(
+            '--min-ms', type=float, default=5.0,
+            help='Не показывать в дереве модули быстрее порога, мс.',
+        )
+        parser.add_argument('--top', type=int, default=15)
+        parser.add_argument(
+            '--max-total-ms', type=float,
+            help='Ошибка, если весь запуск импортируется дольше, мс.',
+        )
+        parser.add_argument(
+            '--baseline', type=Path,
+            help='JSON с эталонным временем модулей для сравнения.',
+        )
+        parser.add_argument(
+            '--save-baseline', action='store_true',
+            help='Записать текущий замер в файл --baseline.',
+        )
+        parser.add_argument(
+            '--tolerance', type=float, default=25.0,
+            help='Допустимый рост времени модуля относительно эталона, %%.',
+        )
+
+    def handle(self, *args, **options):
+        env = {'BLOGICUM_SERVE_UI': '0'} if options['no_ui'] else None
+        roots = profile_startup(options['target'], env)
+        nodes = [node for _, node in walk(roots)]
+        total_ms = sum(root.cumulative_us for root in roots) / 1000
+
+        min_us = options['min_ms'] * 1000
+        self.write_report(roots, nodes, min_us, options['top'])
+        self.stdout.write(
+            f'\nМодулей: {len(nodes)}, всего: {total_ms:.1f} мс'
+        )
+
+        cumulative = {}
+        for node in nodes:
+            cumulative.setdefault(node.name, node.cumulative_us)
+        problems = []
+        if (options['max_total_ms'] is not None
+                and total_ms > options['max_total_ms']):
+            problems.append(
+                f'запуск {total_ms:.1f} мс > {options["max_total_ms"]} мс'
+            )
+        baseline_path = options['baseline']
+        if baseline_path is not None and options['save_baseline']:
+            baseline_path.write_text(
+                json.dumps(cumulative, indent=2, sort_keys=True)
+            )
+            self.stdout.write(f'Эталон записан в {baseline_path}')
+        elif baseline_path is not None:
+            problems += compare_with_baseline(
+                cumulative, json.loads(baseline_path.read_text()),
+                options['tolerance'], min_us,
+            )
+        if problems:
+            raise CommandError(
+                'Время запуска выросло:\n' + '\n'.join(problems)
+            )
+
+    def write_report(self, roots, nodes, min_us, top):
+        self.stdout.write(f'{"self, мс":>9} {"всего, мс":>10}  модуль')
+        for depth, node in walk(roots):
+            if node.cumulative_us < min_us:
+                continue
+            self.stdout.write(
+                f'{node.self_us / 1000:>9.1f} '
+                f'{node.cumulative_us / 1000:>10.1f}  '
+                f'{"  " * depth}{node.name}'
+            )
+        self.stdout.write('\nСамые медленные модули (self):')
+        for node in sorted(
+            nodes, key=lambda node: node.self_us, reverse=True
+        )[:top]:
+            self.stdout.write(f'{node.self_us / 1000:>9.1f}  {node.name}')
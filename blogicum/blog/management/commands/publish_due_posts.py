@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from blog.scheduling import publish_due_posts, schedule_next_publication
+
+
+class Command(BaseCommand):
+    help = ('Открывает отложенные публикации, время которых наступило, '
+            'и ставит задачу на следующую. Годится для cron и для '
+            'запуска после простоя воркера.')
+
+    def handle(self, *args, **options):
+        published = publish_due_posts()
+        next_pub_date = schedule_next_publication()
+        self.stdout.write(self.style.SUCCESS(
+            f'Открыто публикаций: {published}. Следующая: '
+            f'{next_pub_date or "нет"}.'
+        ))
@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from blog.models import ArchiveMonth, Category, Post
+
+
+class Command(BaseCommand):
+    help = ('Пересчитывает денормализованные данные: видимость '
+            'публикаций, архив по месяцам и число публикаций в категориях.')
+
+    def handle(self, *args, **options):
+        changed = Post.objects.recompute_visibility()
+        ArchiveMonth.rebuild()
+        Category.rebuild_posts_count()
+        self.stdout.write(self.style.SUCCESS(
+            f'Счётчики пересчитаны, видимость изменена у {changed} '
+            f'публикаций.'
+        ))
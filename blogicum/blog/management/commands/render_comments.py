@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from blog.models import Comment
+
+
+class Command(BaseCommand):
+    help = ('Перестраивает сохранённый HTML комментариев после изменения '
+            'правил отображения.')
+
+    def handle(self, *args, **options):
+        rendered = Comment.objects.render_stale()
+        self.stdout.write(self.style.SUCCESS(
+            f'Обновлено комментариев: {rendered}.'
+        ))
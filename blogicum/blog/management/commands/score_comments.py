@@ -0,0 +1,38 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from blog.spam import SpamScoringWorker
+
+
+class Command(BaseCommand):
+    help = ('Оценивает ожидающие комментарии на спам и публикует их '
+            'или отправляет в карантин.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=100)
+        parser.add_argument(
+            '--loop', action='store_true',
+            help='Не завершаться, а опрашивать очередь каждые --interval с.',
+        )
+        parser.add_argument('--interval', type=float, default=1.0)
+
+    def handle(self, *args, **options):
+        worker = SpamScoringWorker(batch_size=options['batch_size'])
+        while True:
+            if worker.drain():
+                self.stdout.write(self.format_metrics(worker.metrics))
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
+        self.stdout.write(self.style.SUCCESS(
+            self.format_metrics(worker.metrics)
+        ))
+
+    @staticmethod
+    def format_metrics(metrics):
+        return (
+            'Оценено: {scored}, опубликовано: {published}, в карантине: '
+            '{quarantined}, пачек: {batches}, {per_second} комм./с, '
+            'в очереди: {backlog}'.format(**metrics.snapshot())
+        )
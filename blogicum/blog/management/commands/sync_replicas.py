@@ -0,0 +1,42 @@
+import sqlite3
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections
+
+
+class Command(BaseCommand):
+    help = ('Копирует основную базу SQLite в файлы реплик из '
+            'DATABASE_REPLICAS: замена репликации для локальной проверки.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--loop', action='store_true',
+            help='Повторять копирование каждые --interval с, '
+                 'изображая отставание реплик.',
+        )
+        parser.add_argument('--interval', type=float, default=5.0)
+
+    def handle(self, *args, **options):
+        primary = connections[DEFAULT_DB_ALIAS]
+        if primary.vendor != 'sqlite':
+            raise CommandError('Основная база должна быть SQLite.')
+        targets = []
+        for alias in settings.DATABASE_REPLICAS:
+            replica = settings.DATABASES[alias]
+            if not replica['ENGINE'].endswith('sqlite3'):
+                raise CommandError(f'Реплика {alias} должна быть SQLite.')
+            targets.append((alias, replica['NAME']))
+        if not targets:
+            raise CommandError('В DATABASE_REPLICAS нет реплик.')
+        while True:
+            primary.ensure_connection()
+            for alias, name in targets:
+                with sqlite3.connect(name) as target:
+                    primary.connection.backup(target)
+                target.close()
+                self.stdout.write(f'{alias}: скопировано в {name}')
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
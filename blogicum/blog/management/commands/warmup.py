@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from blogicum.warmup import warm_up
+
+
+class Command(BaseCommand):
+    help = ('Импортирует view, перебирает именованные URL, компилирует '
+            'шаблоны и один раз выполняет view ленты, категорий '
+            'и автодополнения.')
+
+    def handle(self, *args, **options):
+        steps = warm_up()
+        for step, elapsed, result in steps:
+            self.stdout.write(
+                f'{step:<10} {elapsed * 1000:>8.1f} мс  {result}'
+            )
+        _, broken = dict(
+            (step, result) for step, _, result in steps
+        ).get('templates', (0, []))
+        if broken:
+            raise CommandError(
+                'Не компилируются шаблоны: ' + ', '.join(broken)
+            )
+        self.stdout.write(self.style.SUCCESS('Прогрев завершён.'))
@@ -0,0 +1,26 @@
+# Generated by Django 3.2.16 on 2026-10-19 02:13
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0006_post_views'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PostVisitorSketch',
+            fields=[
+                ('post', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='visitor_sketch', serialize=False, to='blog.post', verbose_name='Публикация')),
+                ('registers', models.BinaryField(verbose_name='Регистры HyperLogLog')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Обновлено')),
+            ],
+            options={
+                'verbose_name': 'оценка уникальных читателей',
+                'verbose_name_plural': 'Оценки уникальных читателей',
+            },
+        ),
+    ]
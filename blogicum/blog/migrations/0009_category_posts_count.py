@@ -0,0 +1,33 @@
+# Generated by Django 3.2.16 on 2026-10-19 02:17
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def fill_posts_count(apps, schema_editor):
+    Category = apps.get_model('blog', 'Category')
+    Post = apps.get_model('blog', 'Post')
+    Category.objects.update(posts_count=Coalesce(Subquery(
+        Post.objects.filter(
+            category=OuterRef('pk'), is_published=True
+        ).order_by().values('category').annotate(
+            total=Count('id')
+        ).values('total')
+    ), 0))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0008_auto_20261019_0214'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='category',
+            name='posts_count',
+            field=models.IntegerField(default=0, editable=False, verbose_name='Число публикаций'),
+        ),
+        migrations.RunPython(fill_posts_count, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 3.2.16 on 2026-10-19 02:28
+
+from django.db import migrations, models
+from django.template.defaultfilters import linebreaksbr
+
+
+def fill_rendered_text(apps, schema_editor):
+    Comment = apps.get_model('blog', 'Comment')
+    comments = list(Comment.objects.only('id', 'text'))
+    for comment in comments:
+        comment.rendered_text = {
+            'version': 1,
+            'html': str(linebreaksbr(comment.text, autoescape=True)),
+        }
+    Comment.objects.bulk_update(comments, ['rendered_text'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0012_auto_20261019_0224'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='comment',
+            name='rendered_text',
+            field=models.JSONField(default=dict, editable=False, verbose_name='Текст в HTML'),
+        ),
+        migrations.RunPython(fill_rendered_text, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 3.2.16 on 2026-10-19 02:29
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0013_comment_rendered_text'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='comment',
+            index=models.Index(fields=['author', 'created_at'], name='blog_commen_author__9faedb_idx'),
+        ),
+    ]
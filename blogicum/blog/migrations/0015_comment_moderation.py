@@ -0,0 +1,36 @@
+# Generated by Django 3.2.16 on 2026-10-19 02:30
+
+from django.db import migrations, models
+
+
+def approve_existing_comments(apps, schema_editor):
+    # Комментарии, оставленные до появления проверки, считаются одобренными.
+    Comment = apps.get_model('blog', 'Comment')
+    Comment.objects.update(moderation_status=1)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0014_comment_blog_commen_author__9faedb_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='comment',
+            name='moderation_status',
+            field=models.PositiveSmallIntegerField(choices=[(0, 'Ожидает проверки'), (1, 'Одобрен'), (2, 'В карантине')], default=0, editable=False, verbose_name='Проверка на спам'),
+        ),
+        migrations.AddField(
+            model_name='comment',
+            name='spam_score',
+            field=models.FloatField(blank=True, editable=False, null=True, verbose_name='Оценка спама'),
+        ),
+        migrations.AddIndex(
+            model_name='comment',
+            index=models.Index(fields=['moderation_status', 'id'], name='blog_commen_moderat_4ebcfd_idx'),
+        ),
+        migrations.RunPython(
+            approve_existing_comments, migrations.RunPython.noop
+        ),
+    ]
@@ -0,0 +1,71 @@
+# Generated by Django 3.2.16 on 2026-10-19 02:53
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce, TruncMonth
+from django.utils import timezone
+
+
+def fill_visibility(apps, schema_editor):
+    # Счётчики архива и категорий теперь учитывают только видимые
+    # публикации, поэтому пересчитываются вместе с флагом.
+    Post = apps.get_model('blog', 'Post')
+    Category = apps.get_model('blog', 'Category')
+    ArchiveMonth = apps.get_model('blog', 'ArchiveMonth')
+    Task = apps.get_model('tasks', 'Task')
+    now = timezone.now()
+    scheduled = Post.objects.filter(
+        is_published=True, category__is_published=True
+    )
+    Post.objects.filter(
+        pk__in=scheduled.filter(pub_date__lte=now).values('pk')
+    ).update(is_visible=True)
+    visible = Post.objects.filter(is_visible=True)
+    Category.objects.update(posts_count=Coalesce(Subquery(
+        visible.filter(
+            category=OuterRef('pk')
+        ).order_by().values('category').annotate(
+            total=Count('id')
+        ).values('total')
+    ), 0))
+    ArchiveMonth.objects.all().delete()
+    ArchiveMonth.objects.bulk_create(
+        ArchiveMonth(
+            year=row['month_start'].year,
+            month=row['month_start'].month,
+            posts_count=row['total'],
+        )
+        for row in visible.annotate(
+            month_start=TruncMonth('pub_date')
+        ).values('month_start').annotate(total=Count('id'))
+    )
+    next_pub_date = scheduled.filter(pub_date__gt=now).order_by(
+        'pub_date'
+    ).values_list('pub_date', flat=True).first()
+    if next_pub_date is not None:
+        Task.objects.create(
+            name='blog.scheduling.publish_due_posts',
+            arguments={'args': [], 'kwargs': {}},
+            run_at=next_pub_date,
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0015_comment_moderation'),
+        ('tasks', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='is_visible',
+            field=models.BooleanField(default=False, editable=False, help_text='Публикация и её категория опубликованы, а время публикации наступило.', verbose_name='Видна читателям'),
+        ),
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(condition=models.Q(('is_published', True), ('is_visible', False)), fields=['pub_date'], name='blog_post_due_idx'),
+        ),
+        migrations.RunPython(fill_visibility, migrations.RunPython.noop),
+    ]
@@ -1,17 +1,67 @@
-from django.db import models
-from django.db.models import Count
+import datetime
+
+from django.db import connections, models, transaction
+from django.db.models import (
+    Count, F, OuterRef, Q, Subquery, Value, Window
+)
+from django.db.models.expressions import RawSQL
+from django.db.models.functions import (
+    Coalesce, Concat, RowNumber, Substr, TruncMonth
+)
 from django.contrib.auth import get_user_model
+from django.template.defaultfilters import linebreaksbr
 from django.urls import reverse
 from django.utils import timezone
+from django.utils.safestring import mark_safe
+
+from .hyperloglog import HyperLogLog
 
 
 MAX_FIELD_LENGTH = 256
 STR_REPR_LENGTH = 15
+# Путь комментария — id предков и его собственный id фиксированной ширины
+# через точку, поэтому сортировка по пути совпадает с обходом дерева.
+PATH_SEGMENT_LENGTH = 10
+PATH_SEPARATOR = '.'
+PATH_UPPER_BOUND = chr(ord(PATH_SEPARATOR) + 1)
+MAX_THREAD_DEPTH = 20
+BULK_CHUNK_SIZE = 400
+# Увеличивается при любом изменении render_comment_text: сохранённый
+# HTML старой версии перестраивается при показе и командой render_comments.
+COMMENT_RENDER_VERSION = 1
 
 User = get_user_model()
 
 
-class PostsForPageManager(models.Manager):
+class PostQuerySet(models.QuerySet):
+    def visible(self):
+        return self.filter(is_visible=True)
+
+    def visible_to(self, user):
+        if user is None or not user.is_authenticated:
+            return self.visible()
+        return self.filter(Q(is_visible=True) | Q(author=user))
+
+    def recompute_visibility(self):
+        """Пересчитывает is_visible двумя запросами UPDATE.
+
+        Нужен, если публикации или категории менялись в обход save(),
+        например через update() или loaddata. Сигналы не отправляются,
+        поэтому счётчики после него перестраиваются отдельно.
+        """
+        visible = Q(
+            is_published=True,
+            category__is_published=True,
+            pub_date__lte=timezone.now(),
+        )
+        shown = self.filter(visible, is_visible=False).update(is_visible=True)
+        hidden = self.filter(is_visible=True).exclude(visible).update(
+            is_visible=False
+        )
+        return shown + hidden
+
+
+class PostsForPageManager(models.Manager.from_queryset(PostQuerySet)):
     def get_queryset(self):
         return super().get_queryset().select_related(
             'category',
@@ -20,15 +70,14 @@ class PostsForPageManager(models.Manager):
         )
 
     def get_posts_queryset(self, is_today_posts=False, is_annotate=False):
-        today = timezone.now()
         queryset = self.get_queryset()
         if is_today_posts:
-            queryset = queryset.filter(pub_date__lte=today,
-                                       is_published=True,
-                                       category__is_published=True,)
+            queryset = queryset.visible()
         if is_annotate:
             queryset = queryset.annotate(
-                comment_count=Count('comments')
+                comment_count=Count(
+                    'comments', filter=Q(comments__is_published=True)
+                )
             ).order_by('-pub_date')
         return queryset
 
@@ -72,6 +121,11 @@ class Category(PublishedModel):
         help_text=('Идентификатор страницы для URL; '
                    'разрешены символы латиницы, цифры, дефис и подчёркивание.')
     )
+    posts_count = models.IntegerField(
+        default=0,
+        editable=False,
+        verbose_name='Число публикаций',
+    )
 
     class Meta:
         verbose_name = 'категория'
@@ -80,6 +134,32 @@ class Category(PublishedModel):
     def __str__(self) -> str:
         return self.title[:STR_REPR_LENGTH]
 
+    def save(self, *args, **kwargs):
+        # posts_count меняют только запросы UPDATE, и сохранение
+        # загруженного ранее экземпляра не должно его затирать.
+        if not self._state.adding and kwargs.get('update_fields') is None:
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name != 'posts_count'
+            ]
+        super().save(*args, **kwargs)
+
+    @classmethod
+    def adjust_posts_count(cls, category_id, delta):
+        cls.objects.filter(pk=category_id).update(
+            posts_count=F('posts_count') + delta
+        )
+
+    @classmethod
+    def rebuild_posts_count(cls):
+        cls.objects.update(posts_count=Coalesce(Subquery(
+            Post.objects.filter(
+                category=OuterRef('pk'), is_visible=True
+            ).order_by().values('category').annotate(
+                total=Count('id')
+            ).values('total')
+        ), 0))
+
 
 class Post(PublishedModel):
     title = models.CharField(
@@ -118,14 +198,35 @@ class Post(PublishedModel):
         verbose_name='Категория',
         related_name='posts',
     )
+    views = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name='Просмотры',
+    )
+    is_visible = models.BooleanField(
+        default=False,
+        editable=False,
+        verbose_name='Видна читателям',
+        help_text=('Публикация и её категория опубликованы, а время '
+                   'публикации наступило.'),
+    )
 
-    objects = models.Manager()
+    objects = PostQuerySet.as_manager()
     for_page = PostsForPageManager()
 
     class Meta:
         verbose_name = 'публикация'
         verbose_name_plural = 'Публикации'
         ordering = ['-pub_date']
+        indexes = (
+            models.Index(fields=('is_visible', 'pub_date')),
+            # Отложенные публикации, которые ждут своего времени.
+            models.Index(
+                fields=('pub_date',),
+                condition=Q(is_visible=False, is_published=True),
+                name='blog_post_due_idx',
+            ),
+        )
 
     def __str__(self) -> str:
         return self.title[:STR_REPR_LENGTH]
@@ -133,24 +234,333 @@ class Post(PublishedModel):
     def get_absolute_url(self):
         return reverse('blog:post_detail', kwargs={'post_id': self.pk})
 
+    def compute_visibility(self):
+        return bool(
+            self.is_published
+            and self.category is not None
+            and self.category.is_published
+            and self.pub_date <= timezone.now()
+        )
+
+    def is_visible_to(self, user):
+        return self.is_visible or (
+            user is not None and self.author_id == user.pk
+        )
+
+
+def make_path(parent, pk):
+    segment = f'{pk:0{PATH_SEGMENT_LENGTH}d}'
+    if parent is None:
+        return segment
+    return parent.path + PATH_SEPARATOR + segment
+
 
-class Comment(models.Model):
+class CommentQuerySet(models.QuerySet):
+    def published(self):
+        return self.filter(is_published=True)
+
+    def update_in_chunks(self, chunk_size=BULK_CHUNK_SIZE, **values):
+        pks = list(self.values_list('pk', flat=True))
+        updated = 0
+        for start in range(0, len(pks), chunk_size):
+            updated += self.model.objects.filter(
+                pk__in=pks[start:start + chunk_size]
+            ).update(**values)
+        return updated
+
+    def pending_moderation(self):
+        return self.filter(moderation_status=ModerationStatus.PENDING)
+
+    def stale_rendered(self):
+        return self.exclude(rendered_text__version=COMMENT_RENDER_VERSION)
+
+    def render_stale(self, chunk_size=BULK_CHUNK_SIZE):
+        """Перестраивает HTML комментариев, сохранённый старой версией."""
+        rendered = 0
+        last_pk = 0
+        while True:
+            comments = list(self.stale_rendered().filter(
+                pk__gt=last_pk
+            ).order_by('pk').only('pk', 'text')[:chunk_size])
+            if not comments:
+                return rendered
+            for comment in comments:
+                comment.rendered_text = render_comment_text(comment.text)
+            self.model.objects.bulk_update(comments, ['rendered_text'])
+            rendered += len(comments)
+            last_pk = comments[-1].pk
+
+    def delete_with_replies(self, chunk_size=BULK_CHUNK_SIZE):
+        """Удаляет комментарии вместе с ветками ответов.
+
+        Ветки отбираются по диапазонам путей пачками по chunk_size
+        корней и удаляются обычным delete(): сигналы и каскады
+        срабатывают как при удалении из админки. Возвращает число
+        удалённых комментариев.
+        """
+        deleted = 0
+        while True:
+            paths = list(self.values_list('path', flat=True)[:chunk_size])
+            if not paths:
+                return deleted
+            in_subtrees = Q()
+            for path in paths:
+                in_subtrees |= Q(
+                    path__gte=path, path__lt=path + PATH_UPPER_BOUND
+                )
+            _, per_model = self.model.objects.filter(in_subtrees).delete()
+            deleted += per_model.get(self.model._meta.label, 0)
+
+    def roots(self):
+        return self.filter(parent__isnull=True)
+
+    def subtree(self, comment, after_path=''):
+        return self.filter(
+            path__gt=max(after_path, comment.path + PATH_SEPARATOR),
+            path__lt=comment.path + PATH_UPPER_BOUND,
+        ).order_by('path')
+
+    def with_replies_count(self):
+        replies = self.model.objects.published().filter(
+            path__gt=Concat(OuterRef('path'), Value(PATH_SEPARATOR)),
+            path__lt=Concat(OuterRef('path'), Value(PATH_UPPER_BOUND)),
+        ).order_by().values('post').annotate(total=Count('id'))
+        return self.annotate(
+            replies_count=Coalesce(Subquery(replies.values('total')), 0)
+        )
+
+    def first_replies(self, roots, limit):
+        """Первые limit ответов в каждой из веток roots одним запросом.
+
+        Позицию ответа в ветке считает оконная функция ROW_NUMBER по
+        первому сегменту пути: ответы каждой ветки читаются по индексу
+        path один раз. В Django 3.2 по оконной аннотации нельзя
+        фильтровать, поэтому отбор по позиции — во внешнем подзапросе.
+        """
+        if not roots:
+            return self.none()
+        in_threads = Q()
+        for root in roots:
+            in_threads |= Q(
+                path__gt=root.path + PATH_SEPARATOR,
+                path__lt=root.path + PATH_UPPER_BOUND,
+            )
+        ranked = self.filter(in_threads).order_by().annotate(
+            position=Window(
+                RowNumber(),
+                partition_by=Substr('path', 1, PATH_SEGMENT_LENGTH),
+                order_by=F('path').asc(),
+            )
+        ).values('pk', 'position')
+        sql, params = ranked.query.get_compiler(using=self.db).as_sql()
+        quote_name = connections[self.db].ops.quote_name
+        return self.filter(pk__in=RawSQL(
+            f'SELECT {quote_name("id")} FROM ({sql}) ranked '
+            f'WHERE {quote_name("position")} <= %s',
+            (*params, limit),
+        )).order_by('path')
+
+
+def render_comment_text(text):
+    return {
+        'version': COMMENT_RENDER_VERSION,
+        'html': str(linebreaksbr(text, autoescape=True)),
+    }
+
+
+class ModerationStatus(models.IntegerChoices):
+    PENDING = 0, 'Ожидает проверки'
+    APPROVED = 1, 'Одобрен'
+    QUARANTINED = 2, 'В карантине'
+
+
+class Comment(PublishedModel):
     text = models.TextField(verbose_name='Комментарий')
     post = models.ForeignKey(
         Post,
         on_delete=models.CASCADE,
         related_name='comments'
     )
-    created_at = models.DateTimeField(auto_now_add=True)
     author = models.ForeignKey(
         User,
         on_delete=models.CASCADE,
         related_name='comments')
+    parent = models.ForeignKey(
+        'self',
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name='replies',
+        verbose_name='Ответ на комментарий',
+    )
+    path = models.CharField(
+        max_length=MAX_FIELD_LENGTH,
+        default='',
+        db_index=True,
+        editable=False,
+        verbose_name='Путь в ветке',
+    )
+    rendered_text = models.JSONField(
+        default=dict,
+        editable=False,
+        verbose_name='Текст в HTML',
+    )
+    moderation_status = models.PositiveSmallIntegerField(
+        choices=ModerationStatus.choices,
+        default=ModerationStatus.PENDING,
+        editable=False,
+        verbose_name='Проверка на спам',
+    )
+    spam_score = models.FloatField(
+        null=True,
+        blank=True,
+        editable=False,
+        verbose_name='Оценка спама',
+    )
+
+    objects = CommentQuerySet.as_manager()
 
     class Meta:
         verbose_name = 'комментарий'
         verbose_name_plural = 'Комментарии'
         ordering = ['created_at']
+        indexes = (
+            models.Index(fields=('post', 'created_at', 'id')),
+            models.Index(fields=('author', 'created_at')),
+            models.Index(fields=('moderation_status', 'id')),
+        )
 
     def __str__(self) -> str:
         return self.text[:STR_REPR_LENGTH]
+
+    @property
+    def depth(self):
+        return self.path.count(PATH_SEPARATOR)
+
+    @property
+    def text_html(self):
+        if self.rendered_text.get('version') != COMMENT_RENDER_VERSION:
+            self.rendered_text = render_comment_text(self.text)
+        return mark_safe(self.rendered_text['html'])
+
+    def save(self, *args, **kwargs):
+        is_new = self.pk is None
+        update_fields = kwargs.get('update_fields')
+        if update_fields is None or 'text' in update_fields:
+            self.rendered_text = render_comment_text(self.text)
+            if update_fields is not None:
+                kwargs['update_fields'] = {*update_fields, 'rendered_text'}
+        if is_new and self.parent is not None:
+            # Слишком глубокие ответы прикрепляются к предку
+            # на предельной глубине, чтобы путь уместился в поле.
+            while self.parent.depth >= MAX_THREAD_DEPTH:
+                self.parent = self.parent.parent
+        # Без пути комментарий выпал бы из всех веток, поэтому вставка
+        # и запись пути идут в одной транзакции.
+        with transaction.atomic(using=kwargs.get('using')):
+            super().save(*args, **kwargs)
+            if is_new:
+                self.path = make_path(self.parent, self.pk)
+                Comment.objects.filter(pk=self.pk).update(path=self.path)
+
+
+class ArchiveMonth(models.Model):
+    year = models.PositiveSmallIntegerField(verbose_name='Год')
+    month = models.PositiveSmallIntegerField(verbose_name='Месяц')
+    posts_count = models.IntegerField(
+        default=0,
+        verbose_name='Число публикаций',
+    )
+
+    class Meta:
+        verbose_name = 'месяц архива'
+        verbose_name_plural = 'Архив по месяцам'
+        ordering = ['-year', '-month']
+        constraints = (
+            models.UniqueConstraint(
+                fields=('year', 'month'), name='unique_archive_month'
+            ),
+        )
+
+    def __str__(self) -> str:
+        return f'{self.month:02}.{self.year}'
+
+    @property
+    def as_date(self):
+        return datetime.date(self.year, self.month, 1)
+
+    @classmethod
+    def rebuild(cls):
+        months = Post.objects.filter(is_visible=True).annotate(
+            month_start=TruncMonth('pub_date')
+        ).values('month_start').annotate(total=Count('id'))
+        cls.objects.all().delete()
+        cls.objects.bulk_create(
+            cls(
+                year=row['month_start'].year,
+                month=row['month_start'].month,
+                posts_count=row['total'],
+            )
+            for row in months
+        )
+
+    @classmethod
+    def adjust(cls, year, month, delta):
+        if not delta:
+            return
+        cls.objects.get_or_create(year=year, month=month)
+        cls.objects.filter(year=year, month=month).update(
+            posts_count=F('posts_count') + delta
+        )
+
+
+class PostVisitorSketch(models.Model):
+    post = models.OneToOneField(
+        Post,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='visitor_sketch',
+        verbose_name='Публикация',
+    )
+    registers = models.BinaryField(verbose_name='Регистры HyperLogLog')
+    updated_at = models.DateTimeField(auto_now=True, verbose_name='Обновлено')
+
+    class Meta:
+        verbose_name = 'оценка уникальных читателей'
+        verbose_name_plural = 'Оценки уникальных читателей'
+
+    def __str__(self) -> str:
+        return str(self.post_id)
+
+    @property
+    def sketch(self):
+        return HyperLogLog.from_bytes(self.registers)
+
+
+class DataVersion(models.Model):
+    """Счётчик изменений данных, общий для всех процессов."""
+
+    key = models.CharField(
+        max_length=MAX_FIELD_LENGTH,
+        primary_key=True,
+        verbose_name='Ключ',
+    )
+    version = models.PositiveIntegerField(default=0, verbose_name='Версия')
+
+    class Meta:
+        verbose_name = 'версия данных'
+        verbose_name_plural = 'Версии данных'
+
+    def __str__(self) -> str:
+        return f'{self.key}: {self.version}'
+
+    @classmethod
+    def get(cls, key):
+        return cls.objects.filter(key=key).values_list(
+            'version', flat=True
+        ).first() or 0
+
+    @classmethod
+    def bump(cls, key):
+        cls.objects.get_or_create(key=key)
+        cls.objects.filter(key=key).update(version=F('version') + 1)
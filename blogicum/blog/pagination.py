@@ -0,0 +1,68 @@
+import base64
+import binascii
+import datetime
+from collections import defaultdict
+
+from django.db.models import Q
+
+from .models import PATH_SEPARATOR
+
+
+def encode_cursor(item):
+    raw = f'{item.created_at.isoformat()}|{item.pk}'
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def decode_cursor(cursor):
+    try:
+        created_at, pk = base64.urlsafe_b64decode(
+            cursor.encode()
+        ).decode().split('|')
+        return datetime.datetime.fromisoformat(created_at), int(pk)
+    except (binascii.Error, UnicodeError, ValueError):
+        raise ValueError(f'Некорректный курсор: {cursor!r}')
+
+
+def after_cursor(queryset, cursor):
+    if not cursor:
+        return queryset
+    created_at, pk = decode_cursor(cursor)
+    return queryset.filter(
+        Q(created_at__gt=created_at) | Q(created_at=created_at, id__gt=pk)
+    )
+
+
+def latest_cursor(queryset):
+    latest = queryset.order_by('-created_at', '-id').only(
+        'id', 'created_at'
+    ).first()
+    return encode_cursor(latest) if latest else ''
+
+
+def keyset_page(queryset, after=None, size=20):
+    """Страница по ключу (created_at, id), начиная после курсора after.
+
+    В отличие от OFFSET стоимость запроса не растёт с номером страницы:
+    выборка начинается прямо с позиции курсора в индексе.
+    """
+    queryset = after_cursor(queryset.order_by('created_at', 'id'), after)
+    items = list(queryset[:size + 1])
+    next_cursor = encode_cursor(items[size - 1]) if len(items) > size else None
+    return items[:size], next_cursor
+
+
+def thread_page(queryset, after=None, size=20, replies_limit=3):
+    """Страница корневых комментариев с первыми ответами в каждой ветке.
+
+    Всего два запроса независимо от числа веток: корни с числом ответов
+    и первые replies_limit ответов всех веток страницы.
+    """
+    roots, next_cursor = keyset_page(
+        queryset.roots().with_replies_count(), after, size
+    )
+    replies = defaultdict(list)
+    for reply in queryset.first_replies(roots, replies_limit):
+        replies[reply.path.split(PATH_SEPARATOR, 1)[0]].append(reply)
+    for root in roots:
+        root.preview_replies = replies[root.path]
+    return roots, next_cursor
@@ -0,0 +1,111 @@
+import math
+import time
+
+from django.conf import settings
+from django.core.cache import InvalidCacheBackendError, caches
+from django.core.cache.backends.locmem import LocMemCache
+
+from pages.views import too_many_requests
+
+
+_local_cache = LocMemCache('blog-ratelimit', {})
+
+
+def get_cache():
+    try:
+        return caches[settings.RATELIMIT_CACHE_ALIAS]
+    except InvalidCacheBackendError:
+        return _local_cache
+
+
+# Сколько раз перечитать состояние, если его одновременно меняют другие.
+MAX_ATTEMPTS = 20
+MICROSECONDS = 1_000_000
+
+
+class TokenBucket:
+    """Корзина токенов: capacity запросов подряд, затем rate в секунду.
+
+    Считается по алгоритму GCRA: в кеше хранится теоретическое время
+    прихода (TAT) — момент, когда корзина снова будет полной. Запрос
+    разрешён, если после него TAT опережает текущее время не больше
+    чем на capacity интервалов.
+
+    В кеше Django нет compare-and-set, поэтому переход TAT от old к new
+    закрепляет ключ f'{key}:{old}', созданный атомарным add(): создать
+    его может только один процесс, остальные читают из него новый TAT
+    и пробуют снова. В key лежит последний известный TAT, с которого
+    начинается поиск. Лимит общий для процессов, если add() атомарный
+    (Memcached, Redis). Если кеш недоступен, лимит считается по
+    локальной памяти процесса.
+    """
+
+    def __init__(self, capacity, rate):
+        self.capacity = capacity
+        self.rate = rate
+        self.interval = round(MICROSECONDS / rate)
+        self.burst = capacity * self.interval
+        # Когда TAT прошёл, состояние не нужно: корзина снова полная.
+        self.timeout = math.ceil(self.burst / MICROSECONDS) + 1
+
+    def consume(self, key, now=None):
+        """Возвращает 0, если запрос разрешён, иначе секунды до токена."""
+        now = time.time() if now is None else now
+        try:
+            return self._consume(get_cache(), key, now)
+        except Exception:
+            return self._consume(_local_cache, key, now)
+
+    def _consume(self, cache, key, now):
+        now = round(now * MICROSECONDS)
+        tat = cache.get(key, 0)
+        for _ in range(MAX_ATTEMPTS):
+            newer = cache.get(f'{key}:{tat}')
+            if newer is not None:
+                tat = newer
+                continue
+            new_tat = max(tat, now) + self.interval
+            if new_tat - now > self.burst:
+                return (new_tat - now - self.burst) / MICROSECONDS
+            if cache.add(f'{key}:{tat}', new_tat, self.timeout):
+                cache.set(key, new_tat, self.timeout)
+                return 0
+        # Ключ меняют слишком часто: запрос подождёт один интервал.
+        return self.interval / MICROSECONDS
+
+
+def client_ip(request):
+    return request.META.get('REMOTE_ADDR', '')
+
+
+def check_rate_limit(request, scope):
+    """Списывает токены пользователя и IP; возвращает время ожидания."""
+    if not settings.RATELIMIT_ENABLED:
+        return 0
+    rules = settings.RATELIMIT_RULES[scope]
+    keys = [('ip', client_ip(request))]
+    if request.user.is_authenticated:
+        keys.append(('user', request.user.pk))
+    wait = 0
+    for kind, identity in keys:
+        capacity, per_minute = rules[kind]
+        bucket = TokenBucket(capacity, per_minute / 60)
+        wait = max(wait, bucket.consume(
+            f'ratelimit:{scope}:{kind}:{identity}'
+        ))
+    return wait
+
+
+class RateLimitMixin:
+    """Отклоняет лишние POST-запросы с кодом 429 до работы с базой."""
+
+    ratelimit_scope = None
+
+    def dispatch(self, request, *args, **kwargs):
+        if request.method == 'POST':
+            wait = check_rate_limit(request, self.ratelimit_scope)
+            if wait:
+                response = too_many_requests(request)
+                response['Retry-After'] = math.ceil(wait)
+                return response
+        return super().dispatch(request, *args, **kwargs)
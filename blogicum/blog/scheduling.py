@@ -0,0 +1,102 @@
+from collections import Counter
+
+from django.db import connection, transaction
+from django.urls import reverse
+from django.utils import timezone
+
+from tasks.models import Task, TaskStatus
+from tasks.queue import enqueue, task_name
+
+from . import events
+from .models import BULK_CHUNK_SIZE, ArchiveMonth, Category, Post
+
+
+def archive_month_of(pub_date):
+    pub_date = timezone.localtime(pub_date)
+    return pub_date.year, pub_date.month
+
+
+def adjust_counts(rows, sign):
+    """Поправляет счётчики архива и категорий на видимые публикации."""
+    months = Counter(archive_month_of(row['pub_date']) for row in rows)
+    for (year, month), total in months.items():
+        ArchiveMonth.adjust(year, month, sign * total)
+    categories = Counter(
+        row['category_id'] for row in rows if row['category_id']
+    )
+    for category_id, total in categories.items():
+        Category.adjust_posts_count(category_id, sign * total)
+
+
+def publish_post_event(post_id, title):
+    events.publish(events.POSTS_CHANNEL, 'post', {
+        'id': post_id,
+        'title': title,
+        'url': reverse('blog:post_detail', kwargs={'post_id': post_id}),
+    })
+
+
+def set_visibility(posts, visible):
+    """Переключает is_visible у публикаций из posts.
+
+    Обновляются только строки, у которых флаг меняется, поэтому
+    повторный вызов ничего не испортит. Счётчики архива и категорий
+    поправляются, а о появившихся публикациях уходит событие в ленту.
+    Возвращает число изменённых публикаций.
+    """
+    features = connection.features
+    with transaction.atomic():
+        rows = list(posts.exclude(is_visible=visible).select_for_update(
+            of=('self',) if features.has_select_for_update_of else (),
+        ).values('pk', 'title', 'category_id', 'pub_date'))
+        for start in range(0, len(rows), BULK_CHUNK_SIZE):
+            Post.objects.filter(pk__in=[
+                row['pk'] for row in rows[start:start + BULK_CHUNK_SIZE]
+            ]).update(is_visible=visible)
+        adjust_counts(rows, 1 if visible else -1)
+    if visible:
+        for row in rows:
+            publish_post_event(row['pk'], row['title'])
+    return len(rows)
+
+
+def due_posts(now=None):
+    return Post.objects.filter(
+        is_visible=False,
+        is_published=True,
+        category__is_published=True,
+        pub_date__lte=now or timezone.now(),
+    )
+
+
+def schedule_publication(run_at):
+    """Ставит задачу publish_due_posts на run_at, если раньше её нет."""
+    name = task_name(publish_due_posts)
+    if not Task.objects.filter(
+        name=name, status=TaskStatus.QUEUED, run_at__lte=run_at
+    ).exists():
+        enqueue(name, run_at=run_at)
+
+
+def schedule_next_publication():
+    next_pub_date = Post.objects.filter(
+        is_visible=False,
+        is_published=True,
+        category__is_published=True,
+        pub_date__gt=timezone.now(),
+    ).order_by('pub_date').values_list('pub_date', flat=True).first()
+    if next_pub_date is not None:
+        schedule_publication(next_pub_date)
+    return next_pub_date
+
+
+def publish_due_posts():
+    """Открывает все публикации, время которых наступило.
+
+    Задача берёт все просроченные публикации, а не одну, поэтому
+    пропущенные за время простоя запуски догоняются первым же
+    выполнением. В конце ставится задача на следующую публикацию.
+    """
+    published = set_visibility(due_posts(), True)
+    schedule_next_publication()
+    return published
@@ -0,0 +1,107 @@
+from django.db.models.signals import (
+    post_delete, post_save, pre_delete, pre_save
+)
+from django.dispatch import receiver
+from django.utils import timezone
+
+from . import autocomplete, events, scheduling
+from .models import Category, Comment, Location, Post
+
+
+@receiver(pre_save, sender=Post)
+def remember_post_state(sender, instance, raw=False, **kwargs):
+    instance._old_state = None
+    if raw:
+        return
+    if instance.pk is not None:
+        instance._old_state = Post.objects.filter(pk=instance.pk).values(
+            'is_visible', 'category_id', 'pub_date',
+        ).first()
+    instance.is_visible = instance.compute_visibility()
+
+
+@receiver(post_save, sender=Post)
+def update_counts_on_post_save(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    old = getattr(instance, '_old_state', None)
+    if old and old['is_visible']:
+        scheduling.adjust_counts([old], -1)
+    if instance.is_visible:
+        scheduling.adjust_counts([{
+            'category_id': instance.category_id,
+            'pub_date': instance.pub_date,
+        }], 1)
+
+
+@receiver(post_save, sender=Post)
+def publish_post_event(sender, instance, raw=False, **kwargs):
+    if raw or not instance.is_visible:
+        return
+    old = getattr(instance, '_old_state', None)
+    if old and old['is_visible']:
+        return
+    scheduling.publish_post_event(instance.pk, instance.title)
+
+
+@receiver(post_save, sender=Post)
+def schedule_post_publication(sender, instance, raw=False, **kwargs):
+    if (raw or instance.is_visible or not instance.is_published
+            or instance.pub_date <= timezone.now()):
+        return
+    scheduling.schedule_publication(instance.pub_date)
+
+
+@receiver(post_save, sender=Comment)
+def publish_comment_event(sender, instance, created, raw=False, **kwargs):
+    if raw or not created or not instance.is_published:
+        return
+    events.publish_comment(instance)
+
+
+@receiver(post_delete, sender=Post)
+def update_counts_on_post_delete(sender, instance, **kwargs):
+    if instance.is_visible:
+        scheduling.adjust_counts([{
+            'category_id': instance.category_id,
+            'pub_date': instance.pub_date,
+        }], -1)
+
+
+@receiver(pre_save, sender=Category)
+def remember_category_state(sender, instance, raw=False, **kwargs):
+    instance._was_published = None
+    if not raw and instance.pk is not None:
+        instance._was_published = Category.objects.filter(
+            pk=instance.pk
+        ).values_list('is_published', flat=True).first()
+
+
+@receiver(post_save, sender=Category)
+def update_posts_on_category_save(sender, instance, raw=False, **kwargs):
+    was_published = getattr(instance, '_was_published', None)
+    if raw or was_published is None:
+        return
+    if was_published == instance.is_published:
+        return
+    if instance.is_published:
+        scheduling.set_visibility(
+            scheduling.due_posts().filter(category=instance), True
+        )
+        scheduling.schedule_next_publication()
+    else:
+        scheduling.set_visibility(instance.posts.all(), False)
+
+
+@receiver(pre_delete, sender=Category)
+def update_posts_on_category_delete(sender, instance, **kwargs):
+    # Публикации останутся без категории и перестанут быть видны.
+    scheduling.set_visibility(instance.posts.all(), False)
+
+
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+@receiver(post_save, sender=Location)
+@receiver(post_delete, sender=Location)
+def invalidate_autocomplete(sender, **kwargs):
+    autocomplete.invalidate(sender)
@@ -0,0 +1,208 @@
+import datetime
+import logging
+import re
+import threading
+import time
+from collections import Counter
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from . import events
+from .models import Comment, ModerationStatus
+
+
+logger = logging.getLogger(__name__)
+
+LINK_PATTERN = re.compile(r'https?://|www\.', re.IGNORECASE)
+REPEAT_WINDOW = datetime.timedelta(days=1)
+
+
+def link_density(comment):
+    words = max(len(comment.text.split()), 1)
+    return min(len(LINK_PATTERN.findall(comment.text)) * 3 / words, 1.0)
+
+
+def new_account(comment):
+    age = timezone.now() - comment.author.date_joined
+    return 0.3 if age.total_seconds() < settings.SPAM_NEW_ACCOUNT_AGE else 0.0
+
+
+def repeated_texts(comments):
+    """Считает повторы текста одного автора за сутки одним запросом."""
+    repeats = Counter((c.author_id, c.text) for c in comments)
+    earlier = Comment.objects.filter(
+        author_id__in={c.author_id for c in comments},
+        text__in={c.text for c in comments},
+        created_at__gte=timezone.now() - REPEAT_WINDOW,
+    ).exclude(
+        pk__in=[c.pk for c in comments]
+    ).values_list('author_id', 'text')
+    repeats.update(earlier)
+    return {
+        comment.pk: min(0.4 * (repeats[comment.author_id, comment.text] - 1),
+                        1.0)
+        for comment in comments
+    }
+
+
+def get_classifier():
+    """Загружает классификатор из SPAM_CLASSIFIER.
+
+    Классификатор — вызываемый объект, который принимает список текстов
+    и возвращает вероятности спама в том же порядке.
+    """
+    if not settings.SPAM_CLASSIFIER:
+        return None
+    return import_string(settings.SPAM_CLASSIFIER)
+
+
+def score_comments(comments):
+    repeats = repeated_texts(comments)
+    classifier = get_classifier()
+    predictions = (
+        classifier([c.text for c in comments]) if classifier
+        else [0.0] * len(comments)
+    )
+    scores = {}
+    for comment, prediction in zip(comments, predictions):
+        ham = 1.0
+        for signal in (link_density(comment), new_account(comment),
+                       repeats[comment.pk], prediction):
+            ham *= 1.0 - signal
+        scores[comment.pk] = round(1.0 - ham, 4)
+    return scores
+
+
+def score_pending(batch_size):
+    """Оценивает пачку ожидающих комментариев.
+
+    Где база это поддерживает, строки захватываются с SKIP LOCKED,
+    и несколько обработчиков разбирают очередь, не мешая друг другу.
+    Возвращает счётчики оценённых, опубликованных и отправленных
+    в карантин комментариев.
+    """
+    features = connection.features
+    with transaction.atomic():
+        comments = list(
+            Comment.objects.pending_moderation().select_for_update(
+                skip_locked=features.has_select_for_update_skip_locked,
+                of=('self',) if features.has_select_for_update_of else (),
+            ).select_related('author').order_by('id')[:batch_size]
+        )
+        if not comments:
+            return Counter()
+        scores = score_comments(comments)
+        stats = Counter(scored=len(comments))
+        for comment in comments:
+            comment.spam_score = scores[comment.pk]
+            if comment.spam_score >= settings.SPAM_THRESHOLD:
+                comment.moderation_status = ModerationStatus.QUARANTINED
+                comment.is_published = False
+                stats['quarantined'] += 1
+            else:
+                if not comment.is_published:
+                    events.publish_comment(comment)
+                comment.moderation_status = ModerationStatus.APPROVED
+                comment.is_published = True
+                stats['published'] += 1
+        Comment.objects.bulk_update(
+            comments, ['spam_score', 'moderation_status', 'is_published']
+        )
+    return stats
+
+
+class ScoringMetrics:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.totals = Counter()
+        self.busy_seconds = 0.0
+        self.batches = 0
+
+    def record(self, stats, elapsed):
+        with self._lock:
+            self.totals.update(stats)
+            self.busy_seconds += elapsed
+            self.batches += 1
+
+    @property
+    def throughput(self):
+        if not self.busy_seconds:
+            return 0.0
+        return self.totals['scored'] / self.busy_seconds
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                'batches': self.batches,
+                'scored': self.totals['scored'],
+                'published': self.totals['published'],
+                'quarantined': self.totals['quarantined'],
+                'per_second': round(self.throughput, 1),
+                'backlog': Comment.objects.pending_moderation().count(),
+            }
+
+
+class SpamScoringWorker:
+    """Фоновый поток, который оценивает новые комментарии пачками.
+
+    Поток запускается при первом wake() и завершается, простояв
+    idle_timeout секунд без работы, поэтому простаивающий процесс
+    не держит лишних потоков и соединений с базой.
+    """
+
+    def __init__(self, batch_size=100, idle_timeout=60):
+        self.batch_size = batch_size
+        self.idle_timeout = idle_timeout
+        self.metrics = ScoringMetrics()
+        self._wakeup = threading.Event()
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def wake(self):
+        with self._lock:
+            self._wakeup.set()
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._run, name='spam-scoring', daemon=True
+                )
+                self._thread.start()
+
+    def run_once(self):
+        started = time.perf_counter()
+        stats = score_pending(self.batch_size)
+        if stats:
+            self.metrics.record(stats, time.perf_counter() - started)
+        return stats['scored']
+
+    def drain(self):
+        scored = 0
+        while True:
+            batch = self.run_once()
+            if not batch:
+                return scored
+            scored += batch
+
+    def _run(self):
+        try:
+            while True:
+                self._wakeup.wait(self.idle_timeout)
+                with self._lock:
+                    if not self._wakeup.is_set():
+                        self._thread = None
+                        return
+                    self._wakeup.clear()
+                try:
+                    self.drain()
+                except Exception:
+                    logger.exception('Ошибка при оценке комментариев')
+        finally:
+            connection.close()
+
+
+spam_worker = SpamScoringWorker(
+    batch_size=getattr(settings, 'SPAM_BATCH_SIZE', 100),
+    idle_timeout=getattr(settings, 'SPAM_WORKER_IDLE_TIMEOUT', 60),
+)
@@ -0,0 +1,19 @@
+from django import template
+from django.db.models import Q
+from django.utils import timezone
+
+from blog.models import ArchiveMonth
+
+
+register = template.Library()
+
+
+@register.inclusion_tag('includes/archive_sidebar.html')
+def archive_sidebar():
+    today = timezone.localdate()
+    months = ArchiveMonth.objects.filter(
+        Q(year__lt=today.year)
+        | Q(year=today.year, month__lte=today.month),
+        posts_count__gt=0,
+    )
+    return {'archive_months': months}
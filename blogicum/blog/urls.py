@@ -1,10 +1,30 @@
+from django.conf import settings
 from django.urls import include, path
 
-from . import views
+from blogicum.db import replica_reads
+
+from . import async_views, views
 
 
 app_name = 'blog'
 
+if settings.ASYNC_VIEWS:
+    index_view = async_views.index
+    post_detail_view = async_views.post_detail
+    category_posts_view = async_views.category_posts
+    profile_view = async_views.profile
+else:
+    index_view = views.BlogIndexListView.as_view()
+    post_detail_view = views.BlogPostDetailView.as_view()
+    category_posts_view = views.BlogCategoryPostsListView.as_view()
+    profile_view = views.BlogProfileUserDetailView.as_view()
+
+# С реплик читают только страницы-списки и страница публикации.
+index_view = replica_reads(index_view)
+post_detail_view = replica_reads(post_detail_view)
+category_posts_view = replica_reads(category_posts_view)
+profile_view = replica_reads(profile_view)
+
 post_urls = [
     path('<int:post_id>/edit/',
          views.BlogPostUpdateView.as_view(), name='edit_post'),
@@ -13,26 +33,46 @@ post_urls = [
         views.BlogPostPostDeleteView.as_view(),
         name='delete_post'
     ),
+    path('<int:post_id>/comments/',
+         views.BlogCommentPageView.as_view(), name='comment_page'),
+    path('<int:post_id>/comments/new/',
+         views.BlogNewCommentsView.as_view(), name='new_comments'),
+    path('<int:post_id>/comments/events/',
+         views.comment_events, name='comment_events'),
+    path('<int:post_id>/comments/<int:comment_id>/replies/',
+         views.BlogCommentThreadView.as_view(), name='comment_thread'),
     path('<int:post_id>/comment/',
          views.BlogCommentCreateView.as_view(), name='add_comment'),
     path('<int:post_id>/edit_comment/<int:comment_id>/',
          views.BlogCommentUpdateView.as_view(), name='edit_comment'),
     path('<int:post_id>/delete_comment/<int:comment_id>/',
          views.BlogCommentDeleteView.as_view(), name='delete_comment'),
-    path('<int:post_id>/',
-         views.BlogPostDetailView.as_view(), name='post_detail'),
+    path('<int:post_id>/', post_detail_view, name='post_detail'),
     path('create/',
          views.BlogPostCreateView.as_view(), name='create_post'),
 ]
 
 urlpatterns = [
-    path('', views.BlogIndexListView.as_view(), name='index'),
+    path('', index_view, name='index'),
     path('posts/', include(post_urls)),
-    path('category/<slug:category_slug>/',
-         views.BlogCategoryPostsListView.as_view(),
+    path('events/posts/', views.post_events, name='post_events'),
+    path('category/', replica_reads(views.BlogCategoryListView.as_view()),
+         name='category_list'),
+    path('category/<slug:category_slug>/', category_posts_view,
          name='category_posts'),
+    path('archive/<int:year>/<int:month>/',
+         replica_reads(views.BlogArchiveMonthListView.as_view()),
+         name='archive_month'),
+    path('autocomplete/category/',
+         views.CategoryAutocompleteView.as_view(),
+         name='autocomplete_category'),
+    path('autocomplete/location/',
+         views.LocationAutocompleteView.as_view(),
+         name='autocomplete_location'),
     path('edit-profile/', views.BlogProfileUserUpdateView.as_view(),
          name='edit_profile'),
-    path('profile/<str:username>/',
-         views.BlogProfileUserDetailView.as_view(), name='profile'),
+    path('profile/<str:username>/', profile_view, name='profile'),
+    path('profile/<str:username>/comments/',
+         views.BlogProfileCommentListView.as_view(),
+         name='profile_comments'),
 ]
@@ -1,17 +1,46 @@
+import datetime
+import hashlib
+
+from django.conf import settings
 from django.contrib.auth.mixins import LoginRequiredMixin
-from django.http import Http404
-from django.shortcuts import get_object_or_404, redirect
+from django.db import transaction
+from django.http import (
+    Http404, HttpResponse, HttpResponseBadRequest, HttpResponseForbidden,
+    JsonResponse
+)
+from django.db.models import Prefetch
+from django.shortcuts import get_object_or_404, redirect, render
+from django.template.loader import render_to_string
 from django.views.generic import (
-    CreateView, DeleteView, DetailView, UpdateView, ListView
+    CreateView, DeleteView, DetailView, UpdateView, ListView, View
 )
 from django.urls import reverse_lazy
 from django.utils import timezone
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import quote_etag
 
+from . import autocomplete, events
+from .counters import view_counter, visitor_counter, visitor_key
 from .forms import CommentForm, PostForm, UserProfileForm
-from .models import Category, Comment, Post, User
+from .models import (
+    Category, Comment, Location, ModerationStatus, Post, User
+)
+from .pagination import (
+    after_cursor, encode_cursor, keyset_page, latest_cursor, thread_page
+)
+from .ratelimit import RateLimitMixin
+from .spam import spam_worker
+from .writer import single_writer
 
 
 POSTS_PER_PAGE = 10
+COMMENTS_PER_PAGE = 20
+REPLIES_PREVIEW_LIMIT = 3
+NEW_COMMENTS_LIMIT = 50
+
+
+def is_ajax(request):
+    return request.headers.get('x-requested-with') == 'XMLHttpRequest'
 
 
 class BlogIndexListView(ListView):
@@ -25,30 +54,146 @@ class BlogIndexListView(ListView):
 
 class BlogPostDetailView(DetailView):
     template_name = 'blog/detail.html'
-    queryset = Post.for_page.all()
     pk_url_kwarg = 'post_id'
 
+    def get_queryset(self):
+        return Post.for_page.visible_to(self.request.user)
+
     def get_object(self, queryset=None):
         post = super().get_object(queryset)
-        if post.author != self.request.user and (
-            not post.is_published
-            or not post.category.is_published
-            or not post.pub_date <= timezone.now()
-        ):
-            raise Http404
+        view_counter.increment(post.pk)
+        visitor_counter.add(post.pk, visitor_key(self.request))
         return post
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        comments = Comment.objects.select_related('author').filter(
-            post=self.object
+        context['views_count'] = (
+            self.object.views + view_counter.pending(self.object.pk)
+        )
+        if self.object.author == self.request.user:
+            context['unique_readers'] = visitor_counter.estimate(self.object)
+        comments, next_cursor = thread_page(
+            Comment.objects.published().select_related('author').filter(
+                post=self.object
+            ),
+            size=COMMENTS_PER_PAGE,
+            replies_limit=REPLIES_PREVIEW_LIMIT,
         )
         form = CommentForm(self.request.POST or None)
         context['comments'] = comments
+        context['comments_next_cursor'] = next_cursor
+        context['comments_poll_cursor'] = latest_cursor(
+            Comment.objects.published().filter(post=self.object)
+        )
         context['form'] = form
         return context
 
 
+class BlogCommentPageView(View):
+    def get(self, request, *args, **kwargs):
+        post = get_object_or_404(
+            Post.objects.visible_to(request.user), pk=kwargs['post_id']
+        )
+        try:
+            comments, next_cursor = thread_page(
+                Comment.objects.published().select_related(
+                    'author'
+                ).filter(post=post),
+                after=request.GET.get('after'),
+                size=COMMENTS_PER_PAGE,
+                replies_limit=REPLIES_PREVIEW_LIMIT,
+            )
+        except ValueError:
+            return HttpResponseBadRequest()
+        return render(request, 'includes/comment_list.html', {
+            'post': post,
+            'comments': comments,
+            'comments_next_cursor': next_cursor,
+        })
+
+
+class BlogNewCommentsView(View):
+    """Комментарии к публикации, появившиеся после курсора since.
+
+    Ответ помечается ETag по последнему подходящему комментарию, поэтому
+    пока новых комментариев нет, опрос стоит одного поиска по индексу
+    (post, created_at, id) и возвращает 304 без рендеринга.
+    """
+
+    def get(self, request, *args, **kwargs):
+        post = get_object_or_404(
+            Post.objects.visible_to(request.user), pk=kwargs['post_id']
+        )
+        since = request.GET.get('since', '')
+        try:
+            comments = after_cursor(
+                Comment.objects.published().filter(post=post), since
+            )
+        except ValueError:
+            return HttpResponseBadRequest()
+        etag = quote_etag(hashlib.md5('|'.join(map(str, (
+            post.pk, request.user.pk, since, latest_cursor(comments),
+        ))).encode()).hexdigest())
+        response = get_conditional_response(request, etag=etag)
+        if response is None:
+            items, next_cursor = keyset_page(
+                comments.select_related('author'), size=NEW_COMMENTS_LIMIT
+            )
+            response = JsonResponse({
+                'cursor': encode_cursor(items[-1]) if items else since,
+                'has_more': next_cursor is not None,
+                'comments': [{
+                    'id': comment.pk,
+                    'parent': comment.parent_id,
+                    'html': render_to_string(
+                        'includes/comment.html', {'comment': comment},
+                        request,
+                    ),
+                } for comment in items],
+            })
+        response['ETag'] = etag
+        patch_cache_control(response, private=True, no_cache=True)
+        return response
+
+
+def posts_channel():
+    return events.POSTS_CHANNEL
+
+
+def post_comments_channel(post_id):
+    is_visible = Post.objects.visible().filter(pk=post_id).exists()
+    return events.comments_channel(post_id) if is_visible else None
+
+
+post_events = events.EventStream(posts_channel)
+comment_events = events.EventStream(post_comments_channel)
+
+
+class BlogCommentThreadView(View):
+    def get(self, request, *args, **kwargs):
+        root = get_object_or_404(
+            Comment.objects.published().select_related('post'),
+            pk=kwargs['comment_id'],
+            post_id=kwargs['post_id'],
+        )
+        if not root.post.is_visible_to(request.user):
+            raise Http404
+        replies = Comment.objects.published().select_related(
+            'author'
+        ).subtree(root, after_path=request.GET.get('after', ''))
+        return render(request, 'includes/comment_replies.html', {
+            'replies': replies,
+        })
+
+
+class BlogCategoryListView(ListView):
+    paginate_by = POSTS_PER_PAGE
+    template_name = 'blog/categories.html'
+    queryset = Category.objects.filter(
+        is_published=True
+    ).order_by('title')
+
+
 class BlogCategoryPostsListView(ListView):
     paginate_by = POSTS_PER_PAGE
     template_name = 'blog/category.html'
@@ -75,19 +220,52 @@ class BlogCategoryPostsListView(ListView):
         return context
 
 
-class BlogProfileUserDetailView(ListView):
-    template_name = 'blog/profile.html'
-    context_object_name = 'profile'
+class BlogArchiveMonthListView(ListView):
     paginate_by = POSTS_PER_PAGE
-
-    def get_user(self):
-        return get_object_or_404(User, username=self.kwargs['username'])
+    template_name = 'blog/archive.html'
+
+    def get_month_range(self):
+        # Конец декабря 9999 года и сдвиг часового пояса у 1 года
+        # выходят за пределы datetime.
+        try:
+            month_start = datetime.date(
+                self.kwargs['year'], self.kwargs['month'], 1
+            )
+            month_end = (
+                month_start + datetime.timedelta(days=32)
+            ).replace(day=1)
+            return [
+                timezone.make_aware(
+                    datetime.datetime.combine(day, datetime.time())
+                ).astimezone(datetime.timezone.utc)
+                for day in (month_start, month_end)
+            ]
+        except (ValueError, OverflowError):
+            raise Http404
 
     def get_queryset(self):
+        month_start, month_end = self.get_month_range()
         return Post.for_page.get_posts_queryset(
-            is_today_posts=self.request.user != self.get_user(),
+            is_today_posts=True,
             is_annotate=True
-        ).filter(author=self.get_user())
+        ).filter(
+            pub_date__gte=month_start,
+            pub_date__lt=month_end,
+        )
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context['month'], _ = self.get_month_range()
+        return context
+
+
+class BlogProfileMixin:
+    def get_user(self):
+        if not hasattr(self, '_profile'):
+            self._profile = get_object_or_404(
+                User, username=self.kwargs['username']
+            )
+        return self._profile
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
@@ -95,7 +273,46 @@ class BlogProfileUserDetailView(ListView):
         return context
 
 
-class BlogProfileUserUpdateView(LoginRequiredMixin, UpdateView):
+class BlogProfileUserDetailView(BlogProfileMixin, ListView):
+    template_name = 'blog/profile.html'
+    context_object_name = 'profile'
+    paginate_by = POSTS_PER_PAGE
+
+    def get_queryset(self):
+        return Post.for_page.get_posts_queryset(
+            is_today_posts=self.request.user != self.get_user(),
+            is_annotate=True
+        ).filter(author=self.get_user())
+
+
+class BlogProfileCommentListView(BlogProfileMixin, ListView):
+    template_name = 'blog/profile_comments.html'
+    paginate_by = COMMENTS_PER_PAGE
+
+    def get_queryset(self):
+        comments = Comment.objects.filter(
+            author=self.get_user()
+        ).order_by('-created_at', '-id').prefetch_related(
+            Prefetch('post', queryset=Post.objects.only('id', 'title'))
+        )
+        if self.request.user != self.get_user():
+            comments = comments.published().filter(post__is_visible=True)
+        return comments
+
+
+class BlogSingleWriterMixin:
+    """Сохраняет и удаляет объект через single_writer."""
+
+    def form_valid(self, form):
+        return single_writer.run(super().form_valid, form)
+
+    def delete(self, request, *args, **kwargs):
+        return single_writer.run(super().delete, request, *args, **kwargs)
+
+
+class BlogProfileUserUpdateView(
+    LoginRequiredMixin, BlogSingleWriterMixin, UpdateView
+):
     model = User
     template_name = 'blog/user.html'
     form_class = UserProfileForm
@@ -109,7 +326,10 @@ class BlogProfileUserUpdateView(LoginRequiredMixin, UpdateView):
         )
 
 
-class BlogPostCreateView(LoginRequiredMixin, CreateView):
+class BlogPostCreateView(
+    LoginRequiredMixin, RateLimitMixin, BlogSingleWriterMixin, CreateView
+):
+    ratelimit_scope = 'post'
     model = Post
     form_class = PostForm
     template_name = 'blog/create.html'
@@ -136,11 +356,13 @@ class BlogPostMixin:
         return super().dispatch(request, *args, **kwargs)
 
 
-class BlogPostUpdateView(BlogPostMixin, UpdateView):
+class BlogPostUpdateView(BlogPostMixin, BlogSingleWriterMixin, UpdateView):
     form_class = PostForm
 
 
-class BlogPostPostDeleteView(LoginRequiredMixin, BlogPostMixin, DeleteView):
+class BlogPostPostDeleteView(
+    LoginRequiredMixin, BlogPostMixin, BlogSingleWriterMixin, DeleteView
+):
     success_url = reverse_lazy('blog:index')
 
     def get_context_data(self, **kwargs):
@@ -164,6 +386,41 @@ class BlogCommentMixin(LoginRequiredMixin):
         )
 
 
+class BlogCommentAjaxMixin:
+    """Для запросов через fetch отдаёт фрагмент комментария."""
+
+    ajax_status = 200
+
+    def form_valid(self, form):
+        response = super().form_valid(form)
+        if not is_ajax(self.request):
+            return response
+        return render(
+            self.request, 'includes/comment.html',
+            {'comment': self.object}, status=self.ajax_status,
+        )
+
+    def form_invalid(self, form):
+        if not is_ajax(self.request):
+            return super().form_invalid(form)
+        return JsonResponse({'errors': form.errors}, status=400)
+
+
+class BlogCommentModerationMixin:
+    """Отправляет новый или изменённый текст на проверку на спам."""
+
+    def form_valid(self, form):
+        comment = form.instance
+        if comment.pk is None or comment.is_published:
+            comment.moderation_status = ModerationStatus.PENDING
+            comment.is_published = settings.COMMENT_PENDING_VISIBLE
+        response = super().form_valid(form)
+        if (comment.moderation_status == ModerationStatus.PENDING
+                and settings.SPAM_WORKER_IN_PROCESS):
+            transaction.on_commit(spam_worker.wake)
+        return response
+
+
 class BlogCommentDispath:
     def dispatch(self, request, *args, **kwargs):
         comment = get_object_or_404(
@@ -172,21 +429,62 @@ class BlogCommentDispath:
             post_id=kwargs['post_id']
         )
         if comment.author != self.request.user:
+            if is_ajax(request):
+                return HttpResponseForbidden()
             return redirect('blog:post_detail', post_id=kwargs['post_id'])
         return super().dispatch(request, *args, **kwargs)
 
 
-class BlogCommentCreateView(BlogCommentMixin, CreateView):
+class BlogCommentCreateView(
+    BlogCommentMixin, RateLimitMixin, BlogCommentAjaxMixin,
+    BlogCommentModerationMixin, BlogSingleWriterMixin, CreateView
+):
+    ratelimit_scope = 'comment'
+    ajax_status = 201
 
     def form_valid(self, form):
         form.instance.author = self.request.user
         form.instance.post = get_object_or_404(Post, pk=self.kwargs['post_id'])
+        parent_id = self.request.POST.get('parent', '')
+        if parent_id.isdigit():
+            form.instance.parent = get_object_or_404(
+                Comment, pk=parent_id, post=form.instance.post
+            )
         return super().form_valid(form)
 
 
-class BlogCommentUpdateView(BlogCommentMixin, BlogCommentDispath, UpdateView):
+class BlogCommentUpdateView(
+    BlogCommentMixin, BlogCommentDispath, BlogCommentAjaxMixin,
+    BlogCommentModerationMixin, BlogSingleWriterMixin, UpdateView
+):
     pass
 
 
-class BlogCommentDeleteView(BlogCommentMixin, BlogCommentDispath, DeleteView):
-    pass
+class BlogCommentDeleteView(
+    BlogCommentMixin, BlogCommentDispath, BlogSingleWriterMixin, DeleteView
+):
+    def delete(self, request, *args, **kwargs):
+        if not is_ajax(request):
+            return super().delete(request, *args, **kwargs)
+        single_writer.run(self.get_object().delete)
+        return HttpResponse(status=204)
+
+
+class AutocompleteView(View):
+    model = None
+    search_field = None
+
+    def get(self, request, *args, **kwargs):
+        return JsonResponse({'results': autocomplete.search(
+            self.model, self.search_field, request.GET.get('q', '')
+        )})
+
+
+class CategoryAutocompleteView(AutocompleteView):
+    model = Category
+    search_field = 'title'
+
+
+class LocationAutocompleteView(AutocompleteView):
+    model = Location
+    search_field = 'name'
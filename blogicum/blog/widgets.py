@@ -0,0 +1,32 @@
+from django import forms
+from django.urls import reverse_lazy
+
+
+class AutocompleteWidget(forms.Widget):
+    """Поле выбора связанного объекта с подсказками вместо <select>.
+
+    Рендерит только выбранное значение, варианты подгружаются
+    из JSON-эндпоинта по мере ввода. Подпись выбранного значения берётся
+    из поля label_field целиком, как в подсказках, а не из обрезанного
+    __str__().
+    """
+
+    template_name = 'widgets/autocomplete.html'
+
+    class Media:
+        js = ('js/autocomplete.js',)
+
+    def __init__(self, url_name, label_field, attrs=None):
+        super().__init__(attrs)
+        self.url = reverse_lazy(url_name)
+        self.label_field = label_field
+
+    def get_context(self, name, value, attrs):
+        context = super().get_context(name, value, attrs)
+        label = ''
+        if value not in self.choices.field.empty_values:
+            selected = self.choices.queryset.filter(pk=value).first()
+            if selected is not None:
+                label = getattr(selected, self.label_field)
+        context['widget'].update({'url': self.url, 'label': label})
+        return context
@@ -0,0 +1,133 @@
+import contextvars
+import logging
+import queue
+import threading
+from concurrent.futures import Future
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+
+logger = logging.getLogger(__name__)
+
+
+class SingleWriter:
+    """Поток, через который проходят записи процесса в одну базу.
+
+    SQLite допускает одного писателя на файл. Вместо того чтобы потоки
+    и процессы боролись за блокировку, записи встают в очередь, и поток
+    выполняет их пачками: одна транзакция на пачку, точка сохранения
+    на каждую запись. Процессы разделяет блокировка файла рядом с базой.
+    Вызывающий получает результат после фиксации пачки.
+    """
+
+    def __init__(self, using=DEFAULT_DB_ALIAS, batch_size=50,
+                 idle_timeout=60):
+        self.using = using
+        self.batch_size = batch_size
+        self.idle_timeout = idle_timeout
+        self.batches = 0
+        self.writes = 0
+        self._jobs = queue.Queue()
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def run(self, func, *args, **kwargs):
+        """Выполняет func в потоке записи и возвращает её результат.
+
+        Если режим выключен или вызов уже внутри транзакции, func
+        выполняется сразу: её запись должна стать частью этой транзакции.
+        """
+        if (not settings.SINGLE_WRITER
+                or threading.current_thread() is self._thread
+                or connections[self.using].in_atomic_block):
+            return func(*args, **kwargs)
+        future = Future()
+        self._jobs.put(
+            (future, contextvars.copy_context(), func, args, kwargs)
+        )
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._run, name='single-writer', daemon=True
+                )
+                self._thread.start()
+        return future.result()
+
+    def _run(self):
+        try:
+            while True:
+                try:
+                    jobs = [self._jobs.get(timeout=self.idle_timeout)]
+                except queue.Empty:
+                    with self._lock:
+                        if self._jobs.empty():
+                            self._thread = None
+                            return
+                    continue
+                while len(jobs) < self.batch_size:
+                    try:
+                        jobs.append(self._jobs.get_nowait())
+                    except queue.Empty:
+                        break
+                self.execute(jobs)
+        finally:
+            connections[self.using].close()
+
+    def execute(self, jobs):
+        results = []
+        try:
+            with self.file_lock(), transaction.atomic(using=self.using):
+                for future, context, func, args, kwargs in jobs:
+                    try:
+                        with transaction.atomic(using=self.using):
+                            result = context.run(func, *args, **kwargs)
+                    except Exception as error:
+                        results.append((future, None, error))
+                    else:
+                        results.append((future, result, None))
+        except Exception as error:
+            logger.exception('Пачка записей не зафиксирована')
+            for future, *_ in jobs:
+                future.set_exception(error)
+            return
+        self.batches += 1
+        self.writes += len(jobs)
+        for future, result, error in results:
+            if error is None:
+                future.set_result(result)
+            else:
+                future.set_exception(error)
+
+    def lock_path(self):
+        connection = connections[self.using]
+        name = str(connection.settings_dict['NAME'])
+        if (fcntl is None or connection.vendor != 'sqlite'
+                or connection.creation.is_in_memory_db(name)):
+            return None
+        return f'{name}.writer-lock'
+
+    @contextmanager
+    def file_lock(self):
+        path = self.lock_path()
+        if path is None:
+            yield
+            return
+        with open(path, 'a') as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+single_writer = SingleWriter(
+    batch_size=getattr(settings, 'SINGLE_WRITER_BATCH_SIZE', 50),
+    idle_timeout=getattr(settings, 'SINGLE_WRITER_IDLE_TIMEOUT', 60),
+)
@@ -5,4 +5,11 @@ from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'blogicum.settings')
 
-application = get_asgi_application()
+django_application = get_asgi_application()
+
+from blog.events import EventStreamRouter  # noqa: E402
+from blogicum.warmup import preload  # noqa: E402
+
+application = EventStreamRouter(django_application)
+
+preload()
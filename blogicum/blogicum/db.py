@@ -0,0 +1,170 @@
+import asyncio
+import contextvars
+import random
+from contextlib import contextmanager
+from functools import wraps
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+
+
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+_routing = contextvars.ContextVar('database_routing', default=None)
+
+
+class RoutingState:
+
+    def __init__(self, use_replicas):
+        self.use_replicas = use_replicas
+        self.wrote = False
+
+
+@contextmanager
+def read_from_replicas(enabled=True):
+    """Разрешает чтение с реплик внутри блока.
+
+    Вне такого блока (команды, фоновые задачи) всё идёт в основную
+    базу. Состояние хранится в contextvar, поэтому видно и в потоках
+    sync_to_async асинхронных view.
+    """
+    state = RoutingState(enabled and bool(settings.DATABASE_REPLICAS))
+    token = _routing.set(state)
+    try:
+        yield state
+    finally:
+        _routing.reset(token)
+
+
+@contextmanager
+def outside_request():
+    """Выполняет блок вне маршрутизации текущего запроса.
+
+    Для фоновых записей внутри запроса, например сброса счётчиков
+    просмотров: они идут в основную базу и не привязывают клиента
+    к ней, ведь сам клиент ничего не записал.
+    """
+    token = _routing.set(None)
+    try:
+        yield
+    finally:
+        _routing.reset(token)
+
+
+def replica_reads(view):
+    """Разрешает view читать с реплик.
+
+    Остальные view (админка, вход, AJAX и потоки событий) читают
+    с основной базы, даже если запрос безопасный.
+    """
+    def allow(request):
+        state = _routing.get()
+        if (state is not None
+                and PrimaryStickinessMiddleware.use_replicas(request)):
+            state.use_replicas = bool(settings.DATABASE_REPLICAS)
+
+    if asyncio.iscoroutinefunction(view):
+        async def wrapper(request, *args, **kwargs):
+            allow(request)
+            return await view(request, *args, **kwargs)
+    else:
+        def wrapper(request, *args, **kwargs):
+            allow(request)
+            return view(request, *args, **kwargs)
+    return wraps(view)(wrapper)
+
+
+class PrimaryReplicaRouter:
+    """Запись — в основную базу, чтение — с реплик, где это разрешено.
+
+    После первой записи в блоке чтение до его конца идёт с основной
+    базы, чтобы запрос видел собственные изменения.
+    """
+
+    def db_for_read(self, model, **hints):
+        state = _routing.get()
+        if state is None or not state.use_replicas or state.wrote:
+            return DEFAULT_DB_ALIAS
+        return random.choice(settings.DATABASE_REPLICAS)
+
+    def db_for_write(self, model, **hints):
+        state = _routing.get()
+        if state is not None:
+            state.wrote = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        databases = {DEFAULT_DB_ALIAS, *settings.DATABASE_REPLICAS}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Схему на реплики переносит репликация, а не migrate.
+        if db in settings.DATABASE_REPLICAS:
+            return False
+        return None
+
+
+class PrimaryStickinessMiddleware:
+    """Отправляет на реплики чтение view, помеченных replica_reads.
+
+    С реплик читают только безопасные запросы. Клиент, который что-то
+    записал, получает cookie и следующие DATABASE_STICKY_SECONDS секунд
+    читает с основной базы: реплика могла ещё не получить его изменения.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if asyncio.iscoroutinefunction(get_response):
+            # Иначе Django обернёт middleware в sync_to_async, и async
+            # view под ASGI зависнут на вложенных потоках.
+            self._is_coroutine = asyncio.coroutines._is_coroutine
+
+    def __call__(self, request):
+        if asyncio.iscoroutinefunction(self):
+            return self.__acall__(request)
+        with read_from_replicas(False) as state:
+            response = self.get_response(request)
+        return self.stick_to_primary(state, response)
+
+    async def __acall__(self, request):
+        with read_from_replicas(False) as state:
+            response = await self.get_response(request)
+        return self.stick_to_primary(state, response)
+
+    @staticmethod
+    def use_replicas(request):
+        return (
+            request.method in SAFE_METHODS
+            and settings.DATABASE_STICKY_COOKIE not in request.COOKIES
+        )
+
+    @staticmethod
+    def stick_to_primary(state, response):
+        if state.wrote and settings.DATABASE_REPLICAS:
+            response.set_cookie(
+                settings.DATABASE_STICKY_COOKIE, '1',
+                max_age=settings.DATABASE_STICKY_SECONDS,
+                httponly=True, samesite='Lax',
+            )
+        return response
+
+
+def apply_sqlite_pragmas(connection, pragmas):
+    """Выполняет PRAGMA на открытом соединении sqlite3."""
+    for name, value in pragmas.items():
+        if not name.isidentifier():
+            raise ValueError(f'Некорректное имя PRAGMA: {name!r}')
+        connection.execute(f'PRAGMA {name} = {value}')
+
+
+@receiver(connection_created)
+def configure_sqlite(sender, connection, **kwargs):
+    if connection.vendor == 'sqlite':
+        apply_sqlite_pragmas(connection.connection, settings.SQLITE_PRAGMAS)
@@ -1,3 +1,4 @@
+import os
 from pathlib import Path
 
 
@@ -16,13 +17,25 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.forms',
     'django_bootstrap5',
     'blog.apps.BlogConfig',
     'pages.apps.PagesConfig',
+    'tasks.apps.TasksConfig',
 ]
 
+# Процессы, которые не отдают HTML-страницы (runworker, score_comments,
+# узлы только с потоками событий), можно запускать с BLOGICUM_SERVE_UI=0:
+# тогда админка и django_bootstrap5 не загружаются, URL админки
+# не подключается, а страницы ошибок отдаются простым текстом.
+SERVE_UI = os.environ.get('BLOGICUM_SERVE_UI', '1') != '0'
+UI_APPS = ('django.contrib.admin', 'django_bootstrap5')
+if not SERVE_UI:
+    INSTALLED_APPS = [app for app in INSTALLED_APPS if app not in UI_APPS]
+
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'blogicum.db.PrimaryStickinessMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -51,6 +64,8 @@ TEMPLATES = [
     },
 ]
 
+FORM_RENDERER = 'django.forms.renderers.TemplatesSetting'
+
 WSGI_APPLICATION = 'blogicum.wsgi.application'
 
 DATABASES = {
@@ -60,6 +75,45 @@ DATABASES = {
     }
 }
 
+# PRAGMA для каждого нового соединения с SQLite (blogicum.db). WAL
+# позволяет читать во время записи, busy_timeout (мс) — ждать
+# блокировку, а не сразу падать с «database is locked». Пустой
+# словарь оставляет настройки SQLite по умолчанию.
+SQLITE_PRAGMAS = {
+    'busy_timeout': 5000,
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'mmap_size': 128 * 1024 * 1024,
+    'cache_size': -32 * 1024,
+}
+
+# Реплики только для чтения — алиасы из DATABASES. Локально реплику
+# можно изобразить отдельным файлом SQLite, который обновляет команда
+# sync_replicas:
+# DATABASES['replica'] = {
+#     'ENGINE': 'django.db.backends.sqlite3',
+#     'NAME': BASE_DIR / 'replica.sqlite3',
+#     'TEST': {'MIRROR': 'default'},
+# }
+# DATABASE_REPLICAS = ['replica']
+DATABASE_ROUTERS = ['blogicum.db.PrimaryReplicaRouter']
+DATABASE_REPLICAS = []
+DATABASE_STICKY_COOKIE = 'primary_db'
+DATABASE_STICKY_SECONDS = 10
+
+# Записи из view и счётчиков выполняются пачками в одном потоке
+# процесса (blog.writer); процессы по очереди берут блокировку файла
+# базы, а не ждут друг друга через busy_timeout.
+SINGLE_WRITER = False
+SINGLE_WRITER_BATCH_SIZE = 50
+SINGLE_WRITER_IDLE_TIMEOUT = 60
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    }
+}
+
 AUTH_PASSWORD_VALIDATORS = [
     {
         'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator',
@@ -98,8 +152,65 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 EMAIL_BACKEND = 'django.core.mail.backends.filebased.EmailBackend'
 EMAIL_FILE_PATH = BASE_DIR / 'sent_emails'
 
+# Очередь писем включается так:
+# EMAIL_BACKEND = 'tasks.mail.QueuedEmailBackend'. Тогда письма
+# отправляет задача runworker через EMAIL_DELIVERY_BACKEND.
+EMAIL_DELIVERY_BACKEND = 'django.core.mail.backends.smtp.EmailBackend'
+EMAIL_QUEUE_BATCH_SIZE = 100
+EMAIL_DOMAIN_RATE_LIMIT = 30
+EMAIL_MAX_ATTEMPTS = 5
+
 CSRF_FAILURE_VIEW = 'pages.views.csrf_failure'
 
+VIEW_COUNTER_SPILL_FILE = BASE_DIR / 'view_counters.spill'
+VIEW_COUNTER_FLUSH_INTERVAL = 30
+VIEW_COUNTER_FLUSH_SIZE = 100
+
+AUTOCOMPLETE_LIMIT = 10
+
+RATELIMIT_ENABLED = True
+# Лимит общий для процессов, только если кеш общий и add() в нём
+# атомарный (Memcached, Redis). С LocMemCache лимит у каждого процесса.
+RATELIMIT_CACHE_ALIAS = 'default'
+# (запросов подряд, запросов в минуту) на пользователя и на IP.
+RATELIMIT_RULES = {
+    'comment': {'user': (10, 6), 'ip': (60, 30)},
+    'post': {'user': (5, 2), 'ip': (60, 30)},
+}
+
+# Новые комментарии скрыты, пока их не проверит фильтр спама. Проверяет
+# обработчик: поток в процессе сайта (SPAM_WORKER_IN_PROCESS) или команда
+# score_comments. Без работающего обработчика новые комментарии
+# не появятся вовсе.
+# True — показывать сразу и скрывать, если проверка отправит в карантин.
+COMMENT_PENDING_VISIBLE = False
+SPAM_THRESHOLD = 0.5
+SPAM_NEW_ACCOUNT_AGE = 24 * 60 * 60
+SPAM_CLASSIFIER = None
+SPAM_BATCH_SIZE = 100
+SPAM_WORKER_IN_PROCESS = True
+SPAM_WORKER_IDLE_TIMEOUT = 60
+
+TASKS_POLL_INTERVAL = 1
+TASKS_LOCK_TIMEOUT = 5 * 60
+TASKS_HEARTBEAT_INTERVAL = 30
+TASKS_MAX_ATTEMPTS = 5
+TASKS_RETRY_BACKOFF = 10
+TASKS_RETRY_BACKOFF_MAX = 60 * 60
+
+# Асинхронные варианты ленты, категорий, профиля и публикации
+# (blog.async_views); имеет смысл включать только под ASGI.
+ASYNC_VIEWS = False
+
+# Потоки событий работают только под ASGI (blogicum.asgi).
+EVENTS_BROKER = 'blog.events.LocalBroker'
+EVENTS_QUEUE_SIZE = 100
+EVENTS_KEEPALIVE = 15
+
+# Прогрев (blogicum.warmup) при загрузке wsgi.py и asgi.py, до приёма
+# запросов; то же делает команда warmup.
+WARMUP_ON_STARTUP = False
+
 LOGIN_URL = 'login'
 LOGIN_REDIRECT_URL = 'blog:index'
 LOGOUT_REDIRECT_URL = 'blog:index'
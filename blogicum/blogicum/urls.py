@@ -1,4 +1,4 @@
-from django.contrib import admin
+from django.apps import apps
 from django.contrib.auth.forms import UserCreationForm
 from django.views.generic import CreateView
 from django.urls import include, path, reverse_lazy
@@ -7,7 +7,6 @@ from django.urls import include, path, reverse_lazy
 urlpatterns = [
     path('', include('blog.urls', namespace='blog')),
     path('pages/', include('pages.urls', namespace='pages')),
-    path('admin/', admin.site.urls),
     path('auth/', include('django.contrib.auth.urls')),
     path(
         'auth/registration/',
@@ -20,5 +19,10 @@ urlpatterns = [
     ),
 ]
 
+if apps.is_installed('django.contrib.admin'):
+    from django.contrib import admin
+
+    urlpatterns += [path('admin/', admin.site.urls)]
+
 handler404 = 'pages.views.page_not_found'
 handler500 = 'pages.views.internal_server_error'
@@ -0,0 +1,156 @@
+import asyncio
+import logging
+import time
+import uuid
+from pathlib import Path
+
+from asgiref.sync import async_to_sync
+from django.apps import apps
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser
+from django.db import connections
+from django.template import TemplateSyntaxError
+from django.template.loader import get_template
+from django.urls import (
+    NoReverseMatch, URLResolver, get_resolver, resolve, reverse
+)
+from django.urls.converters import IntConverter, UUIDConverter
+from django.utils.module_loading import autodiscover_modules
+
+
+logger = logging.getLogger(__name__)
+
+# Страницы, которые запрашиваются при прогреве: лента, список категорий
+# и автодополнение категорий и местоположений.
+WARMUP_PAGES = (
+    'blog:index',
+    'blog:category_list',
+    'blog:autocomplete_category',
+    'blog:autocomplete_location',
+)
+
+
+def sample_value(converter):
+    if isinstance(converter, IntConverter):
+        return 1
+    if isinstance(converter, UUIDConverter):
+        return uuid.uuid4()
+    return 'warmup'
+
+
+def named_urls(patterns, namespace=None, converters=None):
+    """Обходит URLconf и возвращает (имя, аргументы) для reverse()."""
+    for pattern in patterns:
+        found = dict(converters or {})
+        found.update(getattr(pattern.pattern, 'converters', {}))
+        regex = pattern.pattern.regex
+        for group in regex.groupindex:
+            found.setdefault(group, None)
+        if isinstance(pattern, URLResolver):
+            yield from named_urls(
+                pattern.url_patterns,
+                ':'.join(filter(None, (namespace, pattern.namespace))),
+                found,
+            )
+        elif pattern.name:
+            name = f'{namespace}:{pattern.name}' if namespace else pattern.name
+            yield name, {
+                key: sample_value(converter)
+                for key, converter in found.items()
+            }
+
+
+def import_views():
+    autodiscover_modules('views')
+    return len(get_resolver().url_patterns)
+
+
+def reverse_urls():
+    reversed_count, failed = 0, []
+    for name, kwargs in named_urls(get_resolver().url_patterns):
+        try:
+            reverse(name, kwargs=kwargs)
+        except NoReverseMatch:
+            # Шаблоны на регулярных выражениях (например, в админке)
+            # не принимают подставленные значения.
+            failed.append(name)
+        else:
+            reversed_count += 1
+    return reversed_count, failed
+
+
+def compile_templates():
+    compiled, failed = 0, []
+    for directory in settings.TEMPLATES[0]['DIRS']:
+        directory = Path(directory)
+        for path in sorted(directory.rglob('*.html')):
+            name = path.relative_to(directory).as_posix()
+            try:
+                get_template(name)
+            except TemplateSyntaxError:
+                logger.exception('Шаблон %s не компилируется', name)
+                failed.append(name)
+            else:
+                compiled += 1
+    return compiled, failed
+
+
+def render_pages():
+    """Один раз выполняет view из WARMUP_PAGES.
+
+    Кеша страниц в проекте нет: запросы загружают лениво импортируемый
+    код, шаблоны страниц и соединение с базой, а из кешей заполняются
+    только индексы автодополнения в памяти процесса.
+    """
+    # django.test тяжёлый, а модуль импортируется в wsgi.py всегда.
+    from django.test import RequestFactory
+
+    factory = RequestFactory()
+    for name in WARMUP_PAGES:
+        request = factory.get(reverse(name))
+        request.user = AnonymousUser()
+        view = resolve(request.path_info).func
+        if asyncio.iscoroutinefunction(view):
+            response = async_to_sync(view)(request)
+        else:
+            response = view(request)
+        if hasattr(response, 'render'):
+            response.render()
+    return len(WARMUP_PAGES)
+
+
+def warm_up():
+    """Прогревает процесс перед приёмом запросов.
+
+    Возвращает список (шаг, секунды, результат) для отчёта.
+    """
+    steps = [('views', import_views), ('urls', reverse_urls)]
+    # Без django_bootstrap5 (BLOGICUM_SERVE_UI=0) шаблоны страниц
+    # не загружаются, а процесс HTML и не отдаёт.
+    if apps.is_installed('django_bootstrap5'):
+        steps += [('templates', compile_templates), ('pages', render_pages)]
+    results = []
+    for step, func in steps:
+        started = time.perf_counter()
+        result = func()
+        results.append((step, time.perf_counter() - started, result))
+    return results
+
+
+def preload():
+    """Хук для wsgi.py и asgi.py, включается WARMUP_ON_STARTUP.
+
+    С gunicorn --preload прогрев выполняется один раз в мастере,
+    и рабочие процессы получают его результат при fork. Соединения
+    с базой после прогрева закрываются: делить их между процессами
+    нельзя.
+    """
+    if not settings.WARMUP_ON_STARTUP:
+        return
+    try:
+        for step, elapsed, result in warm_up():
+            logger.info('Прогрев %s: %.3f с, %s', step, elapsed, result)
+    except Exception:
+        logger.exception('Прогрев не удался')
+    finally:
+        connections.close_all()
@@ -1,13 +1,38 @@
+from django.apps import apps
+from django.http import HttpResponse
 from django.shortcuts import render
 
 
+# Ответы для процессов с BLOGICUM_SERVE_UI=0: шаблоны страниц ошибок
+# наследуют base.html, а он загружает django_bootstrap5.
+PLAIN_ERRORS = {
+    403: 'Ошибка проверки CSRF.',
+    404: 'Страница не найдена.',
+    429: 'Слишком много запросов.',
+    500: 'Ошибка сервера.',
+}
+
+
+def render_error(request, template_name, status):
+    if not apps.is_installed('django_bootstrap5'):
+        return HttpResponse(
+            PLAIN_ERRORS[status], status=status,
+            content_type='text/plain; charset=utf-8',
+        )
+    return render(request, template_name, status=status)
+
+
 def page_not_found(request, exception):
-    return render(request, 'pages/404.html', status=404)
+    return render_error(request, 'pages/404.html', 404)
 
 
 def internal_server_error(request):
-    return render(request, 'pages/500.html', status=500)
+    return render_error(request, 'pages/500.html', 500)
 
 
 def csrf_failure(request, reason=''):
-    return render(request, 'pages/403csrf.html', status=403)
+    return render_error(request, 'pages/403csrf.html', 403)
+
+
+def too_many_requests(request, exception=None):
+    return render_error(request, 'pages/429.html', 429)
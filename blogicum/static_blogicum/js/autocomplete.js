@@ -0,0 +1,28 @@
+document.addEventListener('DOMContentLoaded', function () {
+  document.querySelectorAll('[data-autocomplete-url]').forEach(function (input) {
+    var hidden = input.previousElementSibling;
+    var datalist = document.getElementById(input.getAttribute('list'));
+    var timer = null;
+    input.addEventListener('input', function () {
+      var option = Array.from(datalist.options).find(function (item) {
+        return item.value === input.value;
+      });
+      hidden.value = option ? option.dataset.id : '';
+      clearTimeout(timer);
+      timer = setTimeout(function () {
+        var url = input.dataset.autocompleteUrl + '?q=' + encodeURIComponent(input.value);
+        fetch(url).then(function (response) {
+          return response.json();
+        }).then(function (data) {
+          datalist.innerHTML = '';
+          data.results.forEach(function (result) {
+            var item = document.createElement('option');
+            item.value = result.text;
+            item.dataset.id = result.id;
+            datalist.appendChild(item);
+          });
+        });
+      }, 200);
+    });
+  });
+});
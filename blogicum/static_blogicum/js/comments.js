@@ -0,0 +1,173 @@
+function commentForm() {
+  return document.querySelector('[data-comment-form]');
+}
+
+function sendComment(url, body) {
+  return fetch(url, {
+    method: 'POST',
+    body: body,
+    headers: {'X-Requested-With': 'XMLHttpRequest'},
+    credentials: 'same-origin'
+  });
+}
+
+function csrfBody() {
+  var body = new FormData();
+  body.append(
+    'csrfmiddlewaretoken',
+    commentForm().elements.csrfmiddlewaretoken.value
+  );
+  return body;
+}
+
+function showError(response) {
+  if (response.status === 429) {
+    alert('Слишком много запросов. Попробуйте позже.');
+  } else {
+    alert('Не удалось сохранить комментарий.');
+  }
+}
+
+document.addEventListener('submit', function (event) {
+  var form = event.target.closest('[data-comment-form]');
+  if (!form) {
+    return;
+  }
+  event.preventDefault();
+  sendComment(form.action, new FormData(form)).then(function (response) {
+    if (response.status !== 201) {
+      showError(response);
+      return;
+    }
+    return response.text().then(function (html) {
+      var parent = document.querySelector(
+        '[data-comment="' + form.elements.parent.value + '"]'
+      );
+      if (parent) {
+        parent.insertAdjacentHTML('afterend', html);
+      } else {
+        document.getElementById('comments').insertAdjacentHTML(
+          'beforeend', html
+        );
+      }
+      form.reset();
+      form.elements.parent.value = '';
+      form.elements.text.placeholder = '';
+    });
+  });
+});
+
+document.addEventListener('click', function (event) {
+  var button = event.target.closest('[data-load-more]');
+  if (button) {
+    button.disabled = true;
+    fetch(button.dataset.loadMore).then(function (response) {
+      return response.text();
+    }).then(function (html) {
+      button.insertAdjacentHTML('afterend', html);
+      button.remove();
+    });
+    return;
+  }
+  var reply = event.target.closest('[data-reply-to]');
+  if (reply) {
+    var form = commentForm();
+    form.elements.parent.value = reply.dataset.replyTo;
+    form.elements.text.placeholder = 'Ответ @' + reply.dataset.replyAuthor;
+    form.elements.text.focus();
+    return;
+  }
+  var remove = event.target.closest('[data-delete-comment]');
+  if (remove) {
+    event.preventDefault();
+    if (!confirm('Удалить комментарий?')) {
+      return;
+    }
+    sendComment(remove.href, csrfBody()).then(function (response) {
+      if (response.status === 204) {
+        remove.closest('[data-comment]').remove();
+      }
+    });
+    return;
+  }
+  var edit = event.target.closest('[data-edit-comment]');
+  if (edit) {
+    event.preventDefault();
+    var comment = edit.closest('[data-comment]');
+    var text = prompt(
+      'Текст комментария',
+      comment.querySelector('[data-comment-text]').innerText
+    );
+    if (text === null) {
+      return;
+    }
+    var body = csrfBody();
+    body.append('text', text);
+    sendComment(edit.href, body).then(function (response) {
+      if (response.status !== 200) {
+        showError(response);
+        return;
+      }
+      return response.text().then(function (html) {
+        comment.outerHTML = html;
+      });
+    });
+  }
+});
+
+var streaming = false;
+
+function pollComments() {
+  var list = document.getElementById('comments');
+  if (!list || document.hidden) {
+    return;
+  }
+  var url = list.dataset.poll + '?since=' +
+    encodeURIComponent(list.dataset.pollCursor);
+  fetch(url, {credentials: 'same-origin'}).then(function (response) {
+    if (response.status !== 200) {
+      return;
+    }
+    return response.json().then(function (data) {
+      data.comments.forEach(function (comment) {
+        if (document.querySelector('[data-comment="' + comment.id + '"]')) {
+          return;
+        }
+        var parent = document.querySelector(
+          '[data-comment="' + comment.parent + '"]'
+        );
+        if (parent) {
+          parent.insertAdjacentHTML('afterend', comment.html);
+        } else {
+          list.insertAdjacentHTML('beforeend', comment.html);
+        }
+      });
+      list.dataset.pollCursor = data.cursor;
+      if (data.has_more) {
+        pollComments();
+      }
+    });
+  });
+}
+
+setInterval(function () {
+  if (!streaming) {
+    pollComments();
+  }
+}, 15000);
+
+(function () {
+  var list = document.getElementById('comments');
+  if (!list || !window.EventSource) {
+    return;
+  }
+  // Под WSGI поток отвечает 204, и остаётся опрос по таймеру.
+  var source = new EventSource(list.dataset.events);
+  source.onopen = function () {
+    streaming = true;
+  };
+  source.onerror = function () {
+    streaming = false;
+  };
+  source.addEventListener('comment', pollComments);
+})();
@@ -0,0 +1,13 @@
+(function () {
+  var banner = document.querySelector('[data-feed-events]');
+  if (!banner || !window.EventSource) {
+    return;
+  }
+  var count = 0;
+  var source = new EventSource(banner.dataset.feedEvents);
+  source.addEventListener('post', function () {
+    count += 1;
+    banner.querySelector('[data-feed-count]').textContent = count;
+    banner.hidden = false;
+  });
+})();
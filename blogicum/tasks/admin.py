@@ -0,0 +1,109 @@
+import datetime
+
+from django.contrib import admin
+from django.db.models import Count, Min
+from django.utils import timezone
+
+from .models import EmailStatus, OutgoingEmail, Task, TaskStatus
+
+
+@admin.register(Task)
+class TaskAdmin(admin.ModelAdmin):
+    list_display = (
+        'name',
+        'queue',
+        'status',
+        'run_at',
+        'attempts',
+        'locked_by',
+        'finished_at',
+    )
+    list_filter = (
+        'status',
+        'queue',
+    )
+    search_fields = ('name',)
+    readonly_fields = (
+        'attempts',
+        'last_error',
+        'locked_by',
+        'locked_at',
+        'created_at',
+        'finished_at',
+    )
+    list_per_page = 50
+    actions = ('retry_tasks',)
+
+    @admin.action(description='Перезапустить выбранные задачи',
+                  permissions=('change',))
+    def retry_tasks(self, request, queryset):
+        count = queryset.exclude(status=TaskStatus.RUNNING).update(
+            status=TaskStatus.QUEUED,
+            run_at=timezone.now(),
+            attempts=0,
+            finished_at=None,
+        )
+        self.message_user(request, f'Перезапущено задач: {count}.')
+
+    def changelist_view(self, request, extra_context=None):
+        now = timezone.now()
+        by_status = dict(Task.objects.values_list('status').annotate(
+            total=Count('id')
+        ).order_by())
+        oldest_due = Task.objects.due().aggregate(
+            oldest=Min('run_at')
+        )['oldest']
+        extra_context = {
+            **(extra_context or {}),
+            'task_stats': [
+                (label, by_status.get(value, 0))
+                for value, label in TaskStatus.choices
+            ],
+            'task_lag': now - oldest_due if oldest_due else None,
+            'tasks_done_last_hour': Task.objects.filter(
+                status=TaskStatus.DONE,
+                finished_at__gte=now - datetime.timedelta(hours=1),
+            ).count(),
+        }
+        return super().changelist_view(request, extra_context)
+
+
+@admin.register(OutgoingEmail)
+class OutgoingEmailAdmin(admin.ModelAdmin):
+    list_display = (
+        '__str__',
+        'domain',
+        'status',
+        'attempts',
+        'send_after',
+        'sent_at',
+    )
+    list_filter = (
+        'status',
+        'domain',
+    )
+    exclude = ('message',)
+    readonly_fields = (
+        'from_email',
+        'recipients',
+        'domain',
+        'attempts',
+        'last_error',
+        'created_at',
+        'sent_at',
+        'claimed_at',
+    )
+    list_per_page = 50
+    actions = ('resend_emails',)
+
+    @admin.action(description='Отправить выбранные письма повторно',
+                  permissions=('change',))
+    def resend_emails(self, request, queryset):
+        from .mail import schedule_delivery
+
+        count = queryset.filter(status=EmailStatus.FAILED).update(
+            status=EmailStatus.QUEUED, send_after=timezone.now(), attempts=0
+        )
+        if count:
+            schedule_delivery()
+        self.message_user(request, f'Возвращено в очередь писем: {count}.')
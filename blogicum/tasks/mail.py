@@ -0,0 +1,244 @@
+import datetime
+import email
+import email.message
+import smtplib
+import traceback
+from collections import Counter
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.core.mail.backends.base import BaseEmailBackend
+from django.core.mail.message import MIMEMixin
+from django.db.models import Count, F, Min, Q
+from django.utils import timezone
+
+from .models import EmailStatus, OutgoingEmail, Task, TaskStatus
+from .queue import enqueue, task_name
+
+
+THROTTLE_WINDOW = datetime.timedelta(minutes=1)
+
+
+def email_domain(address):
+    return address.rsplit('@', 1)[-1].lower()
+
+
+def split_by_domain(recipients):
+    by_domain = {}
+    for address in recipients:
+        by_domain.setdefault(email_domain(address), []).append(address)
+    return by_domain
+
+
+class StoredMessage(MIMEMixin, email.message.Message):
+    pass
+
+
+class StoredEmailMessage(EmailMessage):
+    """Письмо из очереди в уже собранном виде.
+
+    Любой почтовый бэкенд Django отправляет его как обычное
+    EmailMessage, но заголовки и тело не собираются заново.
+    """
+
+    def __init__(self, outgoing):
+        super().__init__(from_email=outgoing.from_email)
+        self.outgoing = outgoing
+
+    def message(self):
+        return email.message_from_bytes(
+            bytes(self.outgoing.message), _class=StoredMessage
+        )
+
+    def recipients(self):
+        return self.outgoing.recipients
+
+
+class QueuedEmailBackend(BaseEmailBackend):
+    """Сохраняет письма в очередь вместо отправки во время запроса.
+
+    Письмо получателям из разных доменов ставится в очередь отдельной
+    строкой на каждый домен с теми же байтами письма: лимит домена
+    считается для всех получателей, а не только для первого.
+    """
+
+    def send_messages(self, email_messages):
+        messages = [
+            message for message in email_messages if message.recipients()
+        ]
+        emails = [
+            OutgoingEmail(
+                from_email=message.from_email,
+                recipients=recipients,
+                domain=domain,
+                message=message.message().as_bytes(),
+            )
+            for message in messages
+            for domain, recipients in split_by_domain(
+                message.recipients()
+            ).items()
+        ]
+        OutgoingEmail.objects.bulk_create(emails)
+        if emails:
+            schedule_delivery()
+        return len(messages)
+
+
+def schedule_delivery(delay=None):
+    name = task_name(deliver_queued_mail)
+    if not Task.objects.filter(name=name, status=TaskStatus.QUEUED).exists():
+        enqueue(name, queue='mail', delay=delay)
+
+
+def domain_quotas():
+    sent = dict(OutgoingEmail.objects.filter(
+        status=EmailStatus.SENT,
+        sent_at__gte=timezone.now() - THROTTLE_WINDOW,
+    ).values_list('domain').annotate(total=Count('id')).order_by())
+    return Counter({
+        domain: settings.EMAIL_DOMAIN_RATE_LIMIT - total
+        for domain, total in sent.items()
+    })
+
+
+def sending_timeout():
+    return datetime.timedelta(seconds=settings.TASKS_LOCK_TIMEOUT)
+
+
+def requeue_stale_mail():
+    """Возвращает в очередь письма обработчика, упавшего при отправке.
+
+    Такое письмо могло уйти до сбоя, поэтому повтор засчитывается как
+    попытка: письмо доставляется хотя бы один раз, но не бесконечно.
+    """
+    stale = OutgoingEmail.objects.filter(
+        status=EmailStatus.SENDING,
+        claimed_at__lt=timezone.now() - sending_timeout(),
+    )
+    failed = stale.filter(
+        attempts__gte=settings.EMAIL_MAX_ATTEMPTS - 1
+    ).update(
+        status=EmailStatus.FAILED,
+        attempts=F('attempts') + 1,
+        claimed_at=None,
+        last_error='Обработчик перестал отвечать.',
+    )
+    return failed + stale.update(
+        status=EmailStatus.QUEUED,
+        attempts=F('attempts') + 1,
+        claimed_at=None,
+    )
+
+
+def claim_batch():
+    """Захватывает письма на отправку с учётом лимитов по доменам."""
+    quotas = domain_quotas()
+    claimed, throttled = [], False
+    due = OutgoingEmail.objects.filter(
+        status=EmailStatus.QUEUED, send_after__lte=timezone.now()
+    ).order_by('send_after', 'id').only('pk', 'domain')
+    for outgoing in due[:settings.EMAIL_QUEUE_BATCH_SIZE]:
+        quota = quotas.get(outgoing.domain, settings.EMAIL_DOMAIN_RATE_LIMIT)
+        if quota <= 0:
+            throttled = True
+            continue
+        if OutgoingEmail.objects.filter(
+            pk=outgoing.pk, status=EmailStatus.QUEUED
+        ).update(status=EmailStatus.SENDING, claimed_at=timezone.now()):
+            quotas[outgoing.domain] = quota - 1
+            claimed.append(outgoing.pk)
+    return list(OutgoingEmail.objects.filter(pk__in=claimed).order_by(
+        'send_after', 'id'
+    )), throttled
+
+
+def is_permanent_failure(error):
+    """Отказ сервера с кодом 5xx: повтор письма его не исправит.
+
+    Ответы 4xx (например, серый список) и обрывы соединения временные.
+    SMTPRecipientsRefused считается окончательным, только если всем
+    получателям отказано с кодом 5xx.
+    """
+    if isinstance(error, smtplib.SMTPRecipientsRefused):
+        codes = [code for code, _ in error.recipients.values()]
+        return bool(codes) and all(500 <= code < 600 for code in codes)
+    if isinstance(error, smtplib.SMTPResponseException):
+        return 500 <= error.smtp_code < 600
+    return False
+
+
+def postpone(outgoing, error, permanent=False):
+    outgoing.attempts += 1
+    outgoing.last_error = error
+    if permanent or outgoing.attempts >= settings.EMAIL_MAX_ATTEMPTS:
+        outgoing.status = EmailStatus.FAILED
+    else:
+        outgoing.status = EmailStatus.QUEUED
+        outgoing.send_after = timezone.now() + datetime.timedelta(
+            seconds=settings.TASKS_RETRY_BACKOFF * 2 ** (outgoing.attempts - 1)
+        )
+
+
+def deliver_queued_mail():
+    """Отправляет пачку писем через одно соединение с сервером.
+
+    Письма сверх EMAIL_DOMAIN_RATE_LIMIT в минуту на домен остаются
+    в очереди до следующего запуска. Возвращает число отправленных.
+    """
+    requeue_stale_mail()
+    batch, throttled = claim_batch()
+    connection = get_connection(settings.EMAIL_DELIVERY_BACKEND)
+    sent = 0
+    try:
+        connection.open()
+    except Exception:
+        error = traceback.format_exc()
+        for outgoing in batch:
+            postpone(outgoing, error)
+    else:
+        try:
+            for outgoing in batch:
+                try:
+                    connection.send_messages([StoredEmailMessage(outgoing)])
+                except Exception as error:
+                    postpone(
+                        outgoing, traceback.format_exc(),
+                        permanent=is_permanent_failure(error),
+                    )
+                else:
+                    outgoing.status = EmailStatus.SENT
+                    outgoing.sent_at = timezone.now()
+                    sent += 1
+        finally:
+            connection.close()
+    for outgoing in batch:
+        outgoing.claimed_at = None
+    OutgoingEmail.objects.bulk_update(batch, [
+        'status', 'attempts', 'last_error', 'send_after', 'sent_at',
+        'claimed_at',
+    ])
+    if throttled:
+        schedule_delivery(delay=THROTTLE_WINDOW.total_seconds())
+    else:
+        schedule_next_delivery()
+    return sent
+
+
+def schedule_next_delivery():
+    """Планирует отправку к следующему письму в очереди.
+
+    Письма, которые сейчас отправляет другой обработчик, тоже
+    учитываются: если он упадёт, их вернёт в очередь следующий запуск.
+    """
+    pending = OutgoingEmail.objects.aggregate(
+        queued=Min('send_after', filter=Q(status=EmailStatus.QUEUED)),
+        sending=Min('claimed_at', filter=Q(status=EmailStatus.SENDING)),
+    )
+    moments = [pending['queued']]
+    if pending['sending'] is not None:
+        moments.append(pending['sending'] + sending_timeout())
+    moments = [moment for moment in moments if moment is not None]
+    if moments:
+        schedule_delivery(
+            delay=max((min(moments) - timezone.now()).total_seconds(), 0)
+        )
@@ -0,0 +1,37 @@
+import signal
+
+from django.core.management.base import BaseCommand
+
+from tasks.queue import Worker
+
+
+class Command(BaseCommand):
+    help = 'Выполняет фоновые задачи из очереди в базе данных.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--concurrency', type=int, default=4)
+        parser.add_argument(
+            '--pool', choices=('thread', 'process', 'inline'),
+            default='thread',
+        )
+        parser.add_argument('--queue', help='Обрабатывать только эту очередь.')
+        parser.add_argument('--poll-interval', type=float)
+        parser.add_argument(
+            '--once', action='store_true',
+            help='Завершиться, когда готовых задач не останется.',
+        )
+
+    def handle(self, *args, **options):
+        worker = Worker(
+            concurrency=options['concurrency'],
+            pool=options['pool'],
+            queue=options['queue'],
+            poll_interval=options['poll_interval'],
+        )
+        signal.signal(signal.SIGTERM, lambda *args: worker.stop())
+        try:
+            done = worker.run(once=options['once'])
+        except KeyboardInterrupt:
+            worker.stop()
+            return
+        self.stdout.write(self.style.SUCCESS(f'Выполнено задач: {done}.'))
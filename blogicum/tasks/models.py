@@ -0,0 +1,221 @@
+import datetime
+
+from django.conf import settings
+from django.db import connection, models, transaction
+from django.db.models import F
+from django.utils import timezone
+
+
+MAX_NAME_LENGTH = 256
+
+
+class TaskStatus(models.IntegerChoices):
+    QUEUED = 0, 'В очереди'
+    RUNNING = 1, 'Выполняется'
+    DONE = 2, 'Выполнена'
+    FAILED = 3, 'Ошибка'
+
+
+class TaskQuerySet(models.QuerySet):
+    def due(self, queue=None):
+        due = self.filter(
+            status=TaskStatus.QUEUED, run_at__lte=timezone.now()
+        )
+        return due if queue is None else due.filter(queue=queue)
+
+    def claim(self, worker, limit, queue=None):
+        """Захватывает до limit готовых задач для обработчика worker.
+
+        Кандидаты выбираются с SELECT ... FOR UPDATE SKIP LOCKED, где
+        база это поддерживает. Сам захват — условный UPDATE по статусу,
+        поэтому даже без блокировок строк (SQLite) одну задачу получает
+        только один обработчик.
+        """
+        features = connection.features
+        with transaction.atomic():
+            candidates = list(self.due(queue).select_for_update(
+                skip_locked=features.has_select_for_update_skip_locked
+            ).order_by('run_at', 'id').values_list('pk', flat=True)[:limit])
+            claimed = [
+                pk for pk in candidates
+                if self.filter(pk=pk, status=TaskStatus.QUEUED).update(
+                    status=TaskStatus.RUNNING,
+                    locked_by=worker,
+                    locked_at=timezone.now(),
+                    attempts=F('attempts') + 1,
+                )
+            ]
+        return list(self.filter(pk__in=claimed).order_by('run_at', 'id'))
+
+    def heartbeat(self, worker, pks):
+        """Продлевает захват задач pks, которые ещё выполняет worker."""
+        return self.filter(
+            pk__in=pks, status=TaskStatus.RUNNING, locked_by=worker
+        ).update(locked_at=timezone.now())
+
+    def requeue_stale(self):
+        """Возвращает в очередь задачи обработчиков, переставших отвечать.
+
+        Обработчик продлевает захват своих задач, пока они выполняются,
+        поэтому устаревший захват значит, что обработчик упал. Задача,
+        исчерпавшая попытки, помечается ошибкой, а не ставится в очередь
+        снова: иначе задача, роняющая обработчик, повторялась бы вечно.
+        """
+        now = timezone.now()
+        stale = self.filter(
+            status=TaskStatus.RUNNING,
+            locked_at__lt=now - datetime.timedelta(
+                seconds=settings.TASKS_LOCK_TIMEOUT
+            ),
+        )
+        failed = stale.filter(attempts__gte=F('max_attempts')).update(
+            status=TaskStatus.FAILED,
+            locked_by='',
+            locked_at=None,
+            finished_at=now,
+            last_error='Обработчик перестал отвечать.',
+        )
+        return failed + stale.update(
+            status=TaskStatus.QUEUED, locked_by='', locked_at=None
+        )
+
+
+class Task(models.Model):
+    name = models.CharField(
+        max_length=MAX_NAME_LENGTH,
+        verbose_name='Функция',
+    )
+    arguments = models.JSONField(
+        default=dict,
+        verbose_name='Аргументы',
+    )
+    queue = models.CharField(
+        max_length=MAX_NAME_LENGTH,
+        default='default',
+        verbose_name='Очередь',
+    )
+    status = models.PositiveSmallIntegerField(
+        choices=TaskStatus.choices,
+        default=TaskStatus.QUEUED,
+        verbose_name='Статус',
+    )
+    run_at = models.DateTimeField(
+        default=timezone.now,
+        verbose_name='Запустить не раньше',
+    )
+    attempts = models.PositiveSmallIntegerField(
+        default=0,
+        verbose_name='Попыток',
+    )
+    max_attempts = models.PositiveSmallIntegerField(
+        default=5,
+        verbose_name='Максимум попыток',
+    )
+    last_error = models.TextField(
+        blank=True,
+        verbose_name='Последняя ошибка',
+    )
+    locked_by = models.CharField(
+        max_length=MAX_NAME_LENGTH,
+        blank=True,
+        verbose_name='Обработчик',
+    )
+    locked_at = models.DateTimeField(
+        null=True,
+        blank=True,
+        verbose_name='Захвачена',
+    )
+    created_at = models.DateTimeField(
+        auto_now_add=True,
+        verbose_name='Добавлено',
+    )
+    finished_at = models.DateTimeField(
+        null=True,
+        blank=True,
+        verbose_name='Завершена',
+    )
+
+    objects = TaskQuerySet.as_manager()
+
+    class Meta:
+        verbose_name = 'задача'
+        verbose_name_plural = 'Задачи'
+        ordering = ('-created_at',)
+        indexes = (
+            models.Index(fields=('status', 'run_at')),
+        )
+
+    def __str__(self):
+        return f'{self.name} #{self.pk}'
+
+    def retry_delay(self):
+        return min(
+            settings.TASKS_RETRY_BACKOFF * 2 ** (self.attempts - 1),
+            settings.TASKS_RETRY_BACKOFF_MAX,
+        )
+
+
+class EmailStatus(models.IntegerChoices):
+    QUEUED = 0, 'В очереди'
+    SENDING = 1, 'Отправляется'
+    SENT = 2, 'Отправлено'
+    FAILED = 3, 'Ошибка'
+
+
+class OutgoingEmail(models.Model):
+    from_email = models.CharField(
+        max_length=MAX_NAME_LENGTH,
+        verbose_name='Отправитель',
+    )
+    recipients = models.JSONField(
+        default=list,
+        verbose_name='Получатели',
+    )
+    domain = models.CharField(
+        max_length=MAX_NAME_LENGTH,
+        verbose_name='Домен получателя',
+    )
+    message = models.BinaryField(verbose_name='Письмо')
+    status = models.PositiveSmallIntegerField(
+        choices=EmailStatus.choices,
+        default=EmailStatus.QUEUED,
+        verbose_name='Статус',
+    )
+    send_after = models.DateTimeField(
+        default=timezone.now,
+        verbose_name='Отправить не раньше',
+    )
+    attempts = models.PositiveSmallIntegerField(
+        default=0,
+        verbose_name='Попыток',
+    )
+    last_error = models.TextField(
+        blank=True,
+        verbose_name='Последняя ошибка',
+    )
+    created_at = models.DateTimeField(
+        auto_now_add=True,
+        verbose_name='Добавлено',
+    )
+    sent_at = models.DateTimeField(
+        null=True,
+        blank=True,
+        verbose_name='Отправлено',
+    )
+    claimed_at = models.DateTimeField(
+        null=True,
+        blank=True,
+        verbose_name='Взято в отправку',
+    )
+
+    class Meta:
+        verbose_name = 'письмо'
+        verbose_name_plural = 'Исходящие письма'
+        ordering = ('-created_at',)
+        indexes = (
+            models.Index(fields=('status', 'send_after')),
+            models.Index(fields=('domain', 'sent_at')),
+        )
+
+    def __str__(self):
+        return f'{", ".join(self.recipients)} #{self.pk}'
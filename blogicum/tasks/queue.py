@@ -0,0 +1,189 @@
+import datetime
+import logging
+import multiprocessing
+import os
+import socket
+import threading
+import time
+import traceback
+from concurrent.futures import (
+    Future, ProcessPoolExecutor, ThreadPoolExecutor
+)
+
+import django
+from django.conf import settings
+from django.db import close_old_connections, connections
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from .models import Task, TaskStatus
+
+
+logger = logging.getLogger(__name__)
+
+
+def task_name(func):
+    if isinstance(func, str):
+        return func
+    return f'{func.__module__}.{func.__qualname__}'
+
+
+def enqueue(func, *args, queue='default', run_at=None, delay=None,
+            max_attempts=None, **kwargs):
+    """Ставит вызов func(*args, **kwargs) в очередь.
+
+    Задача создаётся в текущей транзакции и не будет выполнена, если
+    транзакция откатится. Аргументы должны сериализоваться в JSON.
+    """
+    if run_at is None:
+        run_at = timezone.now()
+    if delay is not None:
+        run_at += datetime.timedelta(seconds=delay)
+    return Task.objects.create(
+        name=task_name(func),
+        arguments={'args': list(args), 'kwargs': kwargs},
+        queue=queue,
+        run_at=run_at,
+        max_attempts=max_attempts or settings.TASKS_MAX_ATTEMPTS,
+    )
+
+
+def run_task(pk):
+    """Выполняет захваченную задачу и записывает результат."""
+    task = Task.objects.get(pk=pk)
+    try:
+        func = import_string(task.name)
+        func(*task.arguments.get('args', ()),
+             **task.arguments.get('kwargs', {}))
+    except Exception:
+        task.last_error = traceback.format_exc()
+        if task.attempts < task.max_attempts:
+            task.status = TaskStatus.QUEUED
+            task.run_at = timezone.now() + datetime.timedelta(
+                seconds=task.retry_delay()
+            )
+        else:
+            task.status = TaskStatus.FAILED
+            task.finished_at = timezone.now()
+        logger.warning('Задача %s завершилась ошибкой', task, exc_info=True)
+    else:
+        task.status = TaskStatus.DONE
+        task.finished_at = timezone.now()
+    task.locked_by = ''
+    task.locked_at = None
+    task.save(update_fields=(
+        'status', 'run_at', 'last_error', 'locked_by', 'locked_at',
+        'finished_at',
+    ))
+    return task.status
+
+
+def _run_in_pool(pk):
+    try:
+        return run_task(pk)
+    finally:
+        close_old_connections()
+
+
+class InlineExecutor:
+    """Выполняет задачи в текущем потоке: для отладки и тестов."""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+    def submit(self, func, *args):
+        future = Future()
+        try:
+            future.set_result(func(*args))
+        except Exception as error:
+            future.set_exception(error)
+        return future
+
+
+class Worker:
+    """Разбирает очередь задач пулом потоков или процессов."""
+
+    def __init__(self, concurrency=4, pool='thread', queue=None,
+                 poll_interval=None):
+        self.concurrency = concurrency
+        self.pool = pool
+        self.queue = queue
+        self.poll_interval = poll_interval or settings.TASKS_POLL_INTERVAL
+        self.name = f'{socket.gethostname()}:{os.getpid()}'
+        self._running = {}
+        self._last_heartbeat = time.monotonic()
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+
+    def make_executor(self):
+        if self.pool == 'inline':
+            return InlineExecutor()
+        if self.pool == 'process':
+            # spawn, а не fork: дочерние процессы не должны наследовать
+            # открытые соединения с базой.
+            connections.close_all()
+            return ProcessPoolExecutor(
+                self.concurrency,
+                mp_context=multiprocessing.get_context('spawn'),
+                initializer=django.setup,
+            )
+        return ThreadPoolExecutor(
+            self.concurrency, thread_name_prefix='task-worker'
+        )
+
+    def stop(self):
+        self._stopped.set()
+
+    def run(self, once=False):
+        """Выполняет задачи; с once=True — пока очередь не опустеет."""
+        done = 0
+        # Вне пула соединение закрывать нельзя: оно общее с циклом.
+        runner = run_task if self.pool == 'inline' else _run_in_pool
+        with self.make_executor() as executor:
+            while not self._stopped.is_set():
+                self.heartbeat()
+                Task.objects.requeue_stale()
+                with self._lock:
+                    free = self.concurrency - len(self._running)
+                tasks = Task.objects.claim(
+                    self.name, free, self.queue
+                ) if free else []
+                for task in tasks:
+                    future = executor.submit(runner, task.pk)
+                    with self._lock:
+                        self._running[future] = task.pk
+                    future.add_done_callback(self._finished)
+                    done += 1
+                with self._lock:
+                    idle = not self._running
+                if once and idle and not tasks:
+                    break
+                if not tasks:
+                    time.sleep(self.poll_interval if not once else 0.05)
+        return done
+
+    def heartbeat(self):
+        """Раз в TASKS_HEARTBEAT_INTERVAL продлевает захват своих задач.
+
+        Продлевает цикл обработчика, а не сами задачи, поэтому долгая
+        задача в пуле не считается зависшей. В пуле inline задача
+        выполняется в том же цикле и продлевать её некому.
+        """
+        now = time.monotonic()
+        if now - self._last_heartbeat < settings.TASKS_HEARTBEAT_INTERVAL:
+            return 0
+        self._last_heartbeat = now
+        with self._lock:
+            pks = list(self._running.values())
+        return Task.objects.heartbeat(self.name, pks) if pks else 0
+
+    def _finished(self, future):
+        with self._lock:
+            self._running.pop(future, None)
+        if future.exception() is not None:
+            logger.error(
+                'Сбой обработчика задач', exc_info=future.exception()
+            )
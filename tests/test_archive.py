@@ -0,0 +1,67 @@
+from datetime import datetime
+
+import pytest
+from django.utils import timezone
+
+from blog.models import ArchiveMonth
+
+pytestmark = [pytest.mark.django_db]
+
+
+def month_count(year, month):
+    return ArchiveMonth.objects.filter(
+        year=year, month=month
+    ).values_list('posts_count', flat=True).first() or 0
+
+
+@pytest.fixture
+def march_post(mixer, user, published_category):
+    return mixer.blend(
+        'blog.Post',
+        author=user,
+        category=published_category,
+        is_published=True,
+        pub_date=timezone.make_aware(datetime(2023, 3, 15, 12)),
+    )
+
+
+def test_archive_counts_are_maintained(march_post, published_category):
+    assert month_count(2023, 3) == 1, (
+        "Убедитесь, что при создании публикации обновляется счётчик архива."
+    )
+    march_post.pub_date = timezone.make_aware(datetime(2023, 4, 1, 12))
+    march_post.save()
+    assert (month_count(2023, 3), month_count(2023, 4)) == (0, 1)
+    march_post.is_published = False
+    march_post.save()
+    assert month_count(2023, 4) == 0
+    march_post.is_published = True
+    march_post.save()
+    published_category.is_published = False
+    published_category.save()
+    assert month_count(2023, 4) == 0, (
+        "Убедитесь, что снятие категории с публикации обновляет архив."
+    )
+    published_category.is_published = True
+    published_category.save()
+    assert month_count(2023, 4) == 1
+    march_post.delete()
+    assert month_count(2023, 4) == 0
+
+
+def test_rebuild_matches_incremental_counts(march_post):
+    ArchiveMonth.objects.update(posts_count=42)
+    ArchiveMonth.rebuild()
+    assert month_count(2023, 3) == 1
+
+
+def test_archive_month_page(client, march_post, post_with_published_location):
+    response = client.get('/archive/2023/3/')
+    assert response.status_code == 200
+    assert list(response.context['page_obj']) == [march_post]
+    assert '/archive/2023/3/' in client.get('/').content.decode('utf-8')
+    assert client.get('/archive/2023/13/').status_code == 404
+    assert client.get('/archive/9999/12/').status_code == 404, (
+        "Убедитесь, что месяц за пределами дат не приводит к ошибке 500."
+    )
+    assert client.get('/archive/1/1/').status_code == 200
@@ -0,0 +1,146 @@
+import threading
+from io import StringIO
+
+import pytest
+from asgiref.sync import async_to_sync
+from django.contrib.auth.models import AnonymousUser
+from django.contrib.sessions.backends.db import SessionStore
+from django.core.management import call_command
+from django.db import connections
+from django.http import Http404
+from django.test import AsyncClient
+
+from blog import async_views
+from blog.management.commands.bench_views import reload_urls
+from blog.models import Post
+from blogicum.db import read_from_replicas
+
+pytestmark = [pytest.mark.django_db]
+
+
+@pytest.fixture
+def get(rf):
+    def get(view, user=None, data=None, **kwargs):
+        request = rf.get('/', data or {})
+        request.user = user or AnonymousUser()
+        request.session = SessionStore()
+        return async_to_sync(view)(request, **kwargs)
+    return get
+
+
+def test_index(get, post_with_published_location):
+    response = get(async_views.index)
+    assert response.status_code == 200
+    assert post_with_published_location.title in response.content.decode()
+
+
+def test_index_bad_page(get, post_with_published_location):
+    for page in ('0', '2', 'x'):
+        with pytest.raises(Http404):
+            get(async_views.index, data={'page': page})
+
+
+def test_category(get, post_with_published_location):
+    category = post_with_published_location.category
+    response = get(async_views.category_posts, category_slug=category.slug)
+    assert post_with_published_location.title in response.content.decode()
+    with pytest.raises(Http404):
+        get(async_views.category_posts, category_slug='missing')
+
+
+def test_profile_shows_hidden_posts_to_owner(
+        get, user, unpublished_posts_with_published_locations):
+    hidden = unpublished_posts_with_published_locations[0]
+    response = get(async_views.profile, username=user.username)
+    assert hidden.title not in response.content.decode()
+    response = get(async_views.profile, user=user, username=user.username)
+    assert hidden.title in response.content.decode(), (
+        "Убедитесь, что автор видит свои скрытые публикации в профиле."
+    )
+
+
+def test_post_detail(get, mixer, user, post_with_published_location):
+    comment = mixer.blend(
+        'blog.Comment', author=user, post=post_with_published_location
+    )
+    response = get(
+        async_views.post_detail, post_id=post_with_published_location.id
+    )
+    content = response.content.decode()
+    assert post_with_published_location.title in content
+    assert f'data-comment="{comment.id}"' in content
+
+
+def test_hidden_post_detail(get, user,
+                            unpublished_posts_with_published_locations):
+    post = unpublished_posts_with_published_locations[0]
+    with pytest.raises(Http404):
+        get(async_views.post_detail, post_id=post.id)
+    response = get(async_views.post_detail, user=user, post_id=post.id)
+    assert response.status_code == 200
+
+
+@pytest.fixture
+def async_urls(settings):
+    settings.ASYNC_VIEWS = True
+    reload_urls()
+    yield
+    settings.ASYNC_VIEWS = False
+    reload_urls()
+
+
+@pytest.mark.django_db(transaction=True)
+def test_pages_through_async_client(
+        async_urls, user, post_with_published_location):
+    post = post_with_published_location
+    client = AsyncClient()
+    for path in (
+        '/',
+        f'/posts/{post.id}/',
+        f'/category/{post.category.slug}/',
+        f'/profile/{user.username}/',
+    ):
+        response = async_to_sync(client.get)(path)
+        assert response.status_code == 200, (
+            f"Убедитесь, что страница {path} отвечает под ASGI "
+            "с ASYNC_VIEWS=True."
+        )
+        assert post.title in response.content.decode()
+
+
+@pytest.fixture
+def file_replica(settings, tmp_path):
+    settings.DATABASES = {**settings.DATABASES, 'replica': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': str(tmp_path / 'replica.sqlite3'),
+    }}
+    settings.DATABASE_REPLICAS = ['replica']
+    connections.settings['replica'] = dict(settings.DATABASES['replica'])
+    yield
+    connections['replica'].close()
+    del connections['replica']
+    del connections.settings['replica']
+
+
+@pytest.mark.django_db(transaction=True)
+def test_gather_db_queries_concurrently(
+        file_replica, post_with_published_location):
+    call_command('sync_replicas', stdout=StringIO())
+    # Оба запроса ждут друг друга: последовательно они не выполнятся.
+    barrier = threading.Barrier(2, timeout=5)
+    threads = []
+
+    def count_posts():
+        barrier.wait()
+        threads.append(threading.get_ident())
+        return Post.objects.count()
+
+    async def gather():
+        with read_from_replicas():
+            return await async_views.gather_db(count_posts, count_posts)
+
+    assert async_to_sync(gather)() == [1, 1]
+    assert len(set(threads)) == 2, (
+        "Убедитесь, что gather_db с файловой базой выполняет запросы "
+        "в разных потоках одновременно."
+    )
@@ -0,0 +1,81 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from blog import autocomplete
+from blog.models import Category, DataVersion
+
+pytestmark = [pytest.mark.django_db]
+
+
+@pytest.fixture(autouse=True)
+def clear_indexes(monkeypatch):
+    monkeypatch.setattr(autocomplete, '_indexes', {})
+
+
+@pytest.fixture
+def categories(mixer):
+    return [
+        mixer.blend('blog.Category', title=title)
+        for title in ('Путешествия', 'Путь самурая', 'Кулинария')
+    ]
+
+
+def test_category_autocomplete_by_prefix(client, categories):
+    response = client.get('/autocomplete/category/', {'q': 'пут'})
+    assert response.status_code == 200
+    titles = {item['text'] for item in response.json()['results']}
+    assert titles == {'Путешествия', 'Путь самурая'}
+
+
+def test_autocomplete_is_cached_and_invalidated(client, categories):
+    client.get('/autocomplete/category/', {'q': 'Кул'})
+    with CaptureQueriesContext(connection) as queries:
+        client.get('/autocomplete/category/', {'q': 'кул'})
+    assert not [q for q in queries if 'blog_category' in q['sql']], (
+        "Убедитесь, что ответы автодополнения кешируются."
+    )
+    categories[2].title = 'Кулинарные рецепты'
+    categories[2].save()
+    response = client.get('/autocomplete/category/', {'q': 'кул'})
+    assert response.json()['results'][0]['text'] == 'Кулинарные рецепты'
+
+
+def test_unpublished_categories_are_not_suggested(client, categories):
+    categories[0].is_published = False
+    categories[0].save()
+    response = client.get('/autocomplete/category/', {'q': 'пут'})
+    assert [item['text'] for item in response.json()['results']] == [
+        'Путь самурая'
+    ], "Убедитесь, что автодополнение не раскрывает скрытые категории."
+
+
+def test_change_in_another_process_invalidates_index(client, categories):
+    client.get('/autocomplete/category/', {'q': 'кул'})
+    # Другой процесс меняет данные: сигналы здесь не срабатывают,
+    # видна только версия в базе.
+    Category.objects.filter(pk=categories[2].pk).update(title='Кулебяка')
+    DataVersion.bump(autocomplete._version_key(Category))
+    response = client.get('/autocomplete/category/', {'q': 'кул'})
+    assert response.json()['results'][0]['text'] == 'Кулебяка'
+
+
+def test_create_page_does_not_render_all_choices(user_client, categories):
+    content = user_client.get('/posts/create/').content.decode('utf-8')
+    assert '<select' not in content
+    assert categories[0].title not in content
+    assert '/autocomplete/category/' in content
+
+
+def test_selected_choice_label_is_not_truncated(
+        user_client, post_with_published_location):
+    category = post_with_published_location.category
+    category.title = 'Путешествия по горам Кавказа'
+    category.save()
+    content = user_client.get(
+        f'/posts/{post_with_published_location.id}/edit/'
+    ).content.decode('utf-8')
+    assert 'value="Путешествия по горам Кавказа"' in content, (
+        "Убедитесь, что подпись выбранной категории показывает название "
+        "целиком."
+    )
@@ -0,0 +1,60 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from blog.models import Category
+
+pytestmark = [pytest.mark.django_db]
+
+
+def posts_count(category):
+    return Category.objects.values_list(
+        'posts_count', flat=True
+    ).get(pk=category.pk)
+
+
+def test_posts_count_is_maintained(
+        mixer, user, published_category, another_category):
+    post = mixer.blend(
+        'blog.Post', author=user, category=published_category,
+        is_published=True,
+    )
+    assert posts_count(published_category) == 1, (
+        "Убедитесь, что счётчик публикаций категории обновляется "
+        "при создании публикации."
+    )
+    post.category = another_category
+    post.save()
+    assert (posts_count(published_category),
+            posts_count(another_category)) == (0, 1)
+    post.is_published = False
+    post.save()
+    assert posts_count(another_category) == 0
+    post.is_published = True
+    post.save()
+    post.delete()
+    assert posts_count(another_category) == 0
+
+
+def test_rebuild_posts_count(mixer, user, published_category):
+    mixer.cycle(2).blend(
+        'blog.Post', author=user, category=published_category,
+        is_published=True,
+    )
+    Category.objects.update(posts_count=0)
+    Category.rebuild_posts_count()
+    assert posts_count(published_category) == 2
+
+
+def test_category_list_page(client, mixer, user, published_category):
+    hidden = mixer.blend('blog.Category', is_published=False)
+    mixer.blend('blog.Post', author=user, category=published_category)
+    with CaptureQueriesContext(connection) as queries:
+        response = client.get('/category/')
+    assert response.status_code == 200
+    assert list(response.context['page_obj']) == [published_category]
+    assert hidden not in response.context['page_obj']
+    assert not [q for q in queries if 'blog_post' in q['sql']], (
+        "Убедитесь, что страница категорий не обращается к таблице "
+        "публикаций."
+    )
@@ -0,0 +1,75 @@
+import pytest
+from django.core.cache import cache
+
+from blog.models import Comment
+
+pytestmark = [pytest.mark.django_db]
+
+AJAX = {'HTTP_X_REQUESTED_WITH': 'XMLHttpRequest'}
+
+
+@pytest.fixture(autouse=True)
+def clear_rate_limits():
+    cache.clear()
+
+
+@pytest.fixture
+def comment(mixer, user, post_with_published_location):
+    return mixer.blend(
+        'blog.Comment', author=user, post=post_with_published_location
+    )
+
+
+def test_create_returns_fragment(user_client, post_with_published_location):
+    response = user_client.post(
+        f'/posts/{post_with_published_location.id}/comment/',
+        {'text': 'Новый комментарий'}, **AJAX,
+    )
+    assert response.status_code == 201, (
+        "Убедитесь, что при отправке через fetch комментарий создаётся "
+        "без перенаправления."
+    )
+    comment = Comment.objects.get()
+    content = response.content.decode()
+    assert f'data-comment="{comment.id}"' in content
+    assert 'Новый комментарий' in content
+    assert '<html' not in content, (
+        "Убедитесь, что в ответ возвращается только фрагмент комментария."
+    )
+
+
+def test_create_invalid_returns_errors(
+        user_client, post_with_published_location):
+    response = user_client.post(
+        f'/posts/{post_with_published_location.id}/comment/',
+        {'text': ''}, **AJAX,
+    )
+    assert response.status_code == 400
+    assert 'text' in response.json()['errors']
+
+
+def test_edit_returns_fragment(user_client, comment):
+    response = user_client.post(
+        f'/posts/{comment.post_id}/edit_comment/{comment.id}/',
+        {'text': 'Исправленный текст'}, **AJAX,
+    )
+    assert response.status_code == 200
+    assert 'Исправленный текст' in response.content.decode()
+    comment.refresh_from_db()
+    assert comment.text == 'Исправленный текст'
+
+
+def test_delete_returns_no_content(user_client, comment):
+    response = user_client.post(
+        f'/posts/{comment.post_id}/delete_comment/{comment.id}/', **AJAX
+    )
+    assert response.status_code == 204
+    assert not Comment.objects.exists()
+
+
+def test_foreign_comment_is_forbidden(another_user_client, comment):
+    response = another_user_client.post(
+        f'/posts/{comment.post_id}/delete_comment/{comment.id}/', **AJAX
+    )
+    assert response.status_code == 403
+    assert Comment.objects.exists()
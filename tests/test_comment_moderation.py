@@ -0,0 +1,78 @@
+import pytest
+from django.db.models.signals import post_delete
+
+from blog.models import Comment
+
+pytestmark = [pytest.mark.django_db]
+
+CHANGELIST_URL = '/admin/blog/comment/'
+
+
+def run_action(admin_client, action, comments):
+    return admin_client.post(CHANGELIST_URL, {
+        'action': action,
+        '_selected_action': [comment.pk for comment in comments],
+    }, follow=True)
+
+
+@pytest.fixture
+def spam(mixer, user, post_with_published_location):
+    return mixer.cycle(3).blend(
+        'blog.Comment', author=user, post=post_with_published_location
+    )
+
+
+def test_hide_and_unhide(admin_client, client, spam,
+                         post_with_published_location):
+    response = run_action(admin_client, 'hide_comments', spam[:2])
+    assert 'Скрыто комментариев: 2.' in response.content.decode()
+    assert Comment.objects.published().count() == 1
+    index = client.get('/').content.decode()
+    assert 'Комментарии (1)' in index, (
+        "Убедитесь, что скрытые комментарии не учитываются в счётчике."
+    )
+    detail = client.get(f'/posts/{post_with_published_location.id}/')
+    assert detail.context['comments'] == [spam[2]]
+    run_action(admin_client, 'unhide_comments', spam[:2])
+    assert Comment.objects.published().count() == 3
+
+
+def test_delete_by_author_removes_reply_subtrees(
+        admin_client, mixer, another_user, spam):
+    reply = Comment.objects.create(
+        post=spam[0].post, author=another_user, text='Reply', parent=spam[0]
+    )
+    other = mixer.blend('blog.Comment', author=another_user)
+    response = run_action(admin_client, 'delete_by_author', spam[:1])
+    assert 'Удалено комментариев: 4' in response.content.decode()
+    assert not Comment.objects.filter(pk=reply.pk).exists()
+    assert list(Comment.objects.all()) == [other]
+
+
+def test_delete_by_post(admin_client, mixer, spam):
+    other = mixer.blend('blog.Comment')
+    run_action(admin_client, 'delete_by_post', spam[1:2])
+    assert list(Comment.objects.all()) == [other]
+
+
+def test_delete_with_replies_sends_signals(
+        client, another_user, spam, post_with_published_location):
+    reply = Comment.objects.create(
+        post=spam[0].post, author=another_user, text='Reply', parent=spam[0]
+    )
+    deleted = []
+
+    def remember(sender, instance, **kwargs):
+        deleted.append(instance.pk)
+
+    post_delete.connect(remember, sender=Comment)
+    try:
+        assert Comment.objects.filter(
+            pk=spam[0].pk
+        ).delete_with_replies() == 2
+    finally:
+        post_delete.disconnect(remember, sender=Comment)
+    assert sorted(deleted) == sorted([spam[0].pk, reply.pk]), (
+        "Убедитесь, что удаление веток отправляет сигналы post_delete."
+    )
+    assert 'Комментарии (2)' in client.get('/').content.decode()
@@ -0,0 +1,42 @@
+import pytest
+
+from blog.views import COMMENTS_PER_PAGE
+
+pytestmark = [pytest.mark.django_db]
+
+
+@pytest.fixture
+def many_comments(mixer, post_with_published_location):
+    return mixer.cycle(COMMENTS_PER_PAGE + 5).blend(
+        'blog.Comment', post=post_with_published_location,
+        text=(f'Comment {i}' for i in range(COMMENTS_PER_PAGE + 5)),
+    )
+
+
+def test_detail_embeds_first_comment_page(
+        client, post_with_published_location, many_comments):
+    response = client.get(f'/posts/{post_with_published_location.id}/')
+    assert response.context['comments'] == many_comments[:COMMENTS_PER_PAGE]
+    assert response.context['comments_next_cursor'], (
+        "Убедитесь, что на странице поста есть ссылка на следующую "
+        "страницу комментариев."
+    )
+
+
+def test_load_more_returns_next_page(
+        client, post_with_published_location, many_comments):
+    url = f'/posts/{post_with_published_location.id}/comments/'
+    first = client.get(url)
+    cursor = first.context['comments_next_cursor']
+    second = client.get(url, {'after': cursor})
+    assert second.status_code == 200
+    assert second.context['comments'] == many_comments[COMMENTS_PER_PAGE:]
+    assert second.context['comments_next_cursor'] is None
+    assert 'Comment 0<' not in second.content.decode('utf-8')
+    assert client.get(url, {'after': 'garbage'}).status_code == 400
+
+
+def test_comment_page_respects_post_visibility(
+        client, unpublished_posts_with_published_locations):
+    post = unpublished_posts_with_published_locations[0]
+    assert client.get(f'/posts/{post.id}/comments/').status_code == 404
@@ -0,0 +1,53 @@
+import pytest
+from django.core.management import call_command
+
+from blog import models
+from blog.models import Comment
+
+pytestmark = [pytest.mark.django_db]
+
+
+@pytest.fixture
+def comment(user, post_with_published_location):
+    return Comment.objects.create(
+        author=user, post=post_with_published_location,
+        text='<b>Первая</b>\nвторая',
+    )
+
+
+def test_html_rendered_on_save(comment):
+    comment.refresh_from_db()
+    assert comment.rendered_text == {
+        'version': models.COMMENT_RENDER_VERSION,
+        'html': '&lt;b&gt;Первая&lt;/b&gt;<br>вторая',
+    }, "Убедитесь, что HTML комментария сохраняется при записи."
+
+
+def test_html_regenerated_on_edit(comment):
+    comment.text = 'Новый текст'
+    comment.save(update_fields=['text'])
+    comment.refresh_from_db()
+    assert comment.text_html == 'Новый текст'
+
+
+def test_detail_uses_stored_html(client, comment):
+    Comment.objects.filter(pk=comment.pk).update(
+        rendered_text={
+            'version': models.COMMENT_RENDER_VERSION, 'html': 'Из базы',
+        }
+    )
+    response = client.get(f'/posts/{comment.post_id}/')
+    assert 'Из базы' in response.content.decode(), (
+        "Убедитесь, что на странице публикации выводится сохранённый HTML."
+    )
+
+
+def test_stale_html_is_rerendered(monkeypatch, comment):
+    monkeypatch.setattr(
+        models, 'COMMENT_RENDER_VERSION', models.COMMENT_RENDER_VERSION + 1
+    )
+    stale = Comment.objects.get(pk=comment.pk)
+    assert stale.text_html.endswith('<br>вторая')
+    assert Comment.objects.stale_rendered().count() == 1
+    call_command('render_comments')
+    assert not Comment.objects.stale_rendered().exists()
@@ -0,0 +1,103 @@
+import pytest
+from django.db import DatabaseError, connection
+from django.test.utils import CaptureQueriesContext
+
+from blog import models, spam
+from blog.models import Comment
+from blog.pagination import thread_page
+
+pytestmark = [pytest.mark.django_db]
+
+
+@pytest.fixture
+def threads(mixer, user, post_with_published_location):
+    roots = mixer.cycle(3).blend(
+        'blog.Comment', post=post_with_published_location, author=user
+    )
+    for root in roots:
+        parent = root
+        for i in range(5):
+            reply = Comment.objects.create(
+                post=post_with_published_location, author=user,
+                text=f'Reply {root.pk}-{i}', parent=parent if i % 2 else root,
+            )
+            parent = reply
+    return roots
+
+
+def test_paths_follow_tree(threads):
+    root = threads[0]
+    assert root.path == f'{root.pk:010d}'
+    for reply in Comment.objects.subtree(root):
+        assert reply.path.startswith(reply.parent.path + '.'), (
+            "Убедитесь, что путь ответа продолжает путь родителя."
+        )
+    assert Comment.objects.subtree(root).count() == 5
+
+
+def test_thread_page_uses_constant_queries(
+        post_with_published_location, threads):
+    queryset = Comment.objects.filter(post=post_with_published_location)
+    with CaptureQueriesContext(connection) as queries:
+        roots, next_cursor = thread_page(queryset, size=10, replies_limit=2)
+        for root in roots:
+            list(root.preview_replies)
+    assert len(queries) == 2, (
+        "Убедитесь, что страница веток загружается фиксированным "
+        "числом запросов."
+    )
+    assert roots == threads
+    assert next_cursor is None
+    for root in roots:
+        assert root.replies_count == 5
+        assert root.preview_replies == list(
+            Comment.objects.subtree(root)[:2]
+        )
+
+
+def test_first_replies_are_ranked_by_window(threads):
+    with CaptureQueriesContext(connection) as queries:
+        replies = list(Comment.objects.first_replies(threads, 3))
+    (sql,) = [query['sql'] for query in queries]
+    assert 'ROW_NUMBER()' in sql and 'COUNT(' not in sql, (
+        "Убедитесь, что позиция ответа считается оконной функцией, "
+        "а не подзапросом по предыдущим ответам."
+    )
+    assert replies == [
+        reply for root in threads
+        for reply in Comment.objects.subtree(root)[:3]
+    ]
+
+
+def test_comment_without_path_is_not_saved(
+        monkeypatch, user, post_with_published_location):
+    def broken_make_path(parent, pk):
+        raise DatabaseError('path')
+
+    monkeypatch.setattr(models, 'make_path', broken_make_path)
+    with pytest.raises(DatabaseError):
+        Comment.objects.create(
+            post=post_with_published_location, author=user, text='Lost'
+        )
+    assert not Comment.objects.filter(text='Lost').exists(), (
+        "Убедитесь, что комментарий и его путь сохраняются в одной "
+        "транзакции."
+    )
+
+
+def test_reply_is_created_and_rendered(
+        user_client, post_with_published_location, threads, mixer):
+    root = threads[0]
+    url = f'/posts/{post_with_published_location.id}/comment/'
+    user_client.post(url, {'text': 'Fresh reply', 'parent': root.pk})
+    reply = Comment.objects.get(text='Fresh reply')
+    assert reply.parent == root
+    foreign = mixer.blend('blog.Comment')
+    response = user_client.post(url, {'text': 'Bad', 'parent': foreign.pk})
+    assert response.status_code == 404
+    spam.score_pending(batch_size=100)
+    thread_url = (
+        f'/posts/{post_with_published_location.id}'
+        f'/comments/{root.pk}/replies/'
+    )
+    assert 'Fresh reply' in user_client.get(thread_url).content.decode()
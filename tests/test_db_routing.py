@@ -0,0 +1,202 @@
+import asyncio
+import sqlite3
+from io import StringIO
+
+import pytest
+from django.core.handlers.asgi import ASGIHandler
+from django.core.management import call_command
+from django.db import connections, router
+from django.http import HttpResponse
+from django.test import RequestFactory
+from django.urls import reverse
+from django.utils import timezone
+
+from blog.management.commands.bench_views import reload_urls
+from blog.models import Category, Post
+from blog.counters import ViewCounterBuffer
+from blogicum.db import (
+    PrimaryStickinessMiddleware, read_from_replicas, replica_reads
+)
+
+PASSWORD = 'replica-password'
+
+
+def routed_view(write=False, replicas_allowed=True):
+    def view(request):
+        before = router.db_for_read(Post)
+        if write:
+            router.db_for_write(Post)
+        return HttpResponse(f'{before},{router.db_for_read(Post)}')
+    if replicas_allowed:
+        view = replica_reads(view)
+    return PrimaryStickinessMiddleware(view)
+
+
+@pytest.fixture
+def replicas(settings):
+    settings.DATABASE_REPLICAS = ['replica']
+
+
+def test_reads_go_to_primary_by_default(replicas):
+    assert router.db_for_read(Post) == 'default', (
+        "Убедитесь, что вне запросов чтение идёт с основной базы."
+    )
+    with read_from_replicas():
+        assert router.db_for_read(Post) == 'replica'
+        assert router.db_for_write(Post) == 'default'
+        assert router.db_for_read(Post) == 'default', (
+            "Убедитесь, что после записи чтение идёт с основной базы."
+        )
+
+
+def test_safe_requests_read_from_replicas(replicas):
+    response = routed_view()(RequestFactory().get('/'))
+    assert response.content == b'replica,replica'
+    assert 'primary_db' not in response.cookies
+    response = routed_view()(RequestFactory().post('/'))
+    assert response.content == b'default,default', (
+        "Убедитесь, что небезопасные запросы читают с основной базы."
+    )
+
+
+def test_only_marked_views_read_from_replicas(replicas):
+    response = routed_view(replicas_allowed=False)(RequestFactory().get('/'))
+    assert response.content == b'default,default', (
+        "Убедитесь, что с реплик читают только view, помеченные "
+        "replica_reads."
+    )
+
+
+@pytest.mark.django_db
+def test_counter_flush_does_not_stick_to_primary(
+        replicas, post_with_published_location):
+    buffer = ViewCounterBuffer(flush_size=1)
+
+    @replica_reads
+    def view(request):
+        buffer.increment(post_with_published_location.id)
+        return HttpResponse(router.db_for_read(Post))
+
+    response = PrimaryStickinessMiddleware(view)(RequestFactory().get('/'))
+    assert response.content == b'replica'
+    assert 'primary_db' not in response.cookies, (
+        "Убедитесь, что сброс счётчиков просмотров не считается записью "
+        "клиента."
+    )
+    post_with_published_location.refresh_from_db()
+    assert post_with_published_location.views == 1
+
+
+def test_client_sticks_to_primary_after_write(replicas):
+    response = routed_view(write=True)(RequestFactory().post('/'))
+    assert response.cookies['primary_db']['max-age'] == 10, (
+        "Убедитесь, что после записи клиент получает cookie привязки "
+        "к основной базе."
+    )
+    request = RequestFactory().get('/')
+    request.COOKIES['primary_db'] = '1'
+    assert routed_view()(request).content == b'default,default'
+
+
+def test_no_sticky_cookie_without_replicas():
+    response = routed_view(write=True)(RequestFactory().post('/'))
+    assert 'primary_db' not in response.cookies
+
+
+@pytest.fixture
+def sqlite_replica(settings, tmp_path):
+    name = str(tmp_path / 'replica.sqlite3')
+    settings.DATABASES = {**settings.DATABASES, 'replica': {
+        'ENGINE': 'django.db.backends.sqlite3', 'NAME': name,
+    }}
+    settings.DATABASE_REPLICAS = ['replica']
+    connections.settings['replica'] = dict(settings.DATABASES['replica'])
+    yield name
+    connections['replica'].close()
+    del connections['replica']
+    del connections.settings['replica']
+
+
+def create_post(author, category, title):
+    return Post.objects.create(
+        title=title, text='Текст', author=author, category=category,
+        pub_date=timezone.now() - timezone.timedelta(days=1),
+    )
+
+
+@pytest.mark.django_db(transaction=True)
+def test_replica_lag_and_read_your_writes(
+        sqlite_replica, client, django_user_model):
+    author = django_user_model.objects.create_user(
+        username='replicant', password=PASSWORD
+    )
+    category = Category.objects.create(
+        title='Категория', description='Описание', slug='replica'
+    )
+    create_post(author, category, 'Уже на реплике')
+    call_command('sync_replicas', stdout=StringIO())
+    with sqlite3.connect(sqlite_replica) as replica:
+        assert replica.execute(
+            'SELECT COUNT(*) FROM blog_post'
+        ).fetchone() == (1,)
+    create_post(author, category, 'Ещё не на реплике')
+
+    content = client.get(reverse('blog:index')).content.decode()
+    assert 'Уже на реплике' in content
+    assert 'Ещё не на реплике' not in content, (
+        "Убедитесь, что лента читается с реплики."
+    )
+
+    client.post(reverse('login'), {
+        'username': 'replicant', 'password': PASSWORD,
+    })
+    assert 'primary_db' in client.cookies, (
+        "Убедитесь, что после входа клиент читает с основной базы."
+    )
+    content = client.get(reverse('blog:index')).content.decode()
+    assert 'Ещё не на реплике' in content
+
+
+@pytest.fixture
+def async_views(settings):
+    settings.ASYNC_VIEWS = True
+    reload_urls()
+    yield
+    settings.ASYNC_VIEWS = False
+    reload_urls()
+
+
+def asgi_get(path):
+    sent = []
+
+    async def receive():
+        return {'type': 'http.request', 'body': b'', 'more_body': False}
+
+    async def send(message):
+        sent.append(message)
+
+    # Как под настоящим сервером: цикл событий в главном потоке,
+    # без внешнего async_to_sync.
+    asyncio.run(asyncio.wait_for(ASGIHandler()({
+        'type': 'http',
+        'method': 'GET',
+        'path': path,
+        'root_path': '',
+        'query_string': b'',
+        'headers': [(b'host', b'127.0.0.1')],
+    }, receive, send), 10))
+    return sent[0]['status'], b''.join(
+        message.get('body', b'') for message in sent[1:]
+    )
+
+
+@pytest.mark.django_db(transaction=True)
+def test_async_pages_through_asgi_with_middleware(
+        async_views, post_with_published_location):
+    status, content = asgi_get(f'/posts/{post_with_published_location.id}/')
+    assert status == 200, (
+        "Убедитесь, что PrimaryStickinessMiddleware не мешает асинхронным "
+        "view под ASGI."
+    )
+    assert post_with_published_location.title.encode() in content
+    assert asgi_get('/')[0] == 200
@@ -0,0 +1,167 @@
+import asyncio
+import json
+import threading
+
+import pytest
+from asgiref.sync import async_to_sync
+
+from blog import events
+from blog.events import EventStreamRouter, LocalBroker
+
+
+class RecordingBroker(LocalBroker):
+    published = []
+
+    def publish(self, channel, message):
+        self.published.append((channel, message))
+        return super().publish(channel, message)
+
+
+@pytest.fixture
+def broker(settings, monkeypatch):
+    settings.EVENTS_BROKER = 'test_events.RecordingBroker'
+    settings.EVENTS_KEEPALIVE = 0.05
+    monkeypatch.setattr(events, '_broker', None)
+    RecordingBroker.published = []
+    return events.get_broker()
+
+
+async def not_found(scope, receive, send):
+    raise AssertionError('Запрос не должен попасть в Django.')
+
+
+def http_scope(path, host=b'127.0.0.1', root_path=''):
+    return {
+        'type': 'http',
+        'method': 'GET',
+        'path': path,
+        'root_path': root_path,
+        'query_string': b'',
+        'headers': [(b'host', host)],
+    }
+
+
+async def read_stream(path, publish, **scope):
+    """Открывает поток, публикует событие и отключается после него.
+
+    receive() ведёт себя как настоящий сервер: сначала отдаёт
+    http.request, а http.disconnect — только после события.
+    """
+    sent = []
+    received = asyncio.Event()
+    messages = [{'type': 'http.request', 'body': b'', 'more_body': False}]
+
+    async def send(message):
+        sent.append(message)
+        if b'event:' in message.get('body', b''):
+            received.set()
+
+    async def receive():
+        if messages:
+            return messages.pop(0)
+        await received.wait()
+        return {'type': 'http.disconnect'}
+
+    task = asyncio.ensure_future(EventStreamRouter(not_found)(
+        http_scope(path, **scope), receive, send
+    ))
+    while not sent and not task.done():
+        await asyncio.sleep(0.01)
+    if sent[0]['status'] == 200:
+        await asyncio.sleep(0.1)
+        threading.Thread(target=publish).start()
+    await asyncio.wait_for(task, 5)
+    return sent
+
+
+def test_local_broker_delivers_across_threads():
+    broker = LocalBroker()
+
+    async def scenario():
+        queue = asyncio.Queue()
+        broker.subscribe('posts', queue)
+        threading.Thread(
+            target=broker.publish, args=('posts', ('post', '{}'))
+        ).start()
+        message = await asyncio.wait_for(queue.get(), 5)
+        broker.unsubscribe('posts', queue)
+        return message
+
+    assert asyncio.run(scenario()) == ('post', '{}')
+    assert broker.publish('posts', ('post', '{}')) == 0, (
+        "Убедитесь, что отключившийся подписчик удаляется."
+    )
+
+
+@pytest.mark.django_db
+def test_post_stream(broker):
+    sent = async_to_sync(read_stream)(
+        '/events/posts/',
+        lambda: broker.publish('posts', ('post', '{"id": 1}')),
+    )
+    assert sent[0]['status'] == 200
+    assert (b'content-type', b'text/event-stream; charset=utf-8') in (
+        sent[0]['headers']
+    )
+    bodies = b''.join(message.get('body', b'') for message in sent)
+    assert b'event: post\ndata: {"id": 1}\n\n' in bodies
+    assert b': keepalive' in bodies, (
+        "Убедитесь, что в простаивающий поток отправляются комментарии "
+        "keepalive."
+    )
+    assert (b'x-content-type-options', b'nosniff') in sent[0]['headers']
+
+
+@pytest.mark.django_db
+def test_stream_under_root_path(broker):
+    sent = async_to_sync(read_stream)(
+        '/blog/events/posts/',
+        lambda: broker.publish('posts', ('post', '{"id": 1}')),
+        root_path='/blog',
+    )
+    assert sent[0]['status'] == 200, (
+        "Убедитесь, что поток находится с учётом root_path."
+    )
+
+
+def test_stream_with_disallowed_host_goes_to_django():
+    passed = []
+
+    async def application(scope, receive, send):
+        passed.append(scope['path'])
+
+    async_to_sync(EventStreamRouter(application))(
+        http_scope('/events/posts/', host=b'evil.example'), None, None
+    )
+    assert passed == ['/events/posts/'], (
+        "Убедитесь, что запрос с чужим Host обрабатывает Django."
+    )
+
+
+@pytest.mark.django_db
+def test_comment_stream_of_hidden_post(
+        broker, unpublished_posts_with_published_locations):
+    post = unpublished_posts_with_published_locations[0]
+    sent = async_to_sync(read_stream)(
+        f'/posts/{post.id}/comments/events/', lambda: None
+    )
+    assert sent[0]['status'] == 404
+
+
+@pytest.mark.django_db
+def test_stream_under_wsgi_is_closed(client):
+    assert client.get('/events/posts/').status_code == 204
+
+
+@pytest.mark.django_db
+def test_new_comment_is_published(
+        broker, mixer, user, post_with_published_location,
+        django_capture_on_commit_callbacks):
+    with django_capture_on_commit_callbacks(execute=True):
+        comment = mixer.blend(
+            'blog.Comment', author=user, post=post_with_published_location
+        )
+    channel, (event, data) = broker.published[-1]
+    assert channel == f'comments:{post_with_published_location.id}'
+    assert event == 'comment'
+    assert json.loads(data)['id'] == comment.id
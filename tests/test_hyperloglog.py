@@ -0,0 +1,54 @@
+import pytest
+
+from blog.counters import VisitorSketchBuffer
+from blog.hyperloglog import HyperLogLog
+from blog.models import PostVisitorSketch
+
+
+@pytest.mark.parametrize('cardinality', [10, 1000, 20000])
+def test_estimate_accuracy(cardinality):
+    sketch = HyperLogLog(precision=11)
+    for i in range(cardinality):
+        sketch.add(f'user:{i}')
+        sketch.add(f'user:{i}')
+    standard_error = 1.04 / sketch.size ** 0.5
+    assert abs(sketch.count() - cardinality) <= max(
+        2, 3 * standard_error * cardinality
+    ), "Проверьте точность оценки числа уникальных значений."
+
+
+def test_merge_equals_union():
+    left, right, union = HyperLogLog(), HyperLogLog(), HyperLogLog()
+    for i in range(3000):
+        (left if i % 2 else right).add(str(i))
+        union.add(str(i))
+    assert left.merge(right).registers == union.registers
+
+
+def test_serialization_roundtrip():
+    sketch = HyperLogLog(precision=10)
+    for i in range(500):
+        sketch.add(str(i))
+    data = sketch.to_bytes()
+    assert len(data) == 1 + 2 ** 10
+    restored = HyperLogLog.from_bytes(data)
+    assert restored.precision == 10
+    assert restored.count() == sketch.count()
+
+
+@pytest.mark.django_db
+def test_buffers_merge_into_stored_sketch(post_with_published_location):
+    post_id = post_with_published_location.id
+    first_worker = VisitorSketchBuffer(flush_size=1000)
+    second_worker = VisitorSketchBuffer(flush_size=1000)
+    for i in range(100):
+        first_worker.add(post_id, f'user:{i}')
+        second_worker.add(post_id, f'user:{i + 50}')
+    first_worker.flush()
+    second_worker.flush()
+    stored = PostVisitorSketch.objects.get(post_id=post_id)
+    assert abs(stored.sketch.count() - 150) <= 5, (
+        "Убедитесь, что скетчи разных процессов объединяются при сбросе."
+    )
+    post_with_published_location.refresh_from_db()
+    assert abs(second_worker.estimate(post_with_published_location) - 150) <= 5
@@ -0,0 +1,104 @@
+import json
+import os
+import subprocess
+import sys
+from io import StringIO
+
+import pytest
+from django.conf import settings
+from django.core.management import call_command
+from django.core.management.base import CommandError
+
+from blog.management.commands import profile_imports
+
+IMPORTTIME = '''\
+import time: self [us] | cumulative | imported package
+import time:       100 |        100 |     _io
+import time:        50 |        150 |   io
+import time:       200 |        200 |   json.decoder
+import time:       300 |        650 | json
+import time:        40 |         40 | re
+'''
+
+
+def test_parse_importtime_builds_tree():
+    roots = profile_imports.parse_importtime(IMPORTTIME)
+    assert [root.name for root in roots] == ['json', 're']
+    json_node = roots[0]
+    assert [child.name for child in json_node.children] == [
+        'io', 'json.decoder'
+    ], "Убедитесь, что вложенные импорты попадают к своему родителю."
+    assert json_node.children[0].children[0].name == '_io'
+    assert json_node.cumulative_us == 650
+    assert [
+        (depth, node.name)
+        for depth, node in profile_imports.walk(roots)
+    ] == [(0, 'json'), (1, 'io'), (2, '_io'), (1, 'json.decoder'), (0, 're')]
+
+
+def test_compare_with_baseline():
+    problems = profile_imports.compare_with_baseline(
+        {'slow': 20_000, 'same': 10_000, 'new': 9_000, 'tiny': 500},
+        {'slow': 10_000, 'same': 9_500, 'tiny': 100},
+        tolerance=25, min_us=5_000,
+    )
+    assert [problem.split(':')[0] for problem in problems] == [
+        'slow', 'new'
+    ], "Убедитесь, что мелкие модули и рост в пределах допуска не считаются."
+
+
+def test_command_checks_thresholds(tmp_path):
+    baseline = tmp_path / 'baseline.json'
+    out = StringIO()
+    call_command(
+        'profile_imports', '--baseline', str(baseline), '--save-baseline',
+        stdout=out,
+    )
+    assert 'blogicum.wsgi' in out.getvalue()
+    assert 'blogicum.wsgi' in json.loads(baseline.read_text())
+    with pytest.raises(CommandError):
+        call_command(
+            'profile_imports', '--max-total-ms', '0.001', stdout=StringIO()
+        )
+
+
+def test_ui_apps_are_not_loaded_without_ui():
+    code = (
+        'import sys, django; django.setup(); import blogicum.urls; '
+        'print(sorted({"django.contrib.admin", "django_bootstrap5"} '
+        '& set(sys.modules)))'
+    )
+    env = {
+        **os.environ,
+        'DJANGO_SETTINGS_MODULE': 'blogicum.settings',
+        'BLOGICUM_SERVE_UI': '0',
+    }
+    result = subprocess.run(
+        [sys.executable, '-c', code], cwd=settings.BASE_DIR, env=env,
+        capture_output=True, text=True, check=True,
+    )
+    assert result.stdout.strip() == '[]', (
+        "Убедитесь, что при BLOGICUM_SERVE_UI=0 админка и bootstrap "
+        "не импортируются."
+    )
+    env.pop('BLOGICUM_SERVE_UI')
+    result = subprocess.run(
+        [sys.executable, '-c', code], cwd=settings.BASE_DIR, env=env,
+        capture_output=True, text=True, check=True,
+    )
+    assert 'django.contrib.admin' in result.stdout
+
+
+@pytest.mark.django_db
+def test_error_pages_without_ui(client, settings):
+    settings.DEBUG = False
+    settings.INSTALLED_APPS = [
+        app for app in settings.INSTALLED_APPS
+        if app not in settings.UI_APPS
+    ]
+    response = client.get('/missing-page/')
+    assert response.status_code == 404
+    assert response.content.decode() == 'Страница не найдена.', (
+        "Убедитесь, что без django_bootstrap5 страница 404 отдаётся "
+        "без шаблонов, наследующих base.html."
+    )
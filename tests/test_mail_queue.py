@@ -0,0 +1,169 @@
+import datetime
+import socketserver
+import threading
+
+import pytest
+from django.core.mail import send_mail
+from django.utils import timezone
+
+from tasks.mail import deliver_queued_mail
+from tasks.models import EmailStatus, OutgoingEmail, Task
+from tasks.queue import Worker
+
+pytestmark = [pytest.mark.django_db]
+
+REJECTED = 'blocked@example.org'
+GREYLISTED = 'later@example.org'
+
+
+class SMTPHandler(socketserver.StreamRequestHandler):
+    """Минимальный SMTP-сервер: принимает письма и запоминает их."""
+
+    def reply(self, line):
+        self.wfile.write(f'{line}\r\n'.encode())
+
+    def handle(self):
+        self.server.connections += 1
+        self.reply('220 localhost')
+        recipients = []
+        while True:
+            line = self.rfile.readline().decode().strip()
+            command = line[:4].upper()
+            if not line or command == 'QUIT':
+                self.reply('221 bye')
+                return
+            if command == 'EHLO':
+                self.reply('250 localhost')
+            elif command == 'RCPT':
+                if REJECTED in line:
+                    self.reply('550 no such user')
+                elif GREYLISTED in line:
+                    self.reply('451 try again later')
+                else:
+                    recipients.append(line.split(':', 1)[1].strip('<> '))
+                    self.reply('250 ok')
+            elif command == 'DATA':
+                self.reply('354 go ahead')
+                data = []
+                while (chunk := self.rfile.readline()) != b'.\r\n':
+                    data.append(chunk)
+                self.server.messages.append((recipients, b''.join(data)))
+                recipients = []
+                self.reply('250 queued')
+            else:
+                self.reply('250 ok')
+
+
+@pytest.fixture
+def smtp_server(settings):
+    server = socketserver.ThreadingTCPServer(('127.0.0.1', 0), SMTPHandler)
+    server.daemon_threads = True
+    server.connections = 0
+    server.messages = []
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    settings.EMAIL_BACKEND = 'tasks.mail.QueuedEmailBackend'
+    settings.EMAIL_DELIVERY_BACKEND = (
+        'django.core.mail.backends.smtp.EmailBackend'
+    )
+    settings.EMAIL_HOST = '127.0.0.1'
+    settings.EMAIL_PORT = server.server_address[1]
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def send(*recipients):
+    for recipient in recipients:
+        send_mail('Тема', 'Текст письма', 'blog@example.com', [recipient])
+
+
+def test_messages_are_queued_and_sent_over_one_connection(smtp_server):
+    send('a@example.com', 'b@example.com', 'c@example.net')
+    assert smtp_server.messages == [], (
+        "Убедитесь, что письма не отправляются во время запроса."
+    )
+    assert OutgoingEmail.objects.filter(status=EmailStatus.QUEUED).count() == 3
+    assert Task.objects.count() == 1, (
+        "Убедитесь, что на пачку писем ставится одна задача отправки."
+    )
+    Worker(pool='inline').run(once=True)
+    assert smtp_server.connections == 1, (
+        "Убедитесь, что пачка писем отправляется через одно соединение."
+    )
+    assert [r for r, _ in smtp_server.messages] == [
+        ['a@example.com'], ['b@example.com'], ['c@example.net']
+    ]
+    assert 'Текст письма'.encode() in smtp_server.messages[0][1]
+    assert not OutgoingEmail.objects.exclude(status=EmailStatus.SENT).exists()
+
+
+def test_domain_throttling(settings, smtp_server):
+    settings.EMAIL_DOMAIN_RATE_LIMIT = 2
+    send('a@example.com', 'b@example.com', 'c@example.com', 'd@example.net')
+    Worker(pool='inline').run(once=True)
+    assert len(smtp_server.messages) == 3
+    throttled = OutgoingEmail.objects.get(status=EmailStatus.QUEUED)
+    assert throttled.recipients == ['c@example.com']
+    assert Task.objects.filter(status=0).exists(), (
+        "Убедитесь, что отправка отложенных писем запланирована."
+    )
+
+
+def test_rejected_message_fails_without_retry(smtp_server):
+    send(REJECTED, 'a@example.com')
+    Worker(pool='inline').run(once=True)
+    rejected = OutgoingEmail.objects.get(recipients=[REJECTED])
+    assert rejected.status == EmailStatus.FAILED, (
+        "Убедитесь, что письмо с отказом 5xx не отправляется повторно."
+    )
+    assert rejected.attempts == 1
+    assert 'no such user' in rejected.last_error
+    assert len(smtp_server.messages) == 1
+
+
+def test_temporary_failure_is_retried(settings, smtp_server):
+    settings.EMAIL_MAX_ATTEMPTS = 2
+    send(GREYLISTED)
+    Worker(pool='inline').run(once=True)
+    greylisted = OutgoingEmail.objects.get()
+    assert greylisted.status == EmailStatus.QUEUED, (
+        "Убедитесь, что письмо с временным отказом 4xx отправляется снова."
+    )
+    assert greylisted.attempts == 1
+    assert 'try again later' in greylisted.last_error
+
+
+def test_recipients_are_throttled_per_domain(settings, smtp_server):
+    settings.EMAIL_DOMAIN_RATE_LIMIT = 1
+    send('a@example.com')
+    send_mail('Тема', 'Всем', 'blog@example.com', [
+        'b@example.net', 'c@example.com', 'd@example.net'
+    ])
+    assert sorted(
+        OutgoingEmail.objects.values_list('domain', 'recipients')
+    ) == [
+        ('example.com', ['a@example.com']),
+        ('example.com', ['c@example.com']),
+        ('example.net', ['b@example.net', 'd@example.net']),
+    ], "Убедитесь, что письмо разбивается по доменам получателей."
+    Worker(pool='inline').run(once=True)
+    assert [r for r, _ in smtp_server.messages] == [
+        ['a@example.com'], ['b@example.net', 'd@example.net']
+    ]
+    throttled = OutgoingEmail.objects.get(status=EmailStatus.QUEUED)
+    assert throttled.recipients == ['c@example.com']
+
+
+def test_stale_sending_message_is_requeued(settings, smtp_server):
+    settings.TASKS_LOCK_TIMEOUT = 60
+    send('a@example.com')
+    OutgoingEmail.objects.update(
+        status=EmailStatus.SENDING,
+        claimed_at=timezone.now() - datetime.timedelta(minutes=5),
+    )
+    assert deliver_queued_mail() == 1, (
+        "Убедитесь, что письма упавшего обработчика возвращаются в очередь."
+    )
+    outgoing = OutgoingEmail.objects.get()
+    assert outgoing.status == EmailStatus.SENT
+    assert outgoing.attempts == 1
@@ -0,0 +1,71 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from blog.pagination import encode_cursor
+
+pytestmark = [pytest.mark.django_db]
+
+
+@pytest.fixture
+def url(post_with_published_location):
+    return f'/posts/{post_with_published_location.id}/comments/new/'
+
+
+@pytest.fixture
+def comments(mixer, user, post_with_published_location):
+    return mixer.cycle(3).blend(
+        'blog.Comment', author=user, post=post_with_published_location
+    )
+
+
+def test_returns_comments_after_cursor(client, url, comments):
+    response = client.get(url, {'since': encode_cursor(comments[0])})
+    assert response.status_code == 200
+    data = response.json()
+    assert [c['id'] for c in data['comments']] == [
+        comments[1].id, comments[2].id
+    ], "Убедитесь, что возвращаются только комментарии после курсора."
+    assert data['cursor'] == encode_cursor(comments[2])
+    assert not data['has_more']
+
+
+def test_unchanged_returns_not_modified(client, url, comments):
+    since = encode_cursor(comments[2])
+    response = client.get(url, {'since': since})
+    assert response.json()['comments'] == []
+    etag = response['ETag']
+    with CaptureQueriesContext(connection) as queries:
+        response = client.get(
+            url, {'since': since}, HTTP_IF_NONE_MATCH=etag
+        )
+    assert response.status_code == 304, (
+        "Убедитесь, что при отсутствии новых комментариев возвращается 304."
+    )
+    assert not any(
+        'blog_comment"."text"' in q['sql'] for q in queries
+    ), "Убедитесь, что для ответа 304 комментарии не загружаются."
+
+
+def test_new_comment_changes_etag(
+        client, mixer, user, url, comments, post_with_published_location):
+    since = encode_cursor(comments[2])
+    etag = client.get(url, {'since': since})['ETag']
+    new = mixer.blend(
+        'blog.Comment', author=user, post=post_with_published_location
+    )
+    response = client.get(url, {'since': since}, HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == 200
+    assert [c['id'] for c in response.json()['comments']] == [new.id]
+
+
+def test_bad_cursor(client, url):
+    assert client.get(url, {'since': 'x'}).status_code == 400
+
+
+def test_detail_has_poll_cursor(
+        client, comments, post_with_published_location):
+    response = client.get(f'/posts/{post_with_published_location.id}/')
+    assert response.context['comments_poll_cursor'] == encode_cursor(
+        comments[2]
+    )
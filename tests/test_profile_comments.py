@@ -0,0 +1,51 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+pytestmark = [pytest.mark.django_db]
+
+
+@pytest.fixture
+def history(mixer, user, post_with_published_location,
+            post_with_another_category):
+    return [
+        mixer.blend('blog.Comment', author=user, post=post)
+        for post in (post_with_published_location,
+                     post_with_another_category) * 3
+    ]
+
+
+def test_history_lists_comments_with_titles(client, user, history):
+    response = client.get(f'/profile/{user.username}/comments/')
+    assert response.status_code == 200
+    assert list(response.context['page_obj']) == history[::-1], (
+        "Убедитесь, что комментарии пользователя выводятся от новых к "
+        "старым."
+    )
+    content = response.content.decode()
+    for comment in history:
+        assert comment.post.title in content
+
+
+def test_history_loads_posts_in_one_query(client, user, history):
+    with CaptureQueriesContext(connection) as queries:
+        client.get(f'/profile/{user.username}/comments/')
+    post_queries = [
+        q for q in queries
+        if 'FROM "blog_post"' in q['sql']
+        and 'FROM "blog_comment"' not in q['sql']
+    ]
+    assert len(post_queries) == 1, (
+        "Убедитесь, что публикации комментариев загружаются одним запросом."
+    )
+
+
+def test_hidden_comments_only_for_author(
+        client, user_client, user, history):
+    hidden = history[0]
+    hidden.is_published = False
+    hidden.save()
+    response = client.get(f'/profile/{user.username}/comments/')
+    assert hidden not in response.context['page_obj']
+    response = user_client.get(f'/profile/{user.username}/comments/')
+    assert hidden in response.context['page_obj']
@@ -0,0 +1,117 @@
+import pytest
+from django.core.cache import cache
+
+from blog.models import Comment
+from blog.ratelimit import TokenBucket, get_cache
+
+RULES = {
+    'comment': {'user': (2, 1), 'ip': (100, 100)},
+    'post': {'user': (1, 1), 'ip': (100, 100)},
+}
+
+
+@pytest.fixture(autouse=True)
+def clear_buckets(settings):
+    settings.RATELIMIT_RULES = RULES
+    cache.clear()
+    yield
+    cache.clear()
+
+
+def test_bucket_refills_at_rate():
+    bucket = TokenBucket(capacity=2, rate=1)
+    assert bucket.consume('bucket', now=0) == 0
+    assert bucket.consume('bucket', now=0) == 0
+    assert bucket.consume('bucket', now=0.5) == pytest.approx(0.5)
+    assert bucket.consume('bucket', now=1) == 0
+    assert bucket.consume('bucket', now=1) > 0
+    assert bucket.consume('bucket', now=3) == 0
+    assert bucket.consume('bucket', now=3) == 0
+
+
+def test_no_burst_across_boundary():
+    capacity, rate = 3, 1
+    span = capacity / rate
+    bucket = TokenBucket(capacity, rate)
+    for _ in range(capacity):
+        assert bucket.consume('edge', now=span - 0.01) == 0
+    assert bucket.consume('edge', now=span + 0.01) > 0, (
+        "Убедитесь, что на границе интервала capacity / rate "
+        "не пропускается вторая пачка запросов."
+    )
+
+    # Клиент стучится так часто, как может: в любом отрезке времени
+    # пропускается не больше capacity запросов плюс пополнение за него.
+    admitted = [
+        now for now in (step / 20 for step in range(20 * 30))
+        if bucket.consume('greedy', now=now) == 0
+    ]
+    for length in (0.5, 1, span, 2 * span):
+        for start in admitted:
+            count = sum(start <= now < start + length for now in admitted)
+            assert count <= capacity + int(length * rate), (
+                f"Убедитесь, что за {length} с пропускается не больше "
+                "capacity запросов плюс пополнение корзины."
+            )
+
+
+def test_concurrent_update_is_not_lost(monkeypatch):
+    cache = get_cache()
+    bucket = TokenBucket(capacity=1, rate=1)
+    original_add = cache.add
+
+    def add_after_other_process(*args, **kwargs):
+        # Другой процесс успевает забрать последний токен первым.
+        monkeypatch.setattr(cache, 'add', original_add)
+        assert bucket.consume('race', now=0) == 0
+        return original_add(*args, **kwargs)
+
+    monkeypatch.setattr(cache, 'add', add_after_other_process)
+    assert bucket.consume('race', now=0) > 0, (
+        "Убедитесь, что одновременные запросы не списывают один токен "
+        "дважды."
+    )
+
+
+@pytest.mark.django_db
+def test_comment_flood_is_rejected(user_client, post_with_published_location):
+    url = f'/posts/{post_with_published_location.id}/comment/'
+    for _ in range(2):
+        response = user_client.post(url, {'text': 'Комментарий'})
+        assert response.status_code == 302
+    response = user_client.post(url, {'text': 'Комментарий'})
+    assert response.status_code == 429, (
+        "Убедитесь, что частые комментарии отклоняются с кодом 429."
+    )
+    assert int(response['Retry-After']) >= 1
+    assert Comment.objects.count() == 2, (
+        "Убедитесь, что отклонённый комментарий не сохраняется."
+    )
+
+
+@pytest.mark.django_db
+def test_limits_are_per_user(
+        user_client, another_user_client, post_with_published_location):
+    url = f'/posts/{post_with_published_location.id}/comment/'
+    for _ in range(3):
+        user_client.post(url, {'text': 'Комментарий'})
+    response = another_user_client.post(url, {'text': 'Комментарий'})
+    assert response.status_code == 302
+
+
+@pytest.mark.django_db
+def test_ip_limit(settings, user_client, post_with_published_location):
+    settings.RATELIMIT_RULES = {
+        'comment': {'user': (100, 100), 'ip': (1, 1)},
+    }
+    url = f'/posts/{post_with_published_location.id}/comment/'
+    assert user_client.post(url, {'text': 'Раз'}).status_code == 302
+    assert user_client.post(url, {'text': 'Два'}).status_code == 429
+
+
+@pytest.mark.django_db
+def test_disabled(settings, user_client, post_with_published_location):
+    settings.RATELIMIT_ENABLED = False
+    url = f'/posts/{post_with_published_location.id}/comment/'
+    for _ in range(3):
+        assert user_client.post(url, {'text': 'Текст'}).status_code == 302
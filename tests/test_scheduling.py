@@ -0,0 +1,112 @@
+from datetime import timedelta
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+from django.utils import timezone
+
+from blog.models import ArchiveMonth, Category, Post
+from tasks.models import Task, TaskStatus
+from tasks.queue import Worker
+
+pytestmark = [pytest.mark.django_db]
+
+
+def visible_count():
+    return (
+        Post.objects.filter(is_visible=True).count(),
+        sum(Category.objects.values_list('posts_count', flat=True)),
+        sum(ArchiveMonth.objects.values_list('posts_count', flat=True)),
+    )
+
+
+@pytest.fixture
+def scheduled_post(mixer, user, published_category):
+    return mixer.blend(
+        'blog.Post', author=user, category=published_category,
+        is_published=True, pub_date=timezone.now() + timedelta(hours=1),
+    )
+
+
+def time_passes(post):
+    # Время публикации и задачи переносятся в прошлое.
+    Post.objects.filter(pk=post.pk).update(
+        pub_date=timezone.now() - timedelta(minutes=1)
+    )
+    Task.objects.update(run_at=timezone.now() - timedelta(minutes=1))
+
+
+def test_scheduled_post_is_hidden_until_due(scheduled_post):
+    scheduled_post.refresh_from_db()
+    assert not scheduled_post.is_visible
+    assert visible_count() == (0, 0, 0), (
+        "Убедитесь, что отложенная публикация не учитывается в счётчиках."
+    )
+    task = Task.objects.get()
+    assert task.name == 'blog.scheduling.publish_due_posts'
+    assert task.run_at == scheduled_post.pub_date, (
+        "Убедитесь, что задача публикации ставится на время публикации."
+    )
+
+
+def test_worker_publishes_due_post(
+        scheduled_post, django_capture_on_commit_callbacks):
+    time_passes(scheduled_post)
+    with django_capture_on_commit_callbacks() as callbacks:
+        Worker(pool='inline').run(once=True)
+    assert visible_count() == (1, 1, 1), (
+        "Убедитесь, что по наступлении времени публикация открывается "
+        "и учитывается в счётчиках."
+    )
+    assert callbacks, "Убедитесь, что о новой публикации уходит событие."
+    assert Task.objects.get().status == TaskStatus.DONE
+
+
+def test_command_publishes_without_worker(scheduled_post):
+    time_passes(scheduled_post)
+    call_command('publish_due_posts', stdout=StringIO())
+    assert visible_count() == (1, 1, 1)
+
+
+def test_missed_ticks_are_caught_up(mixer, user, published_category):
+    later = timezone.now() + timedelta(days=1)
+    posts = mixer.cycle(3).blend(
+        'blog.Post', author=user, category=published_category,
+        is_published=True, pub_date=(
+            timezone.now() + timedelta(hours=hours) for hours in (1, 2, 24)
+        ),
+    )
+    assert Task.objects.count() == 1, (
+        "Убедитесь, что на несколько публикаций ставится одна задача."
+    )
+    Post.objects.filter(pk__in=[posts[0].pk, posts[1].pk]).update(
+        pub_date=timezone.now() - timedelta(hours=1)
+    )
+    Task.objects.update(run_at=timezone.now() - timedelta(hours=1))
+    Worker(pool='inline').run(once=True)
+    assert visible_count()[0] == 2, (
+        "Убедитесь, что одна задача открывает все просроченные публикации."
+    )
+    assert Task.objects.filter(
+        status=TaskStatus.QUEUED, run_at__gte=later - timedelta(hours=1)
+    ).exists(), "Убедитесь, что ставится задача на следующую публикацию."
+
+
+def test_category_toggle_recomputes_visibility(
+        mixer, user, published_category):
+    mixer.cycle(2).blend(
+        'blog.Post', author=user, category=published_category,
+        is_published=True, pub_date=timezone.now() - timedelta(days=1),
+    )
+    assert visible_count() == (2, 2, 2)
+    published_category.is_published = False
+    published_category.save()
+    assert visible_count() == (0, 0, 0), (
+        "Убедитесь, что снятие категории с публикации скрывает её "
+        "публикации."
+    )
+    published_category.is_published = True
+    published_category.save()
+    assert visible_count() == (2, 2, 2)
+    published_category.delete()
+    assert visible_count() == (0, 0, 0)
@@ -0,0 +1,83 @@
+import contextvars
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+
+import pytest
+from django.core.cache import cache
+
+from blog.models import Comment, Location
+from blog.writer import SingleWriter, single_writer
+
+
+@pytest.fixture(autouse=True)
+def enable_single_writer(settings):
+    settings.SINGLE_WRITER = True
+    settings.SPAM_WORKER_IN_PROCESS = False
+    cache.clear()
+
+
+def create_location(name):
+    time.sleep(0.02)
+    return Location.objects.create(name=name).pk
+
+
+@pytest.mark.django_db(transaction=True)
+def test_concurrent_writes_are_batched():
+    writer = SingleWriter(batch_size=50, idle_timeout=0.1)
+    with ThreadPoolExecutor(10) as executor:
+        pks = list(executor.map(
+            lambda i: writer.run(create_location, f'Место {i}'), range(10)
+        ))
+    assert sorted(Location.objects.values_list('pk', flat=True)) == (
+        sorted(pks)
+    ), "Убедитесь, что вызывающий получает результат записи."
+    assert writer.writes == 10
+    assert writer.batches < 10, (
+        "Убедитесь, что записи из очереди выполняются пачками."
+    )
+
+
+@pytest.mark.django_db
+def test_failed_write_does_not_abort_batch():
+    def fail():
+        Location.objects.create(name='Откатится')
+        raise ValueError('ошибка')
+
+    jobs = [
+        (Future(), contextvars.copy_context(), func, args, {})
+        for func, args in (
+            (create_location, ('Первое',)), (fail, ()),
+            (create_location, ('Второе',)),
+        )
+    ]
+    SingleWriter().execute(jobs)
+    assert set(Location.objects.values_list('name', flat=True)) == {
+        'Первое', 'Второе'
+    }, "Убедитесь, что ошибка одной записи не откатывает всю пачку."
+    with pytest.raises(ValueError):
+        jobs[1][0].result()
+
+
+@pytest.mark.django_db
+def test_runs_inline_inside_transaction():
+    thread = single_writer.run(threading.current_thread)
+    assert thread is threading.current_thread(), (
+        "Убедитесь, что внутри транзакции запись выполняется сразу."
+    )
+
+
+@pytest.mark.django_db(transaction=True)
+def test_comment_is_saved_by_writer(
+        monkeypatch, user_client, post_with_published_location):
+    monkeypatch.setattr(single_writer, 'idle_timeout', 0.1)
+    writes = single_writer.writes
+    response = user_client.post(
+        f'/posts/{post_with_published_location.id}/comment/',
+        {'text': 'Через очередь записи'},
+    )
+    assert response.status_code == 302
+    assert Comment.objects.get().text == 'Через очередь записи'
+    assert single_writer.writes == writes + 1, (
+        "Убедитесь, что комментарий сохраняется через single_writer."
+    )
@@ -0,0 +1,120 @@
+import pytest
+from django.core.cache import cache
+from django.core.management import call_command
+
+from blog import spam
+from blog.models import Comment, ModerationStatus
+
+pytestmark = [pytest.mark.django_db]
+
+
+def always_spam(texts):
+    return [1.0] * len(texts)
+
+
+@pytest.fixture(autouse=True)
+def clear_rate_limits():
+    cache.clear()
+
+
+@pytest.fixture
+def comment_url(post_with_published_location):
+    return f'/posts/{post_with_published_location.id}/comment/'
+
+
+def test_new_comment_is_pending_and_wakes_worker(
+        user_client, comment_url, django_capture_on_commit_callbacks):
+    with django_capture_on_commit_callbacks() as callbacks:
+        user_client.post(comment_url, {'text': 'Хорошая статья'})
+    comment = Comment.objects.get()
+    assert comment.moderation_status == ModerationStatus.PENDING, (
+        "Убедитесь, что новый комментарий ждёт проверки на спам."
+    )
+    assert not comment.is_published, (
+        "Убедитесь, что до проверки комментарий по умолчанию скрыт."
+    )
+    assert spam.spam_worker.wake in callbacks
+    spam.score_pending(batch_size=10)
+    assert Comment.objects.get().is_published
+
+
+def test_pending_shown_when_configured(settings, user_client, comment_url):
+    settings.COMMENT_PENDING_VISIBLE = True
+    user_client.post(comment_url, {'text': 'Хорошая статья'})
+    assert Comment.objects.get().is_published
+
+
+def test_batch_publishes_and_quarantines(
+        mixer, user, post_with_published_location):
+    ham = mixer.blend(
+        'blog.Comment', author=user, post=post_with_published_location,
+        text='Спасибо, очень подробно написано',
+    )
+    links = mixer.blend(
+        'blog.Comment', author=user, post=post_with_published_location,
+        text='Дёшево http://a.example www.b.example',
+    )
+    repeated = mixer.cycle(3).blend(
+        'blog.Comment', author=user, post=post_with_published_location,
+        text='Подпишитесь на мой канал',
+    )
+    stats = spam.score_pending(batch_size=100)
+    assert stats == {'scored': 5, 'published': 1, 'quarantined': 4}
+    ham.refresh_from_db()
+    links.refresh_from_db()
+    assert ham.moderation_status == ModerationStatus.APPROVED
+    assert links.moderation_status == ModerationStatus.QUARANTINED
+    assert not links.is_published, (
+        "Убедитесь, что комментарий в карантине скрыт."
+    )
+    assert not Comment.objects.filter(
+        pk__in=[c.pk for c in repeated], is_published=True
+    ).exists()
+
+
+def test_pluggable_classifier(
+        settings, mixer, user, post_with_published_location):
+    settings.SPAM_CLASSIFIER = 'test_spam.always_spam'
+    comment = mixer.blend(
+        'blog.Comment', author=user, post=post_with_published_location,
+        text='Безобидный текст',
+    )
+    spam.score_pending(batch_size=10)
+    comment.refresh_from_db()
+    assert comment.spam_score == 1.0
+    assert comment.moderation_status == ModerationStatus.QUARANTINED
+
+
+def test_edit_requeues_published_comment(
+        mixer, user, user_client, post_with_published_location):
+    comment = mixer.blend(
+        'blog.Comment', author=user, post=post_with_published_location,
+        moderation_status=ModerationStatus.APPROVED,
+    )
+    user_client.post(
+        f'/posts/{comment.post_id}/edit_comment/{comment.id}/',
+        {'text': 'Новый текст'},
+    )
+    comment.refresh_from_db()
+    assert comment.moderation_status == ModerationStatus.PENDING
+
+
+def test_worker_metrics(mixer, user, post_with_published_location):
+    mixer.cycle(5).blend(
+        'blog.Comment', author=user, post=post_with_published_location
+    )
+    worker = spam.SpamScoringWorker(batch_size=2)
+    assert worker.drain() == 5
+    metrics = worker.metrics.snapshot()
+    assert metrics['batches'] == 3
+    assert metrics['scored'] == 5
+    assert metrics['backlog'] == 0
+
+
+def test_score_comments_command(
+        capsys, mixer, user, post_with_published_location):
+    mixer.blend(
+        'blog.Comment', author=user, post=post_with_published_location
+    )
+    call_command('score_comments')
+    assert 'Оценено: 1' in capsys.readouterr().out
@@ -0,0 +1,46 @@
+import sqlite3
+
+import pytest
+from django.db import connection
+
+from blog.management.commands.bench_sqlite import prepare, run_client
+from blogicum.db import apply_sqlite_pragmas
+
+
+def pragma(cursor, name):
+    cursor.execute(f'PRAGMA {name}')
+    return cursor.fetchone()[0]
+
+
+@pytest.mark.django_db
+def test_connection_gets_pragmas(settings):
+    with connection.cursor() as cursor:
+        assert pragma(cursor, 'busy_timeout') == (
+            settings.SQLITE_PRAGMAS['busy_timeout']
+        ), "Убедитесь, что PRAGMA применяются к соединениям Django."
+        assert pragma(cursor, 'cache_size') == (
+            settings.SQLITE_PRAGMAS['cache_size']
+        )
+        # synchronous=NORMAL
+        assert pragma(cursor, 'synchronous') == 1
+
+
+def test_pragmas_on_file_database(tmp_path, settings):
+    path = str(tmp_path / 'bench.sqlite3')
+    prepare(path, settings.SQLITE_PRAGMAS)
+    connection = sqlite3.connect(path)
+    assert pragma(connection.cursor(), 'journal_mode') == 'wal', (
+        "Убедитесь, что база переводится в режим WAL."
+    )
+    connection.close()
+    reads, writes, locked = run_client(
+        path, settings.SQLITE_PRAGMAS, 5, 0.1, 0.5, seed=1
+    )
+    assert reads and writes and not locked
+
+
+def test_invalid_pragma_name():
+    with pytest.raises(ValueError):
+        apply_sqlite_pragmas(
+            sqlite3.connect(':memory:'), {'cache_size = 1; --': 1}
+        )
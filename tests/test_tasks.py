@@ -0,0 +1,119 @@
+import datetime
+
+import pytest
+from django.core.management import call_command
+from django.utils import timezone
+
+from tasks.models import Task, TaskStatus
+from tasks.queue import Worker, enqueue, run_task
+
+pytestmark = [pytest.mark.django_db]
+
+calls = []
+
+
+def record(value, extra=None):
+    calls.append((value, extra))
+
+
+def explode():
+    raise RuntimeError('boom')
+
+
+@pytest.fixture(autouse=True)
+def clear_calls():
+    calls.clear()
+
+
+def test_worker_runs_due_tasks():
+    enqueue(record, 1, extra='x')
+    enqueue('test_tasks.record', 2)
+    later = enqueue(record, 3, delay=60)
+    assert Worker(pool='inline').run(once=True) == 2
+    assert calls == [(1, 'x'), (2, None)]
+    assert Task.objects.filter(status=TaskStatus.DONE).count() == 2
+    later.refresh_from_db()
+    assert later.status == TaskStatus.QUEUED, (
+        "Убедитесь, что отложенная задача не выполняется раньше срока."
+    )
+
+
+def test_claim_is_exclusive():
+    enqueue(record, 1)
+    assert len(Task.objects.claim('first', 10)) == 1
+    assert Task.objects.claim('second', 10) == [], (
+        "Убедитесь, что одну задачу не могут захватить два обработчика."
+    )
+
+
+def test_failed_task_is_retried_with_backoff(settings):
+    settings.TASKS_RETRY_BACKOFF = 10
+    task = enqueue(explode, max_attempts=2)
+    (task,) = Task.objects.claim('worker', 1)
+    started = timezone.now()
+    assert run_task(task.pk) == TaskStatus.QUEUED
+    task.refresh_from_db()
+    assert 'RuntimeError: boom' in task.last_error
+    assert task.run_at >= started + datetime.timedelta(seconds=10)
+    Task.objects.filter(pk=task.pk).update(run_at=timezone.now())
+    (task,) = Task.objects.claim('worker', 1)
+    assert task.attempts == 2
+    assert run_task(task.pk) == TaskStatus.FAILED, (
+        "Убедитесь, что после последней попытки задача помечается ошибкой."
+    )
+
+
+def test_stale_running_task_is_requeued(settings):
+    settings.TASKS_LOCK_TIMEOUT = 60
+    task = enqueue(record, 1)
+    Task.objects.claim('dead', 1)
+    Task.objects.filter(pk=task.pk).update(
+        locked_at=timezone.now() - datetime.timedelta(minutes=5)
+    )
+    assert Task.objects.requeue_stale() == 1
+    assert Task.objects.claim('alive', 1)[0].pk == task.pk
+
+
+def test_stale_task_without_attempts_left_fails(settings):
+    settings.TASKS_LOCK_TIMEOUT = 60
+    task = enqueue(record, 1, max_attempts=1)
+    Task.objects.claim('dead', 1)
+    Task.objects.filter(pk=task.pk).update(
+        locked_at=timezone.now() - datetime.timedelta(minutes=5)
+    )
+    assert Task.objects.requeue_stale() == 1
+    task.refresh_from_db()
+    assert task.status == TaskStatus.FAILED, (
+        "Убедитесь, что задача, исчерпавшая попытки, не возвращается "
+        "в очередь."
+    )
+
+
+def test_heartbeat_keeps_running_task_claimed(settings):
+    settings.TASKS_LOCK_TIMEOUT = 60
+    settings.TASKS_HEARTBEAT_INTERVAL = 0
+    task = enqueue(record, 1)
+    worker = Worker()
+    Task.objects.claim(worker.name, 1)
+    Task.objects.filter(pk=task.pk).update(
+        locked_at=timezone.now() - datetime.timedelta(minutes=5)
+    )
+    worker._running[object()] = task.pk
+    assert worker.heartbeat() == 1
+    assert Task.objects.requeue_stale() == 0, (
+        "Убедитесь, что обработчик продлевает захват выполняемых задач."
+    )
+
+
+def test_runworker_command(capsys):
+    enqueue(record, 1)
+    call_command('runworker', pool='inline', once=True)
+    assert 'Выполнено задач: 1.' in capsys.readouterr().out
+    assert calls == [(1, None)]
+
+
+def test_admin_dashboard(admin_client):
+    enqueue(record, 1)
+    response = admin_client.get('/admin/tasks/task/')
+    assert response.status_code == 200
+    assert 'В очереди: 1' in response.content.decode()
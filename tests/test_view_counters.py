@@ -0,0 +1,142 @@
+import os
+import threading
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from blog import counters
+from blog.counters import ViewCounterBuffer, view_counter
+
+DEAD_PID = 2 ** 22 + 1
+
+
+@pytest.mark.django_db
+def test_buffer_aggregates_until_flush(
+        post_with_published_location, post_with_another_category):
+    buffer = ViewCounterBuffer(flush_interval=3600, flush_size=1000)
+    for _ in range(3):
+        buffer.increment(post_with_published_location.id)
+    buffer.increment(post_with_another_category.id, 2)
+    post_with_published_location.refresh_from_db()
+    assert post_with_published_location.views == 0, (
+        "Убедитесь, что просмотры не записываются в базу при каждом запросе."
+    )
+    with CaptureQueriesContext(connection) as queries:
+        assert buffer.flush() == 5
+    updates = [q for q in queries if q['sql'].startswith('UPDATE')]
+    assert len(updates) == 1, (
+        "Убедитесь, что накопленные просмотры сбрасываются одним запросом."
+    )
+    post_with_published_location.refresh_from_db()
+    post_with_another_category.refresh_from_db()
+    assert post_with_published_location.views == 3
+    assert post_with_another_category.views == 2
+
+
+@pytest.mark.django_db
+def test_buffer_flushes_on_size_threshold(post_with_published_location):
+    buffer = ViewCounterBuffer(flush_interval=3600, flush_size=2)
+    buffer.increment(post_with_published_location.id)
+    buffer.increment(post_with_published_location.id)
+    post_with_published_location.refresh_from_db()
+    assert post_with_published_location.views == 2
+    assert buffer.pending(post_with_published_location.id) == 0
+
+
+@pytest.mark.django_db
+def test_recover_applies_dead_process_journal(
+        tmp_path, monkeypatch, post_with_published_location):
+    monkeypatch.setattr(
+        ViewCounterBuffer, '_journal_enabled', lambda self: True
+    )
+    spill_file = tmp_path / 'views.spill'
+    buffer = ViewCounterBuffer(spill_file=spill_file, flush_size=1000)
+    post_id = post_with_published_location.id
+    dead_journal = tmp_path / f'views.spill.{DEAD_PID}.flushing'
+    dead_journal.write_text(f'{post_id} 1\n{post_id} 4\n{post_id}')
+    buffer.increment(post_id)
+    assert not dead_journal.exists()
+    assert buffer.journal_path.read_text() == f'{post_id} 1\n'
+    post_with_published_location.refresh_from_db()
+    assert post_with_published_location.views == 5
+    buffer.flush()
+    assert not buffer.journal_path.exists()
+    post_with_published_location.refresh_from_db()
+    assert post_with_published_location.views == 6
+
+
+@pytest.mark.django_db
+def test_recovering_journal_is_claimed_once(
+        tmp_path, monkeypatch, post_with_published_location):
+    monkeypatch.setattr(
+        ViewCounterBuffer, '_journal_enabled', lambda self: True
+    )
+    spill_file = tmp_path / 'views.spill'
+    post_id = post_with_published_location.id
+    (tmp_path / f'views.spill.{DEAD_PID}').write_text(f'{post_id} 2\n')
+    first = ViewCounterBuffer(spill_file=spill_file)
+    second = ViewCounterBuffer(spill_file=spill_file)
+    original_replace = os.replace
+
+    def replace_after_other_process(source, target):
+        # Другой процесс успевает забрать тот же журнал первым.
+        monkeypatch.setattr(os, 'replace', original_replace)
+        assert second.recover() == 2
+        return original_replace(source, target)
+
+    monkeypatch.setattr(os, 'replace', replace_after_other_process)
+    assert first.recover() == 0, (
+        "Убедитесь, что журнал, забранный другим процессом, не применяется "
+        "повторно."
+    )
+    post_with_published_location.refresh_from_db()
+    assert post_with_published_location.views == 2
+    assert list(tmp_path.iterdir()) == []
+
+
+@pytest.mark.django_db
+def test_recover_journal_left_under_reused_pid(
+        tmp_path, monkeypatch, post_with_published_location):
+    monkeypatch.setattr(
+        ViewCounterBuffer, '_journal_enabled', lambda self: True
+    )
+    post_id = post_with_published_location.id
+    # Упавший процесс имел тот же номер, что и текущий.
+    leftover = tmp_path / f'views.spill.{os.getpid()}'
+    leftover.write_text(f'{post_id} 5\n')
+    buffer = ViewCounterBuffer(
+        spill_file=tmp_path / 'views.spill', flush_size=1000
+    )
+    buffer.increment(post_id)
+    assert buffer.journal_path != leftover
+    buffer.flush()
+    post_with_published_location.refresh_from_db()
+    assert post_with_published_location.views == 6, (
+        "Убедитесь, что журнал упавшего процесса с тем же номером "
+        "не теряется."
+    )
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_buffer_is_flushed_by_timer(monkeypatch):
+    monkeypatch.setattr(counters, '_uses_in_memory_db', lambda: False)
+    flushed = threading.Event()
+    buffer = ViewCounterBuffer(flush_interval=0.05, flush_size=1000)
+    monkeypatch.setattr(buffer, 'recover', lambda: 0)
+    monkeypatch.setattr(buffer, 'flush', flushed.set)
+    buffer.increment(1)
+    assert flushed.wait(5), (
+        "Убедитесь, что буфер сбрасывается по таймеру без новых просмотров."
+    )
+
+
+@pytest.mark.django_db
+def test_detail_view_counts_views(client, post_with_published_location):
+    before = view_counter.pending(post_with_published_location.id)
+    response = client.get(f'/posts/{post_with_published_location.id}/')
+    assert response.status_code == 200
+    assert response.context['views_count'] >= 1
+    assert view_counter.pending(post_with_published_location.id) in (
+        before + 1, 0
+    )
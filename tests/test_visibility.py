@@ -0,0 +1,59 @@
+from datetime import timedelta
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from blog.models import Category, Post
+
+pytestmark = [pytest.mark.django_db]
+
+
+@pytest.fixture
+def visible_post(mixer, user, published_category):
+    return mixer.blend(
+        'blog.Post', author=user, category=published_category,
+        is_published=True, pub_date=timezone.now() - timedelta(days=1),
+    )
+
+
+def test_feed_filters_by_visibility_flag(client, visible_post):
+    with CaptureQueriesContext(connection) as queries:
+        response = client.get('/')
+    assert list(response.context['page_obj']) == [visible_post]
+    conditions = [
+        query['sql'].rsplit('WHERE', 1)[1].split(' GROUP BY')[0]
+        for query in queries
+        if 'FROM "blog_post"' in query['sql'] and 'WHERE' in query['sql']
+    ]
+    assert conditions and all(
+        '"blog_post"."is_visible"' in where
+        and '"blog_category"."is_published"' not in where
+        and '"pub_date" <=' not in where
+        for where in conditions
+    ), "Убедитесь, что лента отбирает публикации только по is_visible."
+
+
+def test_hidden_post_is_visible_to_author_only(
+        client, user_client, visible_post):
+    visible_post.is_published = False
+    visible_post.save()
+    url = f'/posts/{visible_post.pk}/'
+    assert client.get(url).status_code == 404
+    assert user_client.get(url).status_code == 200
+
+
+def test_recompute_after_bulk_update(visible_post, published_category):
+    Post.objects.update(is_published=False)
+    assert Post.objects.visible().exists()
+    assert Post.objects.recompute_visibility() == 1
+    assert not Post.objects.visible().exists(), (
+        "Убедитесь, что recompute_visibility пересчитывает флаг."
+    )
+    Post.objects.update(is_published=True)
+    call_command('rebuild_counters', stdout=StringIO())
+    assert Post.objects.visible().get() == visible_post
+    assert Category.objects.get(pk=published_category.pk).posts_count == 1
@@ -0,0 +1,57 @@
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+
+from blog import autocomplete
+from blog.models import Category, Location
+from blogicum import warmup
+
+pytestmark = [pytest.mark.django_db]
+
+
+def test_named_urls_are_reversed():
+    names = dict(warmup.named_urls(warmup.get_resolver().url_patterns))
+    assert names['blog:edit_comment'] == {'post_id': 1, 'comment_id': 1}
+    assert names['blog:profile'] == {'username': 'warmup'}
+    reversed_count, failed = warmup.reverse_urls()
+    assert reversed_count > len(failed)
+    assert not [name for name in failed if name.startswith('blog:')], (
+        "Убедитесь, что прогрев перебирает все именованные URL блога."
+    )
+
+
+def test_warmup_command(monkeypatch):
+    monkeypatch.setattr(autocomplete, '_indexes', {})
+    out = StringIO()
+    call_command('warmup', stdout=out)
+    assert 'Прогрев завершён' in out.getvalue()
+    assert {Category, Location} <= set(autocomplete._indexes), (
+        "Убедитесь, что прогрев заполняет индексы автодополнения."
+    )
+
+
+def test_preload_runs_only_when_enabled(settings, monkeypatch):
+    calls = []
+    monkeypatch.setattr(warmup, 'warm_up', lambda: calls.append(1) or [])
+    monkeypatch.setattr(warmup.connections, 'close_all', lambda: None)
+    settings.WARMUP_ON_STARTUP = False
+    warmup.preload()
+    assert calls == []
+    settings.WARMUP_ON_STARTUP = True
+    warmup.preload()
+    assert calls == [1]
+
+
+def test_warmup_without_ui_skips_pages(settings):
+    settings.INSTALLED_APPS = [
+        app for app in settings.INSTALLED_APPS
+        if app not in settings.UI_APPS
+    ]
+    out = StringIO()
+    call_command('warmup', stdout=out)
+    assert 'Прогрев завершён' in out.getvalue(), (
+        "Убедитесь, что прогрев без django_bootstrap5 не падает на "
+        "шаблонах страниц."
+    )
+    assert [step for step, *_ in warmup.warm_up()] == ['views', 'urls']